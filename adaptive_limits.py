@@ -0,0 +1,181 @@
+# adaptive_limits.py
+"""
+Nexus Adaptive Limits (AIMD on event-loop lag)
+
+✅ AdaptiveLimiter: semaphore whose limit can move at runtime
+   (async with limiter / acquire() + release() across tasks)
+✅ AimdController: samples event-loop lag and tick-to-decision latency every
+   period; over budget -> multiplicative decrease + raise shed level,
+   under budget -> additive increase, shed level decays after calm periods
+✅ Shed levels are read by the tick dispatcher; the hi lane (open / armed
+   tokens) is never shed
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict
+
+logger = logging.getLogger("Nexus_AIMD")
+
+# shed levels, applied cumulatively to bulk-lane (idle) tokens only
+SHED_NONE = 0
+SHED_PRUNED = 1        # drop ticks of tokens already pruned from the feed
+SHED_FLAT = 2          # idle-token updates that do not extend the open 1m bar: candle only, no shard hop
+SHED_INTRABAR = 3      # idle-token updates inside the current minute: candle only (bucket changes still pass)
+SHED_MAX = SHED_INTRABAR
+
+
+class AdaptiveLimiter:
+    def __init__(self, limit: int, name: str = "limiter"):
+        self.name = name
+        self.limit = max(1, int(limit))
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def locked(self) -> bool:
+        return self.inflight >= self.limit
+
+    async def acquire(self):
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # slot was handed over just before cancel
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self):
+        self.inflight -= 1
+        self._wake()
+
+    def set_limit(self, limit: int):
+        self.limit = max(1, int(limit))
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.inflight < self.limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class AimdController:
+    def __init__(
+        self,
+        limiters: Dict[str, AdaptiveLimiter],
+        bounds: Dict[str, tuple],
+        lag_budget_ms: float = 20.0,
+        decision_budget_ms: float = 100.0,
+        period: float = 0.25,
+        probe_interval: float = 0.02,
+        additive_step: float = 0.05,
+        decrease_factor: float = 0.7,
+        calm_periods: int = 8,
+    ):
+        """bounds: name -> (min, max) for each limiter; additive_step is a fraction of max."""
+        self.limiters = limiters
+        self.bounds = bounds
+        self.lag_budget_ms = float(lag_budget_ms)
+        self.decision_budget_ms = float(decision_budget_ms)
+        self.period = float(period)
+        self.probe_interval = float(probe_interval)
+        self.additive_step = float(additive_step)
+        self.decrease_factor = float(decrease_factor)
+        self.calm_periods = int(calm_periods)
+
+        self.shed_level = SHED_NONE
+        self.shed_counts = {"pruned": 0, "flat": 0, "intrabar": 0}
+        self.decreases = 0
+        self.increases = 0
+
+        self.loop_lag_ms = 0.0            # worst lag seen in the last period
+        self.decision_ms = 0.0            # worst tick-to-decision seen in the last period
+        self._lag_peak = 0.0
+        self._decision_peak = 0.0
+        self._calm = 0
+
+    # -----------------------------
+    # SIGNALS
+    # -----------------------------
+    def observe_decision(self, ms: float):
+        if ms > self._decision_peak:
+            self._decision_peak = ms
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.probe_interval)
+            lag = (loop.time() - t0 - self.probe_interval) * 1000.0
+            if lag > self._lag_peak:
+                self._lag_peak = lag
+
+    # -----------------------------
+    # CONTROL LOOP
+    # -----------------------------
+    def step(self):
+        self.loop_lag_ms, self._lag_peak = self._lag_peak, 0.0
+        self.decision_ms, self._decision_peak = self._decision_peak, 0.0
+        over = self.loop_lag_ms > self.lag_budget_ms or self.decision_ms > self.decision_budget_ms
+
+        for name, lim in self.limiters.items():
+            lo, hi = self.bounds[name]
+            if over:
+                new = max(lo, int(lim.limit * self.decrease_factor))
+            else:
+                new = min(hi, lim.limit + max(1, int(hi * self.additive_step)))
+            if new != lim.limit:
+                lim.set_limit(new)
+
+        if over:
+            self.decreases += 1
+            self._calm = 0
+            if self.shed_level < SHED_MAX:
+                self.shed_level += 1
+                logger.warning(f"🧯 [AIMD] over budget (lag={self.loop_lag_ms:.1f}ms decision={self.decision_ms:.1f}ms) -> shed level {self.shed_level}")
+        else:
+            self.increases += 1
+            self._calm += 1
+            if self.shed_level and self._calm >= self.calm_periods:
+                self.shed_level -= 1
+                self._calm = 0
+                logger.info(f"🧯 [AIMD] recovered -> shed level {self.shed_level}")
+
+    async def run(self):
+        logger.info("🎚️ AIMD Controller: Active")
+        asyncio.create_task(self._probe())
+        while True:
+            await asyncio.sleep(self.period)
+            try:
+                self.step()
+            except Exception as e:
+                logger.error(f"❌ [AIMD] step failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "limits": {n: {"limit": l.limit, "inflight": l.inflight, "waiting": len(l._waiters)} for n, l in self.limiters.items()},
+            "loop_lag_ms": round(self.loop_lag_ms, 2),
+            "decision_ms": round(self.decision_ms, 2),
+            "shed_level": self.shed_level,
+            "shed": dict(self.shed_counts),
+            "decreases": self.decreases,
+            "increases": self.increases,
+        }
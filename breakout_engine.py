@@ -3,10 +3,14 @@ import asyncio
 import logging
 from datetime import datetime
 from math import floor
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+import numpy as np
 import pytz
 
+from order_lane import run_order
 from redis_manager import TradeControl
+from trigger_book import ABOVE, BELOW
+from universe_store import WAITING
 
 logger = logging.getLogger("Nexus_Breakout")
 IST = pytz.timezone("Asia/Kolkata")
@@ -21,17 +25,17 @@ class BreakoutEngine:
       - run() is tick-fast (no candle aggregation here)
       - on_candle_close() is called by main.py candle_close_worker
       - Per-symbol atomic lock + daily cap via Redis (TradeControl helpers)
-      - Side-level trade cap (bull/bear) via Redis reserve_side_trade
+      - Side-level trade cap (bull/bear) checked in the same reserve_entry script
       - Rollback-safe reservations (if order fails)
+      - Entry / exit decided on the tick path; reservation + broker round trip
+        run on the per-token order lane (order_lane.py), never on a shard worker
       - Direction safety: bull -> BUY, bear -> SELL (hard-mapped)
       - Trade records never removed; marked CLOSED so PnL stays correct
       - Extensive logs for step-by-step debugging
 
     Required RedisManager methods (you said you want full Redis fix too):
-      - reserve_side_trade(side, limit) -> bool
-      - rollback_side_trade(side) -> bool
-      - reserve_symbol_trade(symbol, max_trades=2, lock_ttl_sec=...) -> (bool, reason)
-      - rollback_symbol_trade(symbol) -> bool
+      - reserve_entry(side, symbol, side_limit, symbol_max=2, lock_ttl=...) -> (bool, reason)
+      - rollback_entry(side, symbol) -> bool
       - release_symbol_lock(symbol) -> bool
       - get_symbol_trade_count(symbol) -> int
     """
@@ -40,6 +44,9 @@ class BreakoutEngine:
     TRIGGER_VALID_SECONDS = 6 * 60
     MAX_TRADES_PER_SYMBOL = 2
 
+    # Statuses for which main.py calls run() on ticks (TRIGGER_WATCH is served by the trigger book)
+    TICK_STATUSES = ("OPEN",)
+
     # -----------------------------
     # TICK FAST-PATH (called each tick)
     # -----------------------------
@@ -48,7 +55,7 @@ class BreakoutEngine:
         """
         Tick handler
           - Monitors OPEN
-          - Monitors TRIGGER_WATCH for entry
+          - TRIGGER_WATCH entry is handled by the trigger book (on_trigger)
           - Does NOT aggregate candles (main.py does that centrally)
         """
         stock = state["stocks"].get(token)
@@ -69,49 +76,68 @@ class BreakoutEngine:
             await BreakoutEngine.monitor_active_trade(stock, ltp, state)
             return
 
-        # 2) Trigger watch -> enter if break happens (TTL + gates)
-        if brk_status == "TRIGGER_WATCH":
-            side = (stock.get("brk_side_latch") or "").lower()
-            if side not in ("bull", "bear"):
-                logger.warning(f"[BRK] {symbol} invalid side_latch; resetting.")
-                BreakoutEngine._reset_waiting(stock)
-                return
+        # 2) TRIGGER_WATCH entries are driven by the trigger book (on_trigger)
+        # WAITING: nothing to do in tick path
+        return
 
-            # TTL check
-            now_ts = int(datetime.now(IST).timestamp())
-            set_ts = int(stock.get("brk_trigger_set_ts") or 0)
-            if set_ts and (now_ts - set_ts) > BreakoutEngine.TRIGGER_VALID_SECONDS:
-                logger.info(f"⏳ [BRK-EXPIRE] {symbol} {side.upper()} trigger expired (>6m). Reset.")
-                BreakoutEngine._reset_waiting(stock)
-                return
+    # -----------------------------
+    # TRIGGER BOOK CALLBACKS (called by main.py after each tick batch scan)
+    # -----------------------------
+    @staticmethod
+    async def on_trigger(token: int, side_key: str, ltp: float, state: dict):
+        """
+        Trigger book reported ltp crossed brk_trigger_px -> gates + entry.
+        """
+        stock = state["stocks"].get(token)
+        if not stock or stock.get("brk_status") != "TRIGGER_WATCH":
+            return
 
-            # Engine toggle gates new entry only
-            if not bool(state["engine_live"].get(side, True)):
-                return
+        symbol = stock.get("symbol") or ""
+        side = (stock.get("brk_side_latch") or "").lower()
+        if side not in ("bull", "bear") or side != side_key:
+            logger.warning(f"[BRK] {symbol} invalid side_latch; resetting.")
+            BreakoutEngine._reset_waiting(stock)
+            return
 
-            # Trade window gate
-            if not BreakoutEngine._within_trade_window(state["config"].get(side, {})):
-                logger.info(f"🕒 [BRK-WINDOW] {symbol} {side.upper()} outside trade window; reset.")
-                BreakoutEngine._reset_waiting(stock)
-                return
+        # TTL check
+        now_ts = int(datetime.now(IST).timestamp())
+        set_ts = int(stock.get("brk_trigger_set_ts") or 0)
+        if set_ts and (now_ts - set_ts) > BreakoutEngine.TRIGGER_VALID_SECONDS:
+            logger.info(f"⏳ [BRK-EXPIRE] {symbol} {side.upper()} trigger expired (>6m). Reset.")
+            BreakoutEngine._reset_waiting(stock)
+            return
 
-            trig = float(stock.get("brk_trigger_px", 0.0) or 0.0)
-            if trig <= 0:
-                BreakoutEngine._reset_waiting(stock)
-                return
+        # Engine toggle gates new entry only
+        if not bool(state["engine_live"].get(side, True)):
+            return
 
-            if side == "bull":
-                if float(ltp) > trig:
-                    logger.info(f"⚡ [BRK-TRIGGER] {symbol} BULL ltp {ltp:.2f} > {trig:.2f}")
-                    await BreakoutEngine.open_trade(stock, float(ltp), state, "bull")
-            else:
-                if float(ltp) < trig:
-                    logger.info(f"⚡ [BRK-TRIGGER] {symbol} BEAR ltp {ltp:.2f} < {trig:.2f}")
-                    await BreakoutEngine.open_trade(stock, float(ltp), state, "bear")
+        # Trade window gate
+        if not BreakoutEngine._within_trade_window(state["config"].get(side, {})):
+            logger.info(f"🕒 [BRK-WINDOW] {symbol} {side.upper()} outside trade window; reset.")
+            BreakoutEngine._reset_waiting(stock)
             return
 
-        # WAITING: nothing to do in tick path
-        return
+        trig = float(stock.get("brk_trigger_px", 0.0) or 0.0)
+        if trig <= 0:
+            BreakoutEngine._reset_waiting(stock)
+            return
+
+        if side == "bull":
+            if float(ltp) > trig:
+                logger.info(f"⚡ [BRK-TRIGGER] {symbol} BULL ltp {ltp:.2f} > {trig:.2f}")
+                await BreakoutEngine.open_trade(stock, float(ltp), state, "bull")
+        else:
+            if float(ltp) < trig:
+                logger.info(f"⚡ [BRK-TRIGGER] {symbol} BEAR ltp {ltp:.2f} < {trig:.2f}")
+                await BreakoutEngine.open_trade(stock, float(ltp), state, "bear")
+
+    @staticmethod
+    async def on_trigger_expire(token: int, side_key: str, state: dict):
+        stock = state["stocks"].get(token)
+        if not stock or stock.get("brk_status") != "TRIGGER_WATCH":
+            return
+        logger.info(f"⏳ [BRK-EXPIRE] {stock.get('symbol')} {str(side_key).upper()} trigger expired (>6m). Reset.")
+        BreakoutEngine._reset_waiting(stock)
 
     # -----------------------------
     # CANDLE CLOSE QUALIFICATION (called by main.py)
@@ -134,7 +160,7 @@ class BreakoutEngine:
         if (stock.get("brk_status") or "WAITING").upper() in ("OPEN", "TRIGGER_WATCH"):
             return
 
-        # If symbol already exhausted daily cap (Redis)
+        # If symbol already exhausted daily cap (local mirror of the Redis counts)
         try:
             taken = await TradeControl.get_symbol_trade_count(symbol)
             if int(taken) >= BreakoutEngine.MAX_TRADES_PER_SYMBOL:
@@ -151,7 +177,6 @@ class BreakoutEngine:
         high = float(candle.get("high", 0) or 0)
         low = float(candle.get("low", 0) or 0)
         close = float(candle.get("close", 0) or 0)
-        c_vol = int(candle.get("volume", 0) or 0)
         if close <= 0 or high <= 0 or low <= 0:
             return
 
@@ -178,20 +203,7 @@ class BreakoutEngine:
                 logger.info(f"❌ [BRK-REJECT] {symbol} BULL | {detail}")
                 return
 
-            # Set trigger watch
-            stock["brk_status"] = "TRIGGER_WATCH"
-            stock["brk_side_latch"] = "bull"
-            stock["brk_trigger_px"] = float(high)
-            stock["brk_trigger_set_ts"] = int(now.timestamp())
-            stock["brk_trigger_candle"] = dict(candle)
-
-            # Scanner enrichment (engine-specific)
-            stock["brk_scan_vol"] = int(c_vol)
-            stock["brk_scan_reason"] = f"PDH break + Vol OK ({detail})"
-            stock["brk_scan_seen_ts"] = None
-            stock["brk_scan_seen_time"] = None
-
-            logger.info(f"✅ [BRK-QUALIFIED] {symbol} BULL trigger@{high:.2f} {detail}")
+            BreakoutEngine._arm_trigger(stock, candle, "bull", detail, now, state)
             return
 
         # --- BEAR BREAKDOWN ---
@@ -214,20 +226,128 @@ class BreakoutEngine:
                 logger.info(f"❌ [BRK-REJECT] {symbol} BEAR | {detail}")
                 return
 
-            stock["brk_status"] = "TRIGGER_WATCH"
-            stock["brk_side_latch"] = "bear"
-            stock["brk_trigger_px"] = float(low)
-            stock["brk_trigger_set_ts"] = int(now.timestamp())
-            stock["brk_trigger_candle"] = dict(candle)
+            BreakoutEngine._arm_trigger(stock, candle, "bear", detail, now, state)
+            return
+
+
+    # -----------------------------
+    # BATCH QUALIFICATION (all candles closed in a minute)
+    # -----------------------------
+    @staticmethod
+    async def on_candle_close_batch(tokens: List[int], candles: List[dict], state: dict):
+        """
+        Vectorized on_candle_close for every candle closed in one minute.
+        PDH/PDL cross, range gate, turnover and volume-matrix masks are computed in
+        one NumPy pass over the batch; only survivors do per-symbol async work
+        (Redis trade-count check + arming).
+        """
+        u = state.get("universe")
+        if u is None:
+            for token, candle in zip(tokens, candles):
+                await BreakoutEngine.on_candle_close(token, candle, state)
+            return
+
+        rows = [(u.index[t], c) for t, c in zip(tokens, candles) if t in u.index]
+        if not rows:
+            return
 
-            stock["brk_scan_vol"] = int(c_vol)
-            stock["brk_scan_reason"] = f"PDL break + Vol OK ({detail})"
-            stock["brk_scan_seen_ts"] = None
-            stock["brk_scan_seen_time"] = None
+        idx = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        o = np.array([float(r[1].get("open", 0) or 0) for r in rows])
+        h = np.array([float(r[1].get("high", 0) or 0) for r in rows])
+        l = np.array([float(r[1].get("low", 0) or 0) for r in rows])
+        c = np.array([float(r[1].get("close", 0) or 0) for r in rows])
+        v = np.array([float(r[1].get("volume", 0) or 0) for r in rows])
+        pdh, pdl, sma = u.pdh[idx], u.pdl[idx], u.sma[idx]
 
-            logger.info(f"✅ [BRK-QUALIFIED] {symbol} BEAR trigger@{low:.2f} {detail}")
+        valid = (u.brk_status[idx] == WAITING) & (pdh > 0) & (pdl > 0) & (c > 0) & (h > 0) & (l > 0)
+        if not valid.any():
             return
 
+        with np.errstate(divide="ignore", invalid="ignore"):
+            small_range = ((h - l) / c) * 100.0 <= 0.5
+            gate = {
+                "bull": small_range | (((h - pdh) / pdh) * 100.0 <= 0.5),
+                "bear": small_range | (((pdl - l) / pdl) * 100.0 <= 0.5),
+            }
+        cross = {
+            "bull": valid & (c > pdh) & (o < pdh),
+            "bear": valid & (c < pdl) & (o > pdl),
+        }
+        cross["bear"] &= ~cross["bull"]
+        turnover_cr = (v * c) / 10000000.0
+
+        now = datetime.now(IST)
+        for side in ("bull", "bear"):
+            crossed = cross[side]
+            if not crossed.any():
+                continue
+            if not bool(state["engine_live"].get(side, True)):
+                logger.debug(f"[BRK] {int(crossed.sum())} {side} crosses skipped; engine OFF")
+                continue
+            cfg = state["config"].get(side, {})
+            if not BreakoutEngine._within_trade_window(cfg, now=now):
+                continue
+
+            vol_ok, vol_row = BreakoutEngine._vol_matrix_mask(cfg, sma, v, turnover_cr)
+            survivors = crossed & gate[side] & vol_ok
+
+            for k in np.flatnonzero(crossed):
+                stock = u.view(int(idx[k]))
+                symbol = stock.get("symbol") or ""
+                candle = rows[k][1]
+                if not symbol:
+                    continue
+                logger.info(f"🔍 [DATA-AUDIT] {symbol} | PDH: {pdh[k]} | PDL: {pdl[k]} | Candle Open: {o[k]} | Close: {c[k]}")
+                if not gate[side][k]:
+                    logger.info(f"❌ [BRK-REJECT] {symbol} {side.upper()} RangeGate fail")
+                    continue
+                if not survivors[k]:
+                    _, detail = await BreakoutEngine.check_vol_matrix(stock, candle, side, state)
+                    logger.info(f"❌ [BRK-REJECT] {symbol} {side.upper()} | {detail}")
+                    continue
+
+                # If symbol already exhausted daily cap (local mirror of the Redis counts)
+                try:
+                    taken = await TradeControl.get_symbol_trade_count(symbol)
+                    if int(taken) >= BreakoutEngine.MAX_TRADES_PER_SYMBOL:
+                        continue
+                except Exception as e:
+                    logger.warning(f"[BRK] {symbol} trade_count check failed: {e}")
+
+                # state may have moved while awaiting Redis
+                if stock.get("brk_status") != "WAITING":
+                    continue
+                detail = "NoMatrix" if vol_row is None else f"L{int(vol_row[k]) + 1} Pass (OR)"
+                BreakoutEngine._arm_trigger(stock, candle, side, detail, now, state)
+
+    @staticmethod
+    def _vol_matrix_mask(cfg: dict, sma: np.ndarray, vol: np.ndarray, turnover_cr: np.ndarray):
+        """
+        Vectorized check_vol_matrix (OR logic): returns (pass_mask, first_passing_row)
+        first_passing_row is None when no matrix is configured (everything passes).
+        """
+        matrix = cfg.get("volume_criteria", []) or []
+        levels = []
+        for level in matrix:
+            try:
+                levels.append((
+                    float(level.get("min_sma_avg", 0) or 0),
+                    float(level.get("sma_multiplier", 1.0) or 1.0),
+                    float(level.get("min_vol_price_cr", 0) or 0),
+                ))
+            except Exception:
+                levels.append((np.inf, 1.0, 0.0))  # unparsable row never applies
+
+        if not levels:
+            return np.ones(sma.shape[0], dtype=bool), None
+
+        m = np.array(levels, dtype=np.float64)
+        ok = (
+            (sma[:, None] >= m[None, :, 0])
+            & (vol[:, None] >= sma[:, None] * m[None, :, 1])
+            & (turnover_cr[:, None] >= m[None, :, 2])
+        )
+        return ok.any(axis=1), ok.argmax(axis=1)
     
     @staticmethod
     async def check_vol_matrix(stock: dict, candle: dict, side: str, state: dict):
@@ -304,23 +424,6 @@ class BreakoutEngine:
         # ✅ Direction hard-map (prevents wrong BUY/SELL)
         txn_type = kite.TRANSACTION_TYPE_BUY if side_key == "bull" else kite.TRANSACTION_TYPE_SELL
 
-        # -------------------- reservations (atomic) --------------------
-        side_limit = int(cfg.get("total_trades", 5) or 5)
-
-        # 1) reserve side trade (bull/bear) with cap
-        if not await TradeControl.reserve_side_trade(side_key, side_limit):
-            logger.warning(f"🚫 [BRK-LIMIT] {symbol} side limit hit for {side_key}")
-            BreakoutEngine._reset_waiting(stock)
-            return
-
-        # 2) reserve per-symbol lock + daily count (2/day, 2nd only after close)
-        ok, reason = await TradeControl.reserve_symbol_trade(symbol, max_trades=BreakoutEngine.MAX_TRADES_PER_SYMBOL)
-        if not ok:
-            logger.warning(f"🚫 [BRK-SYMBOL] {symbol} reserve failed: {reason}")
-            await TradeControl.rollback_side_trade(side_key)
-            BreakoutEngine._reset_waiting(stock)
-            return
-
         # # SL derived from trigger candle opposite extreme
         # trig_candle = stock.get("brk_trigger_candle") or {}
         # entry = float(ltp)
@@ -378,9 +481,7 @@ class BreakoutEngine:
         qty = floor(risk_amount / risk_per_share)
 
         if qty <= 0:
-            logger.warning(f"[BRK] {symbol} qty<=0 (risk calc). rollback reservations.")
-            await TradeControl.rollback_symbol_trade(symbol)
-            await TradeControl.rollback_side_trade(side_key)
+            logger.warning(f"[BRK] {symbol} qty<=0 (risk calc); reset.")
             BreakoutEngine._reset_waiting(stock)
             return
 
@@ -402,62 +503,88 @@ class BreakoutEngine:
 
         trail_step = float(risk_per_share * tsl_ratio) if tsl_ratio > 0 else float(risk_per_share)
 
-        # -------------------- place order --------------------
-        try:
-            logger.info(
-                f"🧾 [BRK-ORDER] {symbol} {side_key.upper()} "
-                f"txn={txn_type} qty={qty} entry={entry:.2f} sl={sl_px:.2f} tgt={target:.2f}"
-            )
+        # -------------------- decision (tick path) --------------------
+        # Position state flips now so the monitor / trigger book see it; the
+        # reservation and the broker round trip run on the order lane (per-token order).
+        trade = {
+            "engine": "breakout",
+            "side": side_key,
+            "symbol": symbol,
+            "qty": int(qty),
+            "entry_price": float(entry),
+            "sl_price": float(sl_px),
+            "target_price": float(target),
+            "order_id": None,
+            "pnl": 0.0,
+            "status": "PENDING",
+            "entry_time": datetime.now(IST).strftime("%H:%M:%S"),
+            "init_risk": float(risk_per_share),
+            "trail_step": float(trail_step),
+        }
+
+        stock["brk_status"] = "OPEN"
+        stock["brk_active_trade"] = trade
+        stock["brk_side_latch"] = side_key
+
+        # clear trigger state so we don't re-enter
+        stock.pop("brk_trigger_px", None)
+        stock["brk_trigger_set_ts"] = None
+
+        # scanner fields reset
+        stock["brk_scan_seen_ts"] = None
+        stock["brk_scan_seen_time"] = None
+
+        logger.info(
+            f"🧾 [BRK-ORDER] {symbol} {side_key.upper()} "
+            f"txn={txn_type} qty={qty} entry={entry:.2f} sl={sl_px:.2f} tgt={target:.2f}"
+        )
+        await run_order(state, stock["token"], BreakoutEngine._place_entry, stock, trade, state, txn_type, kite)
+
+    @staticmethod
+    async def _place_entry(stock: dict, trade: dict, state: dict, txn_type: str, kite):
+        """Order lane: reservation (side cap + symbol lock + daily count, one round trip) then the order."""
+        symbol, side_key = trade["symbol"], trade["side"]
+        cfg = state["config"].get(side_key, {}) or {}
+        side_limit = int(cfg.get("total_trades", 5) or 5)
+
+        ok, reason = await TradeControl.reserve_entry(side_key, symbol, side_limit, BreakoutEngine.MAX_TRADES_PER_SYMBOL)
+        if not ok:
+            if reason == "SIDE_LIMIT":
+                logger.warning(f"🚫 [BRK-LIMIT] {symbol} side limit hit for {side_key}")
+            else:
+                logger.warning(f"🚫 [BRK-SYMBOL] {symbol} reserve failed: {reason}")
+            BreakoutEngine._entry_failed(stock, trade)
+            return
 
+        try:
             order_id = await asyncio.to_thread(
                 kite.place_order,
                 variety=kite.VARIETY_REGULAR,
                 exchange=kite.EXCHANGE_NSE,
                 tradingsymbol=symbol,
                 transaction_type=txn_type,
-                quantity=int(qty),
+                quantity=int(trade["qty"]),
                 product=kite.PRODUCT_MIS,
                 order_type=kite.ORDER_TYPE_MARKET,
             )
-
-            trade = {
-                "engine": "breakout",
-                "side": side_key,
-                "symbol": symbol,
-                "qty": int(qty),
-                "entry_price": float(entry),
-                "sl_price": float(sl_px),
-                "target_price": float(target),
-                "order_id": order_id,
-                "pnl": 0.0,
-                "status": "OPEN",
-                "entry_time": datetime.now(IST).strftime("%H:%M:%S"),
-                "init_risk": float(risk_per_share),
-                "trail_step": float(trail_step),
-            }
-
-            # Keep trade record forever (do not remove)
-            state["trades"][side_key].append(trade)
-
-            stock["brk_status"] = "OPEN"
-            stock["brk_active_trade"] = trade
-            stock["brk_side_latch"] = side_key
-
-            # clear trigger state so we don't re-enter
-            stock.pop("brk_trigger_px", None)
-            stock["brk_trigger_set_ts"] = None
-
-            # scanner fields reset
-            stock["brk_scan_seen_ts"] = None
-            stock["brk_scan_seen_time"] = None
-
-            logger.info(f"🚀 [BRK-ENTRY] {symbol} {side_key.upper()} order={order_id} qty={qty}")
-
         except Exception as e:
             logger.error(f"❌ [BRK-ORDER-FAIL] {symbol}: {e}")
             # rollback reservations so attempts remain correct
-            await TradeControl.rollback_symbol_trade(symbol)
-            await TradeControl.rollback_side_trade(side_key)
+            await TradeControl.rollback_entry(side_key, symbol)
+            BreakoutEngine._entry_failed(stock, trade)
+            return
+
+        trade["order_id"] = order_id
+        if trade["status"] == "PENDING":
+            trade["status"] = "OPEN"
+        # Keep trade record forever (do not remove); an exit decided meanwhile follows on the lane
+        state["trades"][side_key].append(trade)
+        logger.info(f"🚀 [BRK-ENTRY] {symbol} {side_key.upper()} order={order_id} qty={trade['qty']}")
+
+    @staticmethod
+    def _entry_failed(stock: dict, trade: dict):
+        trade["status"] = "FAILED"
+        if stock.get("brk_active_trade") is trade:
             BreakoutEngine._reset_waiting(stock)
 
     # -----------------------------
@@ -556,7 +683,18 @@ class BreakoutEngine:
         if kite:
             txn_type = kite.TRANSACTION_TYPE_SELL if is_bull else kite.TRANSACTION_TYPE_BUY
 
-        if trade and kite and symbol and txn_type:
+        if trade:
+            trade["status"] = "CLOSED"
+            trade["exit_time"] = datetime.now(IST).strftime("%H:%M:%S")
+            trade["exit_reason"] = reason
+
+        BreakoutEngine._reset_waiting(stock)
+        # exit order + lock release on the order lane, after this token's entry
+        await run_order(state, stock.get("token"), BreakoutEngine._place_exit, trade, symbol, reason, txn_type, kite)
+
+    @staticmethod
+    async def _place_exit(trade: Optional[dict], symbol: str, reason: str, txn_type: Optional[str], kite):
+        if trade and trade.get("order_id") and kite and symbol and txn_type:
             try:
                 logger.info(f"🏁 [BRK-EXIT] {symbol} reason={reason} qty={trade.get('qty')} txn={txn_type}")
                 exit_id = await asyncio.to_thread(
@@ -573,23 +711,43 @@ class BreakoutEngine:
             except Exception as e:
                 logger.error(f"❌ [BRK-EXIT-FAIL] {symbol}: {e}")
 
-        if trade:
-            trade["status"] = "CLOSED"
-            trade["exit_time"] = datetime.now(IST).strftime("%H:%M:%S")
-            trade["exit_reason"] = reason
-
-        # release open lock so second trade can occur
-        if symbol:
+        # release open lock so second trade can occur (a failed entry already rolled it back)
+        if symbol and not (trade and trade.get("status") == "FAILED"):
             try:
                 await TradeControl.release_symbol_lock(symbol)
             except Exception as e:
                 logger.warning(f"[BRK] {symbol} release lock failed: {e}")
 
-        BreakoutEngine._reset_waiting(stock)
-
     # -----------------------------
     # HELPERS
     # -----------------------------
+    @staticmethod
+    def _arm_trigger(stock: dict, candle: dict, side: str, detail: str, now: datetime, state: dict):
+        """Qualified candle -> TRIGGER_WATCH at candle high (bull) / low (bear)."""
+        symbol = stock.get("symbol") or ""
+        px = float(candle.get("high", 0) or 0) if side == "bull" else float(candle.get("low", 0) or 0)
+
+        stock["brk_status"] = "TRIGGER_WATCH"
+        stock["brk_side_latch"] = side
+        stock["brk_trigger_px"] = px
+        stock["brk_trigger_set_ts"] = int(now.timestamp())
+        stock["brk_trigger_candle"] = dict(candle)
+
+        # Scanner enrichment (engine-specific)
+        stock["brk_scan_vol"] = int(candle.get("volume", 0) or 0)
+        stock["brk_scan_reason"] = f"{'PDH break' if side == 'bull' else 'PDL break'} + Vol OK ({detail})"
+        stock["brk_scan_seen_ts"] = None
+        stock["brk_scan_seen_time"] = None
+
+        u = state.get("universe")
+        if u is not None:
+            i = u.index[stock["token"]]
+            u.triggers.disarm("brk", i)
+            u.triggers.arm("brk", i, ABOVE if side == "bull" else BELOW, px, side,
+                           expiry=now.timestamp() + BreakoutEngine.TRIGGER_VALID_SECONDS)
+
+        logger.info(f"✅ [BRK-QUALIFIED] {symbol} {side.upper()} trigger@{px:.2f} {detail}")
+
     @staticmethod
     def _reset_waiting(stock: dict):
         stock["brk_status"] = "WAITING"
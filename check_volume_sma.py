@@ -22,18 +22,22 @@ def filter_high_volume_stocks():
         
         # Verify connection
         r.ping()
+
+        # Live universe snapshot (written by sync_market_data) if there is one
+        version = r.get('nexus:universe:current')
+        hash_key = f'nexus:universe:v{version}:market' if version else HASH_KEY
         
         count = 0
         total_stocks = 0
         high_sma_stocks = []
         
-        print(f"Connected to Redis. Analyzing Hash: {HASH_KEY}")
+        print(f"Connected to Redis. Analyzing Hash: {hash_key}")
         print(f"Threshold: SMA > {SMA_THRESHOLD}")
         print("-" * 50)
 
         # Use hscan_iter to safely iterate over the Hash without blocking Redis
         # It yields (field, value) pairs
-        for token, data_raw in r.hscan_iter(HASH_KEY):
+        for token, data_raw in r.hscan_iter(hash_key):
             total_stocks += 1
             
             try:
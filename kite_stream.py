@@ -0,0 +1,350 @@
+# kite_stream.py
+"""
+Nexus Native Kite Stream (asyncio, no Twisted)
+
+✅ Runs on the main event loop (no reactor thread, no call_soon_threadsafe)
+✅ Parses Kite binary frames with memoryview + struct.unpack_from, and a
+   NumPy structured dtype over the whole frame when all packets share a mode
+✅ Extracts only what the engines use:
+      (instrument_token, last_price, volume_traded, exchange_ts_epoch)
+✅ Reconnect with exponential backoff + automatic resubscribe (tokens + modes)
+✅ Testable against a local WebSocket server (url=..., serve_replay())
+
+Kite binary frame:
+  [2B packet count] then per packet [2B length][packet]
+  packet lengths: 8 (ltp), 28/32 (index quote/full), 44 (quote), 184 (full)
+"""
+
+import asyncio
+import json
+import logging
+import struct
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import websockets
+
+logger = logging.getLogger("Nexus_KiteStream")
+
+MODE_LTP = "ltp"
+MODE_QUOTE = "quote"
+MODE_FULL = "full"
+
+# segment = token & 0xff
+_SEG_CDS = 3
+_SEG_BCD = 6
+_SEG_NCO = 12
+
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+
+# offsets inside a packet: (volume_offset, timestamp_offset); None == not present
+_PACKET_LAYOUT: Dict[int, Tuple[Optional[int], Optional[int]]] = {
+    8: (None, None),
+    28: (None, None),
+    32: (None, 28),
+    44: (16, None),
+    184: (16, 60),
+}
+
+# compact tick: (instrument_token, last_price, volume_traded, exchange_ts_epoch)
+Tick = Tuple[int, float, int, float]
+
+
+def _divisor(token: int) -> float:
+    seg = token & 0xFF
+    if seg == _SEG_CDS:
+        return 10000000.0
+    if seg in (_SEG_BCD, _SEG_NCO):
+        return 10000.0
+    return 100.0
+
+
+def _uniform_dtype(plen: int) -> np.dtype:
+    vol_off, ts_off = _PACKET_LAYOUT[plen]
+    names, formats, offsets = ["len", "token", "ltp"], [">u2", ">u4", ">u4"], [0, 2, 6]
+    if vol_off is not None:
+        names.append("vol"); formats.append(">u4"); offsets.append(2 + vol_off)
+    if ts_off is not None:
+        names.append("ts"); formats.append(">u4"); offsets.append(2 + ts_off)
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": plen + 2})
+
+
+_UNIFORM_DTYPES = {plen: _uniform_dtype(plen) for plen in _PACKET_LAYOUT}
+
+
+def parse_frame(buf: bytes) -> List[Tick]:
+    """
+    Binary frame -> compact ticks. Heartbeats (1 byte) return [].
+    Unknown packet lengths are skipped.
+    """
+    mv = memoryview(buf)
+    if len(mv) < 4:
+        return []
+    n = _U16.unpack_from(mv, 0)[0]
+    if n == 0:
+        return []
+
+    # Fast path: every packet has the same length -> one structured view over the frame
+    plen = _U16.unpack_from(mv, 2)[0]
+    if plen in _UNIFORM_DTYPES and len(mv) == 2 + n * (plen + 2):
+        arr = np.frombuffer(buf, dtype=_UNIFORM_DTYPES[plen], count=n, offset=2)
+        if bool((arr["len"] == plen).all()):
+            tokens = arr["token"].astype(np.int64)
+            seg = tokens & 0xFF
+            div = np.where(seg == _SEG_CDS, 10000000.0, np.where((seg == _SEG_BCD) | (seg == _SEG_NCO), 10000.0, 100.0))
+            ltp = arr["ltp"] / div
+            names = arr.dtype.names
+            vol = arr["vol"].astype(np.int64).tolist() if "vol" in names else [0] * n
+            ts = arr["ts"].astype(np.float64).tolist() if "ts" in names else [0.0] * n
+            return list(zip(tokens.tolist(), ltp.tolist(), vol, ts))
+
+    # Mixed frame: walk packets with unpack_from (no slicing copies)
+    out: List[Tick] = []
+    off = 2
+    end = len(mv)
+    for _ in range(n):
+        if off + 2 > end:
+            break
+        plen = _U16.unpack_from(mv, off)[0]
+        p = off + 2
+        off = p + plen
+        layout = _PACKET_LAYOUT.get(plen)
+        if layout is None or off > end:
+            continue
+        token = _U32.unpack_from(mv, p)[0]
+        ltp = _U32.unpack_from(mv, p + 4)[0] / _divisor(token)
+        vol_off, ts_off = layout
+        vol = _U32.unpack_from(mv, p + vol_off)[0] if vol_off is not None else 0
+        ts = float(_U32.unpack_from(mv, p + ts_off)[0]) if ts_off is not None else 0.0
+        out.append((token, ltp, vol, ts))
+    return out
+
+
+def pack_frame(ticks: Iterable[Tick], mode: str = MODE_QUOTE, index: bool = False) -> bytes:
+    """Builds a Kite-format binary frame (replay / local testing helper); index=True packs index packets."""
+    plen = ({MODE_LTP: 8, MODE_QUOTE: 28, MODE_FULL: 32} if index else {MODE_LTP: 8, MODE_QUOTE: 44, MODE_FULL: 184})[mode]
+    vol_off, ts_off = _PACKET_LAYOUT[plen]
+    parts = []
+    ticks = list(ticks)
+    for token, ltp, vol, ts in ticks:
+        pkt = bytearray(plen)
+        _U32.pack_into(pkt, 0, int(token))
+        _U32.pack_into(pkt, 4, int(round(float(ltp) * _divisor(int(token)))))
+        if vol_off is not None:
+            _U32.pack_into(pkt, vol_off, int(vol))
+        if ts_off is not None:
+            _U32.pack_into(pkt, ts_off, int(ts))
+        parts.append(_U16.pack(plen) + bytes(pkt))
+    return _U16.pack(len(ticks)) + b"".join(parts)
+
+
+class AsyncKiteTicker:
+    """
+    Minimal KiteTicker replacement on asyncio.
+
+    on_ticks(recv_ts, ticks) is called on the event loop with compact ticks.
+    on_connect(ticker) / on_close(ticker, reason) are optional sync callbacks.
+    """
+
+    ROOT_URI = "wss://ws.kite.trade"
+    MODE_LTP = MODE_LTP
+    MODE_QUOTE = MODE_QUOTE
+    MODE_FULL = MODE_FULL
+
+    def __init__(
+        self,
+        api_key: str,
+        access_token: str,
+        on_ticks: Callable[[float, List[Tick]], None],
+        *,
+        url: Optional[str] = None,
+        on_connect: Optional[Callable] = None,
+        on_close: Optional[Callable] = None,
+        reconnect_max_delay: float = 60.0,
+        reconnect_min_delay: float = 1.0,
+        name: str = "kite-ws",
+    ):
+        self.url = url or f"{self.ROOT_URI}?api_key={api_key}&access_token={access_token}"
+        self.on_ticks = on_ticks
+        self.on_connect = on_connect
+        self.on_close = on_close
+        self.reconnect_max_delay = float(reconnect_max_delay)
+        self.reconnect_min_delay = float(reconnect_min_delay)
+        self.name = name
+
+        self.modes: Dict[int, str] = {}  # token -> mode (source of truth for resubscribe)
+        self.connected = False
+        self.reconnects = 0
+        self.frames = 0
+        self.ticks = 0
+        self.last_tick_ts = 0.0
+        self.last_msg_ts = 0.0  # any frame, heartbeats included
+
+        self._ws = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    # -----------------------------
+    # LIFECYCLE
+    # -----------------------------
+    def connect(self) -> asyncio.Task:
+        """Starts the connect/read/reconnect loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    def close(self):
+        self._closing = True
+        if self._ws is not None:
+            asyncio.ensure_future(self._ws.close())
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        delay = self.reconnect_min_delay
+        while not self._closing:
+            try:
+                async with websockets.connect(self.url, max_size=None, ping_interval=20, ping_timeout=20) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    delay = self.reconnect_min_delay
+                    await self._resubscribe()
+                    logger.info(f"📡 [{self.name}] connected ({len(self.modes)} tokens)")
+                    if self.on_connect:
+                        self.on_connect(self)
+                    async for msg in ws:
+                        if isinstance(msg, (bytes, bytearray, memoryview)):
+                            self._on_binary(msg)
+                        else:
+                            self._on_text(msg)
+                reason = "closed"
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                reason = str(e)
+                logger.warning(f"⚠️ [{self.name}] websocket error: {e}")
+            finally:
+                self._ws = None
+                if self.connected and self.on_close:
+                    try:
+                        self.on_close(self, "disconnected")
+                    except Exception:
+                        pass
+                self.connected = False
+
+            if self._closing:
+                break
+            self.reconnects += 1
+            logger.info(f"🔁 [{self.name}] reconnecting in {delay:.1f}s ({reason})")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max_delay)
+
+    # -----------------------------
+    # MESSAGES
+    # -----------------------------
+    def _on_binary(self, msg):
+        recv_ts = self.last_msg_ts = time.time()
+        ticks = parse_frame(bytes(msg) if isinstance(msg, memoryview) else msg)
+        if not ticks:
+            return  # heartbeat
+        self.frames += 1
+        self.ticks += len(ticks)
+        self.last_tick_ts = recv_ts
+        try:
+            self.on_ticks(recv_ts, ticks)
+        except Exception as e:
+            logger.error(f"❌ [{self.name}] on_ticks failed: {e}")
+
+    def _on_text(self, msg: str):
+        try:
+            data = json.loads(msg)
+        except Exception:
+            return
+        if data.get("type") == "error":
+            logger.error(f"❌ [{self.name}] server error: {data.get('data')}")
+
+    # -----------------------------
+    # SUBSCRIPTIONS (recorded, then sent if connected)
+    # -----------------------------
+    def subscribe(self, tokens: Iterable[int], mode: str = MODE_QUOTE):
+        tokens = [int(t) for t in tokens]
+        if not tokens:
+            return
+        for t in tokens:
+            self.modes[t] = mode
+        self._send({"a": "subscribe", "v": tokens})
+        self._send({"a": "mode", "v": [mode, tokens]})
+
+    def unsubscribe(self, tokens: Iterable[int]):
+        tokens = [int(t) for t in tokens if int(t) in self.modes]
+        if not tokens:
+            return
+        for t in tokens:
+            self.modes.pop(t, None)
+        self._send({"a": "unsubscribe", "v": tokens})
+
+    def set_mode(self, mode: str, tokens: Iterable[int]):
+        tokens = [int(t) for t in tokens if int(t) in self.modes]
+        if not tokens:
+            return
+        for t in tokens:
+            self.modes[t] = mode
+        self._send({"a": "mode", "v": [mode, tokens]})
+
+    def _send(self, payload: dict):
+        ws = self._ws
+        if ws is None:
+            return  # applied from self.modes on (re)connect
+        asyncio.ensure_future(self._safe_send(ws, json.dumps(payload)))
+
+    async def _safe_send(self, ws, text: str):
+        try:
+            await ws.send(text)
+        except Exception as e:
+            logger.warning(f"⚠️ [{self.name}] send failed: {e}")
+
+    async def _resubscribe(self):
+        by_mode: Dict[str, List[int]] = {}
+        for t, m in self.modes.items():
+            by_mode.setdefault(m, []).append(t)
+        ws = self._ws
+        for mode, tokens in by_mode.items():
+            await ws.send(json.dumps({"a": "subscribe", "v": tokens}))
+            await ws.send(json.dumps({"a": "mode", "v": [mode, tokens]}))
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "connected": self.connected,
+            "tokens": len(self.modes),
+            "reconnects": self.reconnects,
+            "frames": self.frames,
+            "ticks": self.ticks,
+            "last_tick_age_s": round(time.time() - self.last_tick_ts, 2) if self.last_tick_ts else None,
+            "last_msg_age_s": round(time.time() - self.last_msg_ts, 2) if self.last_msg_ts else None,
+        }
+
+
+async def serve_replay(
+    frames: List[bytes], host: str = "127.0.0.1", port: int = 0, interval: float = 0.0, drop_after: Optional[float] = None,
+):
+    """
+    Local WebSocket server that replays captured binary frames to every client,
+    for exercising AsyncKiteTicker without Kite: AsyncKiteTicker(..., url=f"ws://{host}:{port}").
+    drop_after=s closes each connection s seconds after the last frame (exercises reconnect).
+    Returns the server; the bound port is server.sockets[0].getsockname()[1].
+    """
+    async def _handler(ws):
+        for frame in frames:
+            await ws.send(frame)
+            if interval:
+                await asyncio.sleep(interval)
+        if drop_after is not None:
+            await asyncio.sleep(drop_after)
+            await ws.close()
+        await ws.wait_closed()
+
+    return await websockets.serve(_handler, host, port)
@@ -0,0 +1,58 @@
+# latency_histogram.py
+"""
+Nexus Latency Histogram
+
+✅ Fixed millisecond buckets, O(log buckets) record, no allocation per sample
+✅ snapshot() -> counts per bucket + approximate p50 / p90 / p99 + max
+"""
+
+import bisect
+from typing import Dict, Sequence
+
+DEFAULT_EDGES_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class LatencyHistogram:
+    def __init__(self, edges_ms: Sequence[float] = DEFAULT_EDGES_MS):
+        self.edges = tuple(float(e) for e in edges_ms)
+        self.counts = [0] * (len(self.edges) + 1)  # last bucket == above the top edge
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float):
+        self.counts[bisect.bisect_left(self.edges, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def quantile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-quantile (max_ms for the overflow bucket)."""
+        if not self.total:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for k, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.edges[k] if k < len(self.edges) else self.max_ms
+        return self.max_ms
+
+    def reset(self):
+        self.counts = [0] * (len(self.edges) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def snapshot(self) -> Dict[str, object]:
+        labels = [f"<={e:g}ms" for e in self.edges] + [f">{self.edges[-1]:g}ms"]
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 3) if self.total else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p90_ms": self.quantile(0.90),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
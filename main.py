@@ -5,8 +5,8 @@ import json
 import time
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
-from collections import defaultdict
 
+import numpy as np
 import pytz
 from fastapi import FastAPI, Request, Query
 from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
@@ -14,7 +14,16 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from kiteconnect import KiteConnect, KiteTicker
 
-from redis_manager import TradeControl
+from redis_manager import TradeControl, RING_EVENTS_CHANNEL
+from ticker_pool import TickerPool
+from latency_histogram import LatencyHistogram
+from adaptive_limits import AdaptiveLimiter, AimdController, SHED_FLAT, SHED_INTRABAR
+from order_lane import OrderLane
+from tick_handoff import TickHandoff
+from tick_ring import TickRing
+from subscription_manager import SubscriptionManager
+from universe_pruner import UniversePruner
+from universe_store import UniverseStore, WAITING, TRIGGER_WATCH, OPEN, NO_BUCKET
 from breakout_engine import BreakoutEngine
 from momentum_engine import MomentumEngine
 
@@ -82,13 +91,34 @@ DEFAULT_CONFIG: Dict[str, Dict[str, Any]] = {
 # -----------------------------
 RAM_STATE: Dict[str, Any] = {
     "main_loop": None,
-    "tick_queue": None,
+    "tick_handoff": None,
     "kite": None,
     "kws": None,
+    "native_ws": os.getenv("KITE_NATIVE_WS", "0") == "1",  # asyncio client (kite_stream) instead of KiteTicker
+    "ws_connections": int(os.getenv("KITE_WS_CONNECTIONS", "0")),  # 0 == one per 3000 tokens + a spare; capped at 3
+    "ws_standby": os.getenv("KITE_WS_STANDBY", "0") == "1",  # extra connection mirroring open / armed tokens
+    "feed_stale_sec": float(os.getenv("FEED_STALE_SEC", "5")),  # no message for this long == feed down
+    "adaptive_modes": os.getenv("ADAPTIVE_SUB_MODES", "1") == "1",  # QUOTE for idle tokens, FULL when armed/open
+    "subs": None,
+    "prune_universe": os.getenv("UNIVERSE_PRUNE", "1") == "1",  # unsubscribe tokens that cannot trade today
+    "pruner": None,
+
+    # Shared-memory tick ring: this process ingests, strategy_host.py processes consume
+    "ring_consumers": [c.strip() for c in os.getenv("TICK_RING_CONSUMERS", "").split(",") if c.strip()],  # e.g. "brk,mom"
+    "ring_name": os.getenv("TICK_RING_NAME", "nexus_ticks"),
+    "ring_capacity": int(os.getenv("TICK_RING_CAPACITY", str(1 << 20))),  # 48-byte records
+    "tick_ring": None,
+    # Ring mode state from the hosts (statuses mirrored into the universe, trades for the UI)
+    "ring_trades": {},  # slot -> {side: [trade, ...]}
+    "ring_sync": {"status_events": 0, "resyncs": 0, "control_sent": 0},
+    # Engines run in this process (default: those not hosted on the ring)
+    "engines": set(e.strip() for e in os.getenv("TICK_ENGINES", "brk,mom").split(",") if e.strip()),
     "api_key": "",
     "api_secret": "",
     "access_token": "",
     "stocks": {},
+    "universe": None,
+    "universe_load_ms": 0.0,  # startup: Redis read + decode + columnar build
     "trades": {"bull": [], "bear": [], "mom_bull": [], "mom_bear": []},
     "engine_live": {"bull": True, "bear": True, "mom_bull": True, "mom_bear": True},
     "config": {k: dict(v) for k, v in DEFAULT_CONFIG.items()},
@@ -96,13 +126,36 @@ RAM_STATE: Dict[str, Any] = {
     "data_connected": {"breakout": False, "momentum": False},
 
     # Parallel Processing Infrastructure
-    "token_locks": defaultdict(asyncio.Lock),
-    "engine_sem": None, 
-    "inflight": set(),
-    "max_inflight": 5000,
+    "orders": None,  # OrderLane: entry / exit order I/O off the shard workers
+    "max_inflight": 5000,  # upper bound; live limit is RAM_STATE["inflight"].limit
+    "inflight": None,
+    "aimd": None,
+    # Stale-tick guard on the entry path (exits are never gated)
+    "stale_tick_max_age_sec": float(os.getenv("STALE_TICK_MAX_AGE_MS", "1000")) / 1000.0,
+    "stale_exch_lag_sec": float(os.getenv("STALE_EXCH_LAG_MS", "3000")) / 1000.0,
+    "trigger_refire_sec": float(os.getenv("TRIGGER_REFIRE_MS", "1000")) / 1000.0,
+    "stale_entries": {"brk": {"rejected": 0, "rechecked": 0}, "mom": {"rejected": 0, "rechecked": 0}},
+    "loop_lag_budget_ms": float(os.getenv("AIMD_LAG_BUDGET_MS", "20")),
+    "decision_budget_ms": float(os.getenv("AIMD_DECISION_BUDGET_MS", "100")),
+    "tick_shards": int(os.getenv("TICK_SHARDS", "8")),
+    "shards": [],
+    "lane_latency": {"hi": LatencyHistogram(), "bulk": LatencyHistogram()},  # enqueue -> handler done
     "candle_close_queue": None,
-    "tick_batches_dropped": 0,
-    "tick_batches_enqueued": 0,
+    "candles": None,
+    "tick_queue_capacity": 10000,  # pending batches before overflow merging kicks in
+
+    # Tick Coalescing (latest LTP per token per drain cycle)
+    "tick_coalesce": os.getenv("TICK_COALESCE", "1") == "1",
+    "ticks_coalesced": 0,
+    "engine_evals_skipped": 0,
+    "extreme_evals": 0,  # OPEN-position checks at a coalesced entry's high/low
+
+    # Minute-boundary candle sweeper
+    # exchange timestamps have 1 s resolution: a tick stamped :59 may be sent up to :59.999,
+    # so the grace covers that second plus transit before the minute is swept
+    "candle_close_grace_sec": max(1.0, float(os.getenv("CANDLE_CLOSE_GRACE_MS", "1250")) / 1000.0),
+    "candle_close_stats": {"last_ms": 0.0, "max_ms": 0.0, "sweeps": 0, "swept": 0, "tick_closed": 0, "late_ticks": 0, "htf_swept": 0},
+    "candle_swept_bucket": NO_BUCKET,  # bucket_now of the last sweep; HTF periods ending by it are complete
 }
 
 # -----------------------------
@@ -119,10 +172,20 @@ def _safe_int(x, default=0) -> int:
     try: return int(x)
     except: return default
 
+def _all_trades() -> Dict[str, list]:
+    """Local trades plus those the strategy hosts last saved (ring mode)."""
+    if not RAM_STATE["ring_trades"]: return RAM_STATE["trades"]
+    out = {side: list(arr) for side, arr in RAM_STATE["trades"].items()}
+    for trades in RAM_STATE["ring_trades"].values():
+        for side, arr in trades.items():
+            out.setdefault(side, []).extend(arr)
+    return out
+
 def _compute_pnl() -> Dict[str, float]:
     pnl = {k: 0.0 for k in ["bull", "bear", "mom_bull", "mom_bear"]}
+    trades = _all_trades()
     for side in pnl:
-        pnl[side] = float(sum(float(t.get("pnl", 0.0) or 0.0) for t in RAM_STATE["trades"].get(side, [])))
+        pnl[side] = float(sum(float(t.get("pnl", 0.0) or 0.0) for t in trades.get(side, [])))
     pnl["total"] = float(sum(pnl[s] for s in ["bull", "bear", "mom_bull", "mom_bear"]))
     return pnl
 
@@ -132,117 +195,801 @@ def _trade_is_open(t: dict) -> bool:
 # -----------------------------
 # LATENCY FIX: CENTRALIZED CANDLE AGGREGATOR
 # -----------------------------
-def _update_1m_candle(stock: dict, ltp: float, cum_vol: int) -> Optional[dict]:
-    now = _now_ist()
-    bucket = now.replace(second=0, microsecond=0)
-    c = stock.get("candle_1m")
-    last_cum = int(stock.get("candle_last_cum_vol", 0) or 0)
+def _update_1m_candle(u: UniverseStore, i: int, bucket: int, ltp: float, cum_vol: int, high: Optional[float] = None, low: Optional[float] = None, first: Optional[float] = None, first_vol: Optional[int] = None) -> Optional[dict]:
+    """
+    Works directly on the universe candle columns of row i.
+    bucket is the integer epoch minute of the tick (exchange time, see _tick_bucket);
+    no datetime is built on this path.
+    high/low/first carry the intra-batch extremes and first price when ticks were coalesced,
+    so candle OHLC stays exact even though only the latest LTP is evaluated; first_vol is
+    the cum volume of the entry's first tick, so volume traded inside an entry that opens
+    a candle is counted exactly as per-tick processing would count it.
+
+    Late ticks (bucket already closed by the sweeper or a newer tick) never reopen
+    or modify the closed candle: their price is ignored for OHLC and their volume
+    is carried into the next candle (c_last_cum is left untouched, and a candle
+    opens with cum_vol - c_last_cum whenever a previous cum volume is known).
+    """
+    cur = int(u.c_bucket[i])
+    last_cum = int(u.c_last_cum[i])
 
-    if not c:
-        stock["candle_1m"] = {"bucket": bucket, "open": ltp, "high": ltp, "low": ltp, "close": ltp, "volume": 0}
-        stock["candle_last_cum_vol"] = cum_vol
+    if bucket < cur or (cur == NO_BUCKET and bucket <= u.c_closed_bucket[i]):
+        RAM_STATE["candle_close_stats"]["late_ticks"] += 1
         return None
 
-    if c["bucket"] != bucket:
-        closed = dict(c)
-        stock["candle_1m"] = {"bucket": bucket, "open": ltp, "high": ltp, "low": ltp, "close": ltp, "volume": 0}
-        stock["candle_last_cum_vol"] = cum_vol
+    hi = ltp if high is None else max(high, ltp)
+    lo = ltp if low is None else min(low, ltp)
+
+    if cur == NO_BUCKET or cur != bucket:
+        closed = None
+        if cur != NO_BUCKET:
+            closed = u.candle_dict(i)
+            u.c_closed_bucket[i] = cur
+            _record_close_latency(bucket)
+            RAM_STATE["candle_close_stats"]["tick_closed"] += 1
+        u.c_bucket[i] = bucket
+        u.c_open[i] = ltp if first is None else first
+        u.c_high[i] = hi
+        u.c_low[i] = lo
+        u.c_close[i] = ltp
+        base = last_cum if last_cum > 0 else (cum_vol if first_vol is None else int(first_vol))
+        u.c_volume[i] = max(0, cum_vol - base)
+        u.c_last_cum[i] = cum_vol
         return closed
 
-    c["high"] = max(c["high"], ltp)
-    c["low"] = min(c["low"], ltp)
-    c["close"] = ltp
+    if hi > u.c_high[i]: u.c_high[i] = hi
+    if lo < u.c_low[i]: u.c_low[i] = lo
+    u.c_close[i] = ltp
     if last_cum > 0:
-        c["volume"] += max(0, cum_vol - last_cum)
-    stock["candle_last_cum_vol"] = cum_vol
+        u.c_volume[i] += max(0, cum_vol - last_cum)
+    u.c_last_cum[i] = cum_vol
     return None
 
 # -----------------------------
-# LATENCY FIX: PARALLEL TICK PIPELINE
-# -----------------------------
-async def _process_tick_task(token: int, ltp: float, vol: int):
-    sem = RAM_STATE["engine_sem"]
-    lock = RAM_STATE["token_locks"][token]
-    async with sem:
-        async with lock:
-            stock = RAM_STATE["stocks"].get(token)
-            if not stock: return
-            stock["ltp"] = ltp
-            stock["last_update_ts"] = time.time()
-
-            # 1. Update Candle (Fast)
-            closed = _update_1m_candle(stock, ltp, vol)
-            if closed:
-                RAM_STATE["candle_close_queue"].put_nowait((token, closed))
-
-            # 2. Parallel Engine Run
-            await asyncio.gather(
-                BreakoutEngine.run(token, ltp, vol, RAM_STATE),
-                MomentumEngine.run(token, ltp, vol, RAM_STATE),
-                return_exceptions=True
-            )
+# LATENCY FIX: MINUTE-BOUNDARY CANDLE SWEEPER
+# -----------------------------
+def _record_close_latency(open_bucket: int):
+    """open_bucket is the first minute after the closed candle, i.e. its boundary."""
+    st = RAM_STATE["candle_close_stats"]
+    lat_ms = max(0.0, (time.time() - open_bucket * 60) * 1000.0)
+    st["last_ms"] = round(lat_ms, 2)
+    if lat_ms > st["max_ms"]: st["max_ms"] = round(lat_ms, 2)
 
-async def tick_worker_parallel():
-    q = RAM_STATE["tick_queue"]
-    inflight = RAM_STATE["inflight"]
-    logger.info("🧵 Parallel Tick Worker: Active")
+def _sweep_open_candles(u: UniverseStore, bucket_now: int) -> List[Tuple[int, dict]]:
+    """Closes every open candle whose bucket is before bucket_now, in one pass."""
+    idxs = np.flatnonzero((u.c_bucket != NO_BUCKET) & (u.c_bucket < bucket_now))
+    if idxs.size == 0:
+        return []
+    closed = [(int(u.tokens[i]), u.candle_dict(int(i))) for i in idxs]
+    u.c_closed_bucket[idxs] = u.c_bucket[idxs]
+    u.c_bucket[idxs] = NO_BUCKET
+    return closed
+
+def _next_sweep_ts(now: float) -> float:
+    """Epoch at which the minute running at `now` is swept: its boundary plus the close grace."""
+    return (int(now) // 60 + 1) * 60 + RAM_STATE["candle_close_grace_sec"]
+
+async def candle_sweeper():
+    """Fires at every IST minute boundary (+grace) and hands all open candles to the engines."""
+    logger.info("🧹 Candle Sweeper: Active")
+    st = RAM_STATE["candle_close_stats"]
+    while True:
+        now = time.time()
+        await asyncio.sleep(_next_sweep_ts(now) - now)
+        u: Optional[UniverseStore] = RAM_STATE["universe"]
+        if u is None: continue
+        bucket_now = int(time.time()) // 60
+        closed = _sweep_open_candles(u, bucket_now)
+        if closed:
+            _record_close_latency(bucket_now)
+            st["sweeps"] += 1
+            st["swept"] += len(closed)
+        # queued even when empty: the worker closes due HTF bars after this minute's 1m closes
+        try:
+            RAM_STATE["candle_close_queue"].put_nowait(closed)
+        except asyncio.QueueFull:
+            await RAM_STATE["candle_close_queue"].put(closed)
+        RAM_STATE["candle_swept_bucket"] = bucket_now  # after the put: the worker sees the bucket only with its candles
+
+# -----------------------------
+# MULTI-TIMEFRAME CANDLE AGGREGATOR
+# 1m closes roll into 3/5/15/30m bars incrementally (no recomputation).
+# A bar closes on its last minute's 1m close, or at the minute sweep after its
+# period ends (illiquid tokens, the session's final bar).
+# Each token owns a fixed-size array-backed ring per timeframe sized for one
+# session (375 one-minute bars), so memory is bounded; rows are allocated
+# lazily the first time a token closes a candle.
+# -----------------------------
+class CandleAggregator:
+    TIMEFRAMES = (1, 3, 5, 15, 30)
+    SESSION_BARS = 375
+    SESSION_START_MIN = 9 * 60 + 15  # IST minute-of-day, bars align to 09:15
+    IST_OFFSET_MIN = 330
+    ROW_CHUNK = 256
+    COLUMNS = ("bucket", "open", "high", "low", "close", "volume")
+
+    def __init__(self, timeframes: Tuple[int, ...] = TIMEFRAMES):
+        self.timeframes = tuple(sorted(set(int(tf) for tf in timeframes if int(tf) >= 1)))
+        self.cap = {tf: -(-self.SESSION_BARS // tf) for tf in self.timeframes}
+        self.rows: Dict[int, int] = {}
+        self.row_tokens: List[int] = []
+        self._n = 0
+        self._subs: Dict[int, List] = {tf: [] for tf in self.timeframes}
+        # ring[tf]: bucket (n, cap) int64, ohlc (n, cap, 4) float64, volume (n, cap) int64, count (n,)
+        self.ring: Dict[int, dict] = {tf: self._alloc(0, self.cap[tf]) for tf in self.timeframes}
+        # partial (still forming) bar per token for tf > 1
+        self.part: Dict[int, dict] = {tf: self._alloc(0, 1) for tf in self.timeframes if tf > 1}
+
+    @staticmethod
+    def _alloc(n: int, cap: int) -> dict:
+        return {
+            "bucket": np.full((n, cap), NO_BUCKET, dtype=np.int64),
+            "ohlc": np.zeros((n, cap, 4), dtype=np.float64),
+            "volume": np.zeros((n, cap), dtype=np.int64),
+            "count": np.zeros(n, dtype=np.int64),
+        }
+
+    def _row(self, token: int) -> int:
+        r = self.rows.get(token)
+        if r is not None:
+            return r
+        r = len(self.rows)
+        if r >= self._n:
+            grow = self.ROW_CHUNK
+            for tables in (self.ring, self.part):
+                for tf, t in tables.items():
+                    ext = self._alloc(grow, t["bucket"].shape[1])
+                    for k in t:
+                        t[k] = np.concatenate([t[k], ext[k]])
+            self._n += grow
+        self.rows[token] = r
+        self.row_tokens.append(token)
+        return r
+
+    def subscribe(self, tf: int, callback):
+        """callback(token, tf, bucket, open, high, low, close, volume) on every bar close."""
+        self._subs[int(tf)].append(callback)
+
+    def _emit(self, tf: int, token: int, row: int, bucket: int, ohlc, vol: int):
+        ring = self.ring[tf]
+        slot = ring["count"][row] % self.cap[tf]
+        ring["bucket"][row, slot] = bucket
+        ring["ohlc"][row, slot] = ohlc
+        ring["volume"][row, slot] = vol
+        ring["count"][row] += 1
+        for cb in self._subs[tf]:
+            try:
+                cb(token, tf, bucket, *ohlc, vol)
+            except Exception as e:
+                logger.error(f"❌ Candle subscriber failed ({tf}m {token}): {e}")
+
+    def on_1m_close(self, token: int, candle: dict):
+        bucket = int(candle["bucket"])
+        o, h, l, c = (float(candle["open"]), float(candle["high"]), float(candle["low"]), float(candle["close"]))
+        v = int(candle.get("volume", 0) or 0)
+        row = self._row(token)
+        offset = (bucket + self.IST_OFFSET_MIN - self.SESSION_START_MIN)
+        for tf in self.timeframes:
+            if tf == 1:
+                self._emit(1, token, row, bucket, (o, h, l, c), v)
+                continue
+            p = self.part[tf]
+            mod = offset % tf
+            start = bucket - mod
+            cur = p["bucket"][row, 0]
+            if cur != start:
+                if cur != NO_BUCKET:
+                    # previous period never saw its last minute (gap): close it as-is
+                    self._emit(tf, token, row, int(cur), tuple(p["ohlc"][row, 0]), int(p["volume"][row, 0]))
+                p["bucket"][row, 0] = start
+                p["ohlc"][row, 0] = (o, h, l, c)
+                p["volume"][row, 0] = v
+            else:
+                bar = p["ohlc"][row, 0]
+                if h > bar[1]: bar[1] = h
+                if l < bar[2]: bar[2] = l
+                bar[3] = c
+                p["volume"][row, 0] += v
+            if mod == tf - 1:
+                self._emit(tf, token, row, start, tuple(p["ohlc"][row, 0]), int(p["volume"][row, 0]))
+                p["bucket"][row, 0] = NO_BUCKET
+
+    def close_due(self, bucket_now: int) -> int:
+        """
+        Closes every partial bar whose period ended before bucket_now (all its 1m candles
+        are closed by then), as the sweeper does for 1m bars. Returns bars closed.
+        """
+        n = 0
+        for tf, p in self.part.items():
+            b = p["bucket"][:, 0]
+            for row in np.flatnonzero((b != NO_BUCKET) & (b + tf <= bucket_now)).tolist():
+                self._emit(tf, self.row_tokens[row], row, int(b[row]), tuple(p["ohlc"][row, 0]), int(p["volume"][row, 0]))
+                b[row] = NO_BUCKET
+                n += 1
+        return n
+
+    def last_bars(self, token: int, tf: int, n: int) -> Dict[str, np.ndarray]:
+        """Last n closed bars (oldest first) as column arrays; no per-bar dicts."""
+        tf = int(tf)
+        row = self.rows.get(token)
+        if row is None or tf not in self.ring:
+            return {k: np.empty(0) for k in self.COLUMNS}
+        ring, cap = self.ring[tf], self.cap[tf]
+        total = int(ring["count"][row])
+        n = max(0, min(int(n), total, cap))
+        slots = (np.arange(total - n, total) % cap)
+        ohlc = ring["ohlc"][row, slots]
+        return {
+            "bucket": ring["bucket"][row, slots],
+            "open": ohlc[:, 0],
+            "high": ohlc[:, 1],
+            "low": ohlc[:, 2],
+            "close": ohlc[:, 3],
+            "volume": ring["volume"][row, slots],
+        }
+
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for tables in (self.ring, self.part) for t in tables.values() for a in t.values()))
+
+# -----------------------------
+# LATENCY FIX: TICK COALESCING
+# -----------------------------
+def _tick_epoch(ts) -> float:
+    """
+    Exchange timestamp -> epoch seconds.
+    KiteTicker hands over naive local datetimes (datetime.fromtimestamp), so
+    .timestamp() maps them back exactly; numeric stamps pass through.
+    """
+    if not ts: return 0.0
+    if isinstance(ts, (int, float)): return float(ts)
+    try: return ts.timestamp()
+    except Exception: return 0.0
+
+def _compact_ticks(ticks: List[dict]) -> List[tuple]:
+    """KiteTicker dicts -> (token, ltp, cum_vol, exch_ts) tuples, the only fields the pipeline reads."""
+    return [
+        (t.get("instrument_token") or 0, t.get("last_price") or 0, t.get("volume_traded") or 0, _tick_epoch(t.get("exchange_timestamp")))
+        for t in ticks
+    ]
+
+def _tick_bucket(exch_ts: float, recv_ts: float) -> int:
+    """Integer epoch minute: exchange time when present, local receive time as fallback."""
+    return int(exch_ts or recv_ts) // 60
+
+def _coalesce_ticks(batches: List[tuple], spilled: Optional[List[tuple]] = None, out: Optional[Dict[int, list]] = None) -> Tuple[List[tuple], Dict[int, list]]:
+    """
+    Folds every compact tick of a drain cycle (batches of (recv_ts, [(token, ltp, cum_vol, exch_ts)]))
+    into one entry per token:
+      token -> [first_ltp, last_ltp, max_cum_vol, high, low, exch_ts, recv_ts, bucket, first_cum_vol]
+    Arrival order is preserved inside a batch and across batches. When a token's
+    minute bucket advances mid-cycle the finished entry is spilled (in order) so a
+    candle never absorbs ticks from the next minute.
+    Returns (spilled [(token, entry)], latest {token: entry}); pass them back in
+    to keep folding newer batches on top (overflow snapshot).
+    """
+    out = {} if out is None else out
+    spilled = [] if spilled is None else spilled
+    for recv_ts, ticks in batches:
+        for token, ltp, vol, exch_ts in ticks:
+            if not token or ltp <= 0: continue
+            bucket = _tick_bucket(exch_ts, recv_ts)
+            cur = out.get(token)
+            if cur is not None and bucket != cur[7]:
+                if bucket < cur[7]:
+                    # out-of-order tick inside the cycle: only its volume can still count
+                    if vol > cur[2]: cur[2] = vol
+                    continue
+                spilled.append((token, cur))
+                cur = None
+            if cur is None:
+                out[token] = [ltp, ltp, vol, ltp, ltp, exch_ts, recv_ts, bucket, vol]
+                continue
+            cur[1] = ltp
+            if vol > cur[2]: cur[2] = vol
+            if ltp > cur[3]: cur[3] = ltp
+            elif ltp < cur[4]: cur[4] = ltp
+            cur[5] = exch_ts
+            cur[6] = recv_ts
+    return spilled, out
+
+def _coalesce_records(views: List[np.ndarray], spilled: Optional[List[tuple]] = None, out: Optional[Dict[int, list]] = None) -> Tuple[List[tuple], Dict[int, list]]:
+    """
+    _coalesce_ticks for tick-ring records (strategy_host): reads the structured views
+    in place, column by column, and folds them with NumPy (stable sort by token,
+    per-token running max bucket, reduceat per (token, bucket) group). Python
+    objects are only built for the resulting entries; same entries, same spill
+    and late-tick rules as the per-tick loop.
+    """
+    out = {} if out is None else out
+    spilled = [] if spilled is None else spilled
+    for view in views:
+        tok, ltp, vol = view["token"], view["ltp"], view["vol"]
+        keep = np.flatnonzero((tok != 0) & (ltp > 0))
+        if not len(keep): continue
+        order = keep[np.argsort(tok[keep], kind="stable")]  # arrival order inside each token
+        t, px, v = tok[order], ltp[order], vol[order]
+        ets, rts = view["exch_ts"][order], view["recv_ts"][order]
+        bucket = (np.where(ets != 0, ets, rts) // 60).astype(np.int64)
+        new_tok = np.r_[True, t[1:] != t[:-1]]
+        # running max bucket per token (segment id in the high bits): ticks below it are late
+        eff = np.maximum.accumulate((np.cumsum(new_tok) << 32) | bucket) & 0xFFFFFFFF
+        normal = bucket == eff
+        starts = np.flatnonzero(new_tok | np.r_[True, eff[1:] != eff[:-1]])
+        last = np.maximum.reduceat(np.where(normal, np.arange(len(t)), -1), starts)  # last on-time tick
+        rows = zip(
+            t[starts].tolist(), eff[starts].tolist(), px[starts].tolist(), v[starts].tolist(),
+            px[last].tolist(), np.maximum.reduceat(v, starts).tolist(),
+            np.maximum.reduceat(np.where(normal, px, -np.inf), starts).tolist(),
+            np.minimum.reduceat(np.where(normal, px, np.inf), starts).tolist(),
+            ets[last].tolist(), rts[last].tolist(),
+        )
+        for token, b, first, first_vol, last_px, max_vol, high, low, exch_ts, recv_ts in rows:
+            cur = out.get(token)
+            if cur is not None and b != cur[7]:
+                if b < cur[7]:
+                    if max_vol > cur[2]: cur[2] = max_vol
+                    continue
+                spilled.append((token, cur))
+                cur = None
+            if cur is None:
+                out[token] = [first, last_px, max_vol, high, low, exch_ts, recv_ts, b, first_vol]
+                continue
+            cur[1] = last_px
+            if max_vol > cur[2]: cur[2] = max_vol
+            if high > cur[3]: cur[3] = high
+            if low < cur[4]: cur[4] = low
+            cur[5] = exch_ts
+            cur[6] = recv_ts
+    return spilled, out
+
+def _overflow_merge(ov: Optional[dict], batch: tuple) -> dict:
+    """
+    Hand-off full policy: fold the batch into a per-token snapshot instead of dropping it.
+    Keeps last price, max cum volume and high/low since the last drain; only
+    intermediate ticks are lost. The worker consumes the snapshot before the batches.
+    Runs under the hand-off lock (possibly on the feed thread): pure, no RAM_STATE.
+    """
+    if ov is None:
+        ov = {"spilled": [], "latest": {}, "ticks": 0}
+    _coalesce_ticks([batch], ov["spilled"], ov["latest"])
+    ov["ticks"] += len(batch[1])
+    return ov
+
+def _engine_signature(u: UniverseStore, i: int) -> int:
+    return int(u.brk_status[i]) * 4 + int(u.mom_status[i])
+
+# -----------------------------
+# LATENCY FIX: SHARDED PER-TOKEN WORKERS
+# A token always maps to shard hash(token) % N, so its ticks are processed
+# in arrival order by one worker: no per-token locks, no per-tick tasks.
+# Each shard has two lanes: "hi" (OPEN, then armed tokens + trigger hits) is
+# always drained before "bulk" (idle tokens); only bulk applies backpressure.
+# A token with items still queued on bulk stays pinned to bulk (per-token
+# pending count), so a token that just armed never overtakes its older ticks.
+# -----------------------------
+def _new_shard(idx: int, maxsize: int) -> dict:
+    return {
+        "idx": idx, "queue": asyncio.Queue(maxsize=maxsize), "hi": asyncio.Queue(), "wake": asyncio.Event(),
+        "bulk_pending": {}, "pinned": 0,
+        "processed": 0, "lag_ms": 0.0, "max_lag_ms": 0.0,
+    }
+
+def _shard_for(token: int) -> dict:
+    shards = RAM_STATE["shards"]
+    return shards[hash(token) % len(shards)]
+
+def _shard_backlog() -> int:
+    return sum(sh["queue"].qsize() + sh["hi"].qsize() for sh in RAM_STATE["shards"])
+
+def _lane_rank(u: UniverseStore, i: int) -> int:
+    """0 = open position, 1 = armed, 2 = idle (bulk lane)."""
+    if u.brk_status[i] == OPEN or u.mom_status[i] == OPEN: return 0
+    if u.brk_status[i] == TRIGGER_WATCH or u.mom_status[i] == TRIGGER_WATCH: return 1
+    return 2
+
+_TICK_ENGINES = (("brk", BreakoutEngine), ("mom", MomentumEngine))
+
+async def _process_tick(token: int, bucket: int, ltp: float, vol: int, high: Optional[float] = None, low: Optional[float] = None, first: Optional[float] = None, changed: bool = True, recv_ts: float = 0.0, first_vol: Optional[int] = None):
+    """Shard stage of a tick: ltp was already written by the dispatcher (see tick_worker_parallel)."""
+    try:
+        await _process_tick_inner(token, bucket, ltp, vol, high, low, first, changed, first_vol)
+    finally:
+        aimd: Optional[AimdController] = RAM_STATE["aimd"]
+        if aimd and recv_ts:
+            aimd.observe_decision((time.time() - recv_ts) * 1000.0)
+
+async def _process_tick_inner(token: int, bucket: int, ltp: float, vol: int, high: Optional[float], low: Optional[float], first: Optional[float], changed: bool, first_vol: Optional[int] = None):
+    u: UniverseStore = RAM_STATE["universe"]
+    i = u.index.get(token) if u else None
+    if i is None: return
+    u.last_update_ts[i] = time.time()
+
+    # 1. Update Candle (Fast)
+    closed = _update_1m_candle(u, i, bucket, ltp, vol, high, low, first, first_vol)
+    if closed:
+        RAM_STATE["candle_close_queue"].put_nowait([(token, closed)])
+
+    # 2. Interest-set dispatch: engines only see tokens they registered (OPEN positions)
+    if not u.is_interesting(i):
+        return
+
+    # 3. Skip engines when nothing they read has changed (coalescing mode only)
+    if RAM_STATE["tick_coalesce"] and not closed and not changed:
+        if _engine_signature(u, i) == u.eval_sig[i] and u.symbols[i] not in RAM_STATE["manual_exits"]:
+            RAM_STATE["engine_evals_skipped"] += 1
+            return
+
+    # 4. Engine Run (sequential inside the shard keeps per-token order; concurrency
+    #    is the shard count, load is bounded upstream by the AIMD inflight limit)
+    await _run_engines(u, i, token, ltp, vol, high, low)
+    u.eval_sig[i] = _engine_signature(u, i)
+
+def _extreme_path(u: UniverseStore, i: int, prefix: str, ltp: float, high: Optional[float], low: Optional[float]) -> List[float]:
+    """
+    Intra-entry extremes an OPEN position must still be checked against, adverse
+    first (their order inside a coalesced entry is unknown, so SL wins a tie).
+    """
+    if high is None or low is None or getattr(u, f"{prefix}_status")[i] != OPEN:
+        return []
+    side = str(u.view(i).get(f"{prefix}_side_latch") or "").lower()
+    path = [low, high] if side.endswith("bull") else [high, low]
+    return [px for px in path if px != ltp]
+
+async def _run_engines(u: UniverseStore, i: int, token: int, ltp: float, vol: int, high: Optional[float] = None, low: Optional[float] = None):
+    for prefix, engine in _TICK_ENGINES:
+        if i not in u.tick_interest[prefix]: continue
+        try:
+            for px in _extreme_path(u, i, prefix, ltp, high, low):
+                await engine.run(token, px, vol, RAM_STATE)
+                RAM_STATE["extreme_evals"] += 1
+                if getattr(u, f"{prefix}_status")[i] != OPEN: break
+            if i not in u.tick_interest[prefix]: continue
+            await engine.run(token, ltp, vol, RAM_STATE)
+        except Exception as e:
+            logger.error(f"❌ {engine.__name__}.run failed for {token}: {e}")
+
+async def shard_worker(shard: dict):
+    hi_q, bulk_q, wake, pending = shard["hi"], shard["queue"], shard["wake"], shard["bulk_pending"]
+    hist = RAM_STATE["lane_latency"]
+    logger.info(f"🧵 Tick Shard {shard['idx']}: Active")
     while True:
-        ticks = await q.get()
+        if not hi_q.empty():
+            q = hi_q
+        elif not bulk_q.empty():
+            q = bulk_q
+        else:
+            wake.clear()
+            await wake.wait()
+            continue
+        token, handler, args, enq_ts = q.get_nowait()
         try:
-            if len(inflight) >= RAM_STATE["max_inflight"]:
-                done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
-                inflight.difference_update(done)
-
-            for tick in ticks:
-                token = tick.get("instrument_token")
-                if not token: continue
-                task = asyncio.create_task(_process_tick_task(token, tick.get("last_price", 0), tick.get("volume_traded", 0)))
-                inflight.add(task)
-                task.add_done_callback(inflight.discard)
+            lag_ms = (time.perf_counter() - enq_ts) * 1000.0
+            shard["lag_ms"] = lag_ms
+            if lag_ms > shard["max_lag_ms"]: shard["max_lag_ms"] = lag_ms
+            await handler(*args)
+            shard["processed"] += 1
+        except Exception as e:
+            logger.error(f"❌ Shard {shard['idx']} {handler.__name__} failed for {token}: {e}")
         finally:
+            hist["hi" if q is hi_q else "bulk"].record((time.perf_counter() - enq_ts) * 1000.0)
             q.task_done()
+            if q is bulk_q:
+                left = pending.get(token, 1) - 1
+                if left > 0: pending[token] = left
+                else: pending.pop(token, None)
+                RAM_STATE["inflight"].release()
+
+async def _route(token: int, handler, args: tuple, hi: bool = False):
+    shard = _shard_for(token)
+    item = (token, handler, args, time.perf_counter())
+    pending = shard["bulk_pending"]
+    if hi and pending.get(token):
+        # older ticks of this token are still on bulk: stay behind them
+        shard["pinned"] += 1
+        hi = False
+    if hi:
+        # Unbounded: bounded in practice by the number of armed/open tokens
+        shard["hi"].put_nowait(item)
+        shard["wake"].set()
+        return
+    # Backpressure: wait for an inflight slot (AIMD-sized) rather than reorder or drop
+    # counted before waiting so a hi item routed meanwhile already sees the pin
+    pending[token] = pending.get(token, 0) + 1
+    await RAM_STATE["inflight"].acquire()
+    shard["queue"].put_nowait(item)
+    shard["wake"].set()
+
+# -----------------------------
+# LATENCY FIX: VECTORIZED TRIGGER BOOK SCAN
+# -----------------------------
+_TRIGGER_ENGINES = {"brk": BreakoutEngine, "mom": MomentumEngine}
+
+async def _scan_triggers(u: UniverseStore):
+    """One vectorized crossing check per tick batch; only crossed/expired tokens reach an engine."""
+    fired, expired = u.triggers.scan(u.ltp, time.time())
+    for prefix, i, side_key, px in fired:
+        token = int(u.tokens[i])
+        args = (prefix, token, side_key, px, float(u.last_recv_ts[i]), float(u.last_exch_ts[i]))
+        await _route(token, _guarded_trigger, args, hi=True)
+    for prefix, i, side_key, _ in expired:
+        token = int(u.tokens[i])
+        await _route(token, _TRIGGER_ENGINES[prefix].on_trigger_expire, (token, side_key, RAM_STATE), hi=True)
+
+def _shed(u: UniverseStore, i: int, token: int, bucket: int, ltp: float, vol: int, high: float, low: float) -> bool:
+    """
+    Overload shedding for bulk-lane (idle) tokens, in priority order; never called
+    for open or armed tokens. True = no shard dispatch for this entry.
+    Pruned tokens are dropped outright. FLAT / INTRABAR only skip the shard hop:
+    the same-minute candle still takes close, high/low and volume here, inline
+    (never while older items of the token are queued, to keep its order).
+    """
+    aimd: Optional[AimdController] = RAM_STATE["aimd"]
+    level = aimd.shed_level if aimd else 0
+    if not level: return False
+    subs: Optional[SubscriptionManager] = RAM_STATE["subs"]
+    if subs is not None and subs.pruned[i]:
+        aimd.shed_counts["pruned"] += 1
+        return True
+    if level < SHED_FLAT or bucket != u.c_bucket[i]: return False
+    if _shard_for(token)["bulk_pending"].get(token): return False
+    if high <= u.c_high[i] and low >= u.c_low[i]:
+        aimd.shed_counts["flat"] += 1
+    elif level >= SHED_INTRABAR:
+        aimd.shed_counts["intrabar"] += 1
+    else:
+        return False
+    u.last_update_ts[i] = time.time()
+    _update_1m_candle(u, i, bucket, ltp, vol, high, low)  # same bucket: never closes a candle
+    return True
+
+async def _guarded_trigger(prefix: str, token: int, side_key: str, px: float, recv_ts: float, exch_ts: float):
+    """
+    Entry-path stale-tick guard. A crossing older than stale_tick_max_age_sec (local
+    receive time) or already lagging the exchange by stale_exch_lag_sec on arrival is
+    re-checked against the newest LTP if a fresh one exists, otherwise rejected.
+    The engine's own cross check runs on whichever price is passed on.
+    The fired slot is held by the trigger book meanwhile; if the engine neither
+    entered nor reset (rejected, gated, engine off), it is re-armed here and may
+    fire again after trigger_refire_sec.
+    """
+    u: UniverseStore = RAM_STATE["universe"]
+    i = u.index.get(token)
+    if i is None: return
+    try:
+        await _guarded_trigger_inner(u, i, prefix, token, side_key, px, recv_ts, exch_ts)
+    finally:
+        u.triggers.rearm(prefix, i, time.time() + RAM_STATE["trigger_refire_sec"])
+
+async def _guarded_trigger_inner(u: UniverseStore, i: int, prefix: str, token: int, side_key: str, px: float, recv_ts: float, exch_ts: float):
+    now = time.time()
+    max_age = RAM_STATE["stale_tick_max_age_sec"]
+    stale = max_age > 0 and recv_ts and (now - recv_ts) > max_age
+    lagged = bool(exch_ts) and (recv_ts - exch_ts) > RAM_STATE["stale_exch_lag_sec"]
+    if stale or lagged:
+        counts = RAM_STATE["stale_entries"][prefix]
+        newest_recv = float(u.last_recv_ts[i])
+        newest_exch = float(u.last_exch_ts[i])
+        fresh = newest_recv > recv_ts and (max_age <= 0 or (now - newest_recv) <= max_age) \
+            and not (newest_exch and (newest_recv - newest_exch) > RAM_STATE["stale_exch_lag_sec"])
+        if not fresh:
+            counts["rejected"] += 1
+            logger.warning(f"🧊 [STALE-ENTRY] {u.symbols[i]} {side_key} refused: tick age {now - recv_ts:.2f}s, exch lag {recv_ts - exch_ts if exch_ts else 0:.2f}s")
+            return
+        counts["rechecked"] += 1
+        px = float(u.ltp[i])
+    await _TRIGGER_ENGINES[prefix].on_trigger(token, side_key, px, RAM_STATE)
+
+async def _dispatch_entries(u: UniverseStore, entries):
+    """
+    Routes coalesced entries, open positions first, then armed tokens, then the bulk
+    (stable, so a token's spilled entries stay ahead of its latest one).
+    The dispatcher writes ltp so the trigger scan sees it.
+    """
+    index, ltps = u.index, u.ltp
+    ranked = []
+    for token, entry in entries:
+        i = index.get(token)
+        if i is None: continue
+        ranked.append((_lane_rank(u, i), i, token, entry))
+    ranked.sort(key=lambda r: r[0])
+    for rank, i, token, (first, ltp, vol, high, low, exch_ts, recv_ts, bucket, first_vol) in ranked:
+        # any move inside the entry counts: an open position is checked at high/low too
+        changed = ltp != ltps[i] or high != low
+        ltps[i] = ltp
+        u.last_recv_ts[i] = recv_ts
+        u.last_exch_ts[i] = exch_ts
+        hi = rank < 2
+        if not hi and _shed(u, i, token, bucket, ltp, vol, high, low): continue
+        await _route(token, _process_tick, (token, bucket, ltp, vol, high, low, first, changed, recv_ts, first_vol), hi=hi)
+
+def _publish_ring(ring: TickRing, ov: Optional[dict], batches: List[tuple]):
+    """Ingest side of the tick ring: raw batches; an overflow snapshot goes in as its latest entries."""
+    if ov:
+        # an entry goes in as first/high/low/last so consumers rebuild the same OHLC and extremes
+        for token, e in (*ov["spilled"], *ov["latest"].items()):
+            ring.publish(e[6], [(token, e[0], e[8], e[5]), (token, e[3], e[2], e[5]), (token, e[4], e[2], e[5]), (token, e[1], e[2], e[5])])
+    for recv_ts, ticks in batches:
+        ring.publish(recv_ts, ticks)
+
+async def tick_worker_parallel():
+    handoff: TickHandoff = RAM_STATE["tick_handoff"]
+    logger.info("🧵 Parallel Tick Worker: Active")
+    while True:
+        # One wakeup drains the whole burst; the overflow snapshot (if any) is
+        # older than every batch returned with it
+        ov, batches = await handoff.drain()
+        ring: Optional[TickRing] = RAM_STATE["tick_ring"]
+        if ring is not None:
+            try:
+                _publish_ring(ring, ov, batches)
+            except Exception as e:
+                logger.error(f"❌ Tick ring publish failed: {e}")
+        await _consume_batches(ov, batches)
+
+async def _consume_batches(ov: Optional[dict], batches: List[tuple]):
+    """Dispatch stage shared by the hand-off worker and strategy_host ring consumers."""
+    try:
+        u: Optional[UniverseStore] = RAM_STATE["universe"]
+        if u is None: return
+        if RAM_STATE["tick_coalesce"]:
+            if ov:
+                spilled, merged = _coalesce_ticks(batches, ov["spilled"], ov["latest"])
+            else:
+                spilled, merged = _coalesce_ticks(batches)
+            n_ticks = sum(len(b) for _, b in batches) + (ov["ticks"] if ov else 0)
+            await _dispatch_coalesced(u, spilled, merged, n_ticks)
+        else:
+            if ov:
+                await _dispatch_entries(u, (*ov["spilled"], *ov["latest"].items()))
+            index, ltps = u.index, u.ltp
+            for recv_ts, ticks in batches:
+                for token, ltp, vol, exch_ts in ticks:
+                    i = index.get(token)
+                    if i is None: continue
+                    ltps[i] = ltp
+                    u.last_recv_ts[i] = recv_ts
+                    u.last_exch_ts[i] = exch_ts
+                    hi = _lane_rank(u, i) < 2
+                    bucket = _tick_bucket(exch_ts, recv_ts)
+                    if not hi and _shed(u, i, token, bucket, ltp, vol, ltp, ltp): continue
+                    await _route(token, _process_tick, (token, bucket, ltp, vol, None, None, None, True, recv_ts), hi=hi)
+
+        # Crossing check runs after the batch so entries see the latest LTP
+        await _scan_triggers(u)
+    except Exception as e:
+        logger.error(f"❌ Tick dispatch failed ({len(batches)} batches): {e}")
+
+async def _consume_records(spilled: List[tuple], merged: Dict[int, list], n_ticks: int):
+    """Dispatch stage for ring records already folded by _coalesce_records (strategy_host)."""
+    try:
+        u: Optional[UniverseStore] = RAM_STATE["universe"]
+        if u is None: return
+        await _dispatch_coalesced(u, spilled, merged, n_ticks)
+        await _scan_triggers(u)
+    except Exception as e:
+        logger.error(f"❌ Tick dispatch failed ({n_ticks} records): {e}")
+
+async def _dispatch_coalesced(u: UniverseStore, spilled: List[tuple], merged: Dict[int, list], n_ticks: int):
+    RAM_STATE["ticks_coalesced"] += n_ticks - len(merged) - len(spilled)
+    await _dispatch_entries(u, (*spilled, *merged.items()))
 
 async def candle_worker():
     cq = RAM_STATE["candle_close_queue"]
     logger.info("🕯️ Background Candle Worker: Active")
     while True:
-        token, candle = await cq.get()
+        # Items are lists of (token, candle); the sweeper delivers a whole minute at once
+        items = [await cq.get()]
+        while not cq.empty():
+            items.append(cq.get_nowait())
+        swept = RAM_STATE["candle_swept_bucket"]  # read with the drain: that sweep's candles are in items or earlier
+        batch = [pair for item in items for pair in item]
         try:
-            async with RAM_STATE["token_locks"][token]:
-                await asyncio.gather(
-                    BreakoutEngine.on_candle_close(token, candle, RAM_STATE),
-                    MomentumEngine.on_candle_close(token, candle, RAM_STATE),
-                    return_exceptions=True
-                )
+            agg: Optional[CandleAggregator] = RAM_STATE["candles"]
+            if agg:
+                for token, candle in batch:
+                    agg.on_1m_close(token, candle)
+                if swept != NO_BUCKET:
+                    RAM_STATE["candle_close_stats"]["htf_swept"] += agg.close_due(swept)
+            if not batch: continue
+
+            # Single serial consumer on the same loop: no token lock needed, the
+            # engines only qualify WAITING tokens which the tick path never mutates.
+            tokens = [t for t, _ in batch]
+            candles = [c for _, c in batch]
+            engines = RAM_STATE["engines"]
+            try:
+                if "brk" in engines:
+                    await BreakoutEngine.on_candle_close_batch(tokens, candles, RAM_STATE)
+            except Exception as e:
+                logger.error(f"❌ Breakout batch qualify failed ({len(batch)} candles): {e}")
+            for token, candle in (batch if "mom" in engines else ()):
+                try:
+                    await MomentumEngine.on_candle_close(token, candle, RAM_STATE)
+                except Exception as e:
+                    logger.error(f"❌ Momentum candle close failed for {token}: {e}")
         finally:
-            cq.task_done()
+            for _ in items:
+                cq.task_done()
 
 # -----------------------------
 # KITE WebSocket Handlers
 # -----------------------------
-def on_ticks(ws, ticks):
-    loop = RAM_STATE.get("main_loop")
-    q = RAM_STATE.get("tick_queue")
-    if loop and q:
-        def _put():
-            try:
-                q.put_nowait(ticks)
-                RAM_STATE["tick_batches_enqueued"] += 1
-            except asyncio.QueueFull:
-                try:
-                    q.get_nowait()
-                    q.put_nowait(ticks)
-                    RAM_STATE["tick_batches_dropped"] += 1
-                except: pass
-        loop.call_soon_threadsafe(_put)
+def _enqueue_batch(recv_ts: float, ticks: List[tuple]):
+    """Entry for a batch of compact ticks from any thread (native stream calls this on the loop)."""
+    handoff: Optional[TickHandoff] = RAM_STATE.get("tick_handoff")
+    if handoff is None: return
+    handoff.push(recv_ts, ticks)  # recv_ts: local receive time, fallback for exchange_timestamp
+
+def _mode_groups() -> Dict[str, List[int]]:
+    subs: Optional[SubscriptionManager] = RAM_STATE["subs"]
+    if subs: return subs.groups()
+    return {KiteTicker.MODE_FULL: list(RAM_STATE["stocks"].keys())}
+
+def _feed_set_mode(mode: str, tokens: List[int]):
+    """Applies a batched mode change on the live sockets (the pool routes per connection/thread)."""
+    pool: Optional[TickerPool] = RAM_STATE["kws"]
+    if pool is not None: pool.set_mode(mode, tokens)
 
-def on_connect(ws, response):
-    tokens = list(RAM_STATE["stocks"].keys())
-    if tokens:
-        ws.subscribe(tokens)
-        ws.set_mode(ws.MODE_FULL, tokens)
-        logger.info(f"📡 WS Connected: Subscribed {len(tokens)} tokens")
-        RAM_STATE["data_connected"] = {"breakout": True, "momentum": True}
+def _feed_unsubscribe(tokens: List[int]):
+    pool: Optional[TickerPool] = RAM_STATE["kws"]
+    if pool is not None: pool.unsubscribe(tokens)
+
+def _feed_hot(tokens: List[int], hot: bool):
+    """Armed / OPEN tokens join the hot-standby connection; idle ones leave it."""
+    pool: Optional[TickerPool] = RAM_STATE["kws"]
+    if pool is not None: pool.set_hot(tokens, hot)
+
+def on_feed_state(pool: TickerPool):
+    up = pool.live()  # connected AND heard from Kite within feed_stale_sec
+    RAM_STATE["data_connected"] = {"breakout": up, "momentum": up}
+
+# -----------------------------
+# RING MODE: STATE FROM / TO THE STRATEGY HOSTS
+# Hosts publish status changes (mirrored here so adaptive modes, the hot standby
+# and lane ranking see armed / open tokens) and their trades; UI actions for
+# hosted engines are published to them.
+# -----------------------------
+def _remote_engines() -> List[str]:
+    if RAM_STATE["tick_ring"] is None: return []
+    return [p for p, _ in _TICK_ENGINES if p not in RAM_STATE["engines"]]
+
+def _mirror_statuses(prefix: str, statuses: Dict[int, int], full: bool = False):
+    """Applies host statuses to this universe; full=True also resets tokens absent from the snapshot."""
+    u: Optional[UniverseStore] = RAM_STATE["universe"]
+    if u is None: return
+    field = f"{prefix}_status"
+    if full:
+        for i in np.flatnonzero(getattr(u, field) != WAITING):
+            if int(u.tokens[i]) not in statuses:
+                u.set_status(field, int(i), WAITING)
+    for token, code in statuses.items():
+        i = u.index.get(int(token))
+        if i is not None: u.set_status(field, i, int(code))
+
+async def _resync_ring_statuses(prefixes: Optional[List[str]] = None):
+    for prefix in prefixes or _remote_engines():
+        _mirror_statuses(prefix, await TradeControl.get_ring_statuses(prefix), full=True)
+    RAM_STATE["ring_sync"]["resyncs"] += 1
+
+async def _on_ring_event(payload):
+    if isinstance(payload, dict):
+        # a host (re)started: reload its engine's snapshot
+        if payload.get("resync") in _remote_engines():
+            await _resync_ring_statuses([payload["resync"]])
+        return
+    remote = _remote_engines()
+    for prefix, token, code in payload:
+        if prefix in remote:
+            _mirror_statuses(prefix, {int(token): int(code)})
+            RAM_STATE["ring_sync"]["status_events"] += 1
+
+async def ring_state_sync(interval: float = 1.0):
+    """Ingest side: status mirror (pub/sub + snapshot on every resubscribe) and host trades for the UI."""
+    logger.info(f"🔗 Ring State Sync: Active (hosted engines {_remote_engines()})")
+    TradeControl.ring_listen(RING_EVENTS_CHANNEL, _on_ring_event, _resync_ring_statuses)
+    while True:
+        RAM_STATE["ring_trades"] = await TradeControl.get_ring_trades()
+        await asyncio.sleep(interval)
 
 # -----------------------------
 # FASTAPI ROUTES (Full Set)
@@ -282,9 +1029,33 @@ async def get_auth_config():
 async def get_stats():
     return {
         "pnl": _compute_pnl(),
-        "queue": RAM_STATE["tick_queue"].qsize() if RAM_STATE["tick_queue"] else 0,
-        "inflight": len(RAM_STATE["inflight"]),
-        "dropped": RAM_STATE["tick_batches_dropped"],
+        "queue": RAM_STATE["tick_handoff"].pending() if RAM_STATE["tick_handoff"] else 0,
+        "handoff": RAM_STATE["tick_handoff"].stats() if RAM_STATE["tick_handoff"] else {},
+        "inflight": _shard_backlog(),
+        "shards": [
+            {"depth": sh["queue"].qsize(), "hi_depth": sh["hi"].qsize(), "lag_ms": round(sh["lag_ms"], 2), "max_lag_ms": round(sh["max_lag_ms"], 2), "processed": sh["processed"], "pinned": sh["pinned"]}
+            for sh in RAM_STATE["shards"]
+        ],
+        "stale_entries": RAM_STATE["stale_entries"],
+        "orders": RAM_STATE["orders"].stats() if RAM_STATE["orders"] else {},
+        "limits": RAM_STATE["aimd"].stats() if RAM_STATE["aimd"] else {},
+        "lane_latency": {lane: h.snapshot() for lane, h in RAM_STATE["lane_latency"].items()},
+        "dropped": RAM_STATE["tick_handoff"].dropped if RAM_STATE["tick_handoff"] else 0,
+        "overflow_merged": RAM_STATE["tick_handoff"].merged if RAM_STATE["tick_handoff"] else 0,
+        "coalesced": RAM_STATE["ticks_coalesced"],
+        "evals_skipped": RAM_STATE["engine_evals_skipped"],
+        "extreme_evals": RAM_STATE["extreme_evals"],
+        "tick_interest": {p: len(v) for p, v in RAM_STATE["universe"].tick_interest.items()} if RAM_STATE["universe"] else {},
+        "triggers": RAM_STATE["universe"].triggers.stats() if RAM_STATE["universe"] else {},
+        "candle_close": RAM_STATE["candle_close_stats"],
+        "sub_modes": RAM_STATE["subs"].stats() if RAM_STATE["subs"] else None,
+        "pruned": RAM_STATE["pruner"].stats() if RAM_STATE["pruner"] else {"pruned": 0},
+        "feed": RAM_STATE["kws"].stats() if RAM_STATE["kws"] else None,
+        "ring": {**RAM_STATE["tick_ring"].stats(), "sync": RAM_STATE["ring_sync"]} if RAM_STATE["tick_ring"] else None,
+        "redis_scripts": TradeControl.script_stats(),
+        "symbol_counts": TradeControl.symbol_count_stats(),
+        "universe_load_ms": RAM_STATE["universe_load_ms"],
+        "engines": sorted(RAM_STATE["engines"]),
         "server_time": _now_ist().strftime("%H:%M:%S"),
         "engine_status": {k: "1" if v else "0" for k, v in RAM_STATE["engine_live"].items()},
         "data_connected": RAM_STATE["data_connected"]
@@ -292,24 +1063,37 @@ async def get_stats():
 
 @app.get("/api/orders")
 async def get_orders(open_only: int = 0):
-    if not open_only: return RAM_STATE["trades"]
-    return {side: [t for t in arr if _trade_is_open(t)] for side, arr in RAM_STATE["trades"].items()}
+    trades = _all_trades()
+    if not open_only: return trades
+    return {side: [t for t in arr if _trade_is_open(t)] for side, arr in trades.items()}
 
 @app.get("/api/scanner")
 async def get_scanner():
     signals = {side: [] for side in ["bull", "bear", "mom_bull", "mom_bear"]}
-    for _, s in RAM_STATE["stocks"].items():
-        for p in ["brk", "mom"]:
-            if s.get(f"{p}_status") == "TRIGGER_WATCH":
-                side = s.get(f"{p}_side_latch")
-                if side in signals:
-                    signals[side].append({
-                        "symbol": s["symbol"],
-                        "trigger_px": s.get(f"{p}_trigger_px"),
-                        "seen_time": s.get(f"{p}_scan_seen_time") or _now_ist().strftime("%H:%M:%S")
-                    })
+    u: Optional[UniverseStore] = RAM_STATE["universe"]
+    if not u: return signals
+    for p in ["brk", "mom"]:
+        for i in u.with_status(p, TRIGGER_WATCH):
+            s = u.view(int(i))
+            side = s.get(f"{p}_side_latch")
+            if side in signals:
+                signals[side].append({
+                    "symbol": s["symbol"],
+                    "trigger_px": s.get(f"{p}_trigger_px"),
+                    "seen_time": s.get(f"{p}_scan_seen_time") or _now_ist().strftime("%H:%M:%S")
+                })
     return signals
 
+@app.get("/api/bars/{symbol}")
+async def get_bars(symbol: str, tf: int = 1, n: int = 30):
+    u: Optional[UniverseStore] = RAM_STATE["universe"]
+    agg: Optional[CandleAggregator] = RAM_STATE["candles"]
+    stock = u.by_symbol(symbol) if u else None
+    if not stock or not agg:
+        return {"symbol": symbol, "tf": tf, "bars": 0}
+    cols = agg.last_bars(stock["token"], tf, n)
+    return {"symbol": stock["symbol"], "tf": tf, "bars": int(cols["bucket"].shape[0]), **{k: v.tolist() for k, v in cols.items()}}
+
 @app.get("/api/settings/engine/{side}")
 async def get_settings(side: str):
     return RAM_STATE["config"].get(side, {})
@@ -335,30 +1119,45 @@ async def save_settings(side: str, data: Dict[str, Any]):
 #             if "mom" in side: await MomentumEngine.close_position(stock, RAM_STATE, "USER_EXIT")
 #             else: await BreakoutEngine.close_position(stock, RAM_STATE, "USER_EXIT")
 #     return {"status": "ok"}
-@app.post("/api/control")
-async def control(request: Request):
-    data = await request.json()
+_RING_CONTROL_ACTIONS = ("toggle_engine", "square_off_one", "square_off_all")
+
+async def _apply_control(data: dict):
+    """Engine toggles and square-offs; positions are only touched by the process running that engine."""
     action = data.get("action")
     if action == "toggle_engine":
         side, enabled = data.get("side"), data.get("enabled")
         if side in RAM_STATE["engine_live"]: RAM_STATE["engine_live"][side] = bool(enabled)
 
     elif action == "square_off_one":
-        symbol, side = data.get("symbol"), data.get("side")
-        stock = next((s for s in RAM_STATE["stocks"].values() if s["symbol"] == symbol), None)
+        symbol, side = data.get("symbol"), str(data.get("side") or "")
+        u = RAM_STATE["universe"]
+        stock = u.by_symbol(symbol) if u else None
         if stock:
-            if "mom" in side: await MomentumEngine.close_position(stock, RAM_STATE, "USER_EXIT")
-            else: await BreakoutEngine.close_position(stock, RAM_STATE, "USER_EXIT")
+            if "mom" in side:
+                if "mom" in RAM_STATE["engines"]: await MomentumEngine.close_position(stock, RAM_STATE, "USER_EXIT")
+            elif "brk" in RAM_STATE["engines"]:
+                await BreakoutEngine.close_position(stock, RAM_STATE, "USER_EXIT")
 
     elif action == "square_off_all":
         side = data.get("side")
-        for stock in RAM_STATE["stocks"].values():
-            if side in ["bull", "bear"] and stock.get("brk_status") == "OPEN":
-                if stock.get("brk_side_latch") == side:
-                    await BreakoutEngine.close_position(stock, RAM_STATE, "USER_EXIT_ALL")
-            elif side in ["mom_bull", "mom_bear"] and stock.get("mom_status") == "OPEN":
-                if stock.get("mom_side_latch") == side:
-                    await MomentumEngine.close_position(stock, RAM_STATE, "USER_EXIT_ALL")
+        u = RAM_STATE["universe"]
+        prefix = "brk" if side in ["bull", "bear"] else "mom" if side in ["mom_bull", "mom_bear"] else None
+        if u and prefix and prefix in RAM_STATE["engines"]:
+            engine = BreakoutEngine if prefix == "brk" else MomentumEngine
+            for i in u.with_status(prefix, OPEN):
+                stock = u.view(int(i))
+                if stock.get(f"{prefix}_side_latch") == side:
+                    await engine.close_position(stock, RAM_STATE, "USER_EXIT_ALL")
+
+@app.post("/api/control")
+async def control(request: Request):
+    data = await request.json()
+    action = data.get("action")
+    if action in _RING_CONTROL_ACTIONS:
+        await _apply_control(data)
+        if _remote_engines():
+            await TradeControl.publish_ring_control(data)
+            RAM_STATE["ring_sync"]["control_sent"] += 1
 
     elif action == "save_api":
         api_key = data.get("api_key")
@@ -378,18 +1177,31 @@ async def control(request: Request):
 # -----------------------------
 # STARTUP EVENT
 # -----------------------------
-@app.on_event("startup")
-async def startup_event():
-    logger.info("🚀 System Startup")
+async def _start_tick_pipeline(tick_source):
+    """Limits, shards, candle workers and the tick source task (hand-off worker or ring consumer)."""
     RAM_STATE["main_loop"] = asyncio.get_running_loop()
-    RAM_STATE["tick_queue"] = asyncio.Queue(maxsize=10000)
     RAM_STATE["candle_close_queue"] = asyncio.Queue(maxsize=2000)
-    RAM_STATE["engine_sem"] = asyncio.Semaphore(500)
-    
-    asyncio.create_task(tick_worker_parallel())
+    RAM_STATE["candles"] = CandleAggregator(tuple(int(x) for x in os.getenv("MTF_TIMEFRAMES", "1,3,5,15,30").split(",") if x.strip()))
+    RAM_STATE["orders"] = OrderLane()
+    RAM_STATE["inflight"] = AdaptiveLimiter(RAM_STATE["max_inflight"], "inflight")
+    RAM_STATE["aimd"] = AimdController(
+        {"inflight": RAM_STATE["inflight"]},
+        {"inflight": (256, int(RAM_STATE["max_inflight"]))},
+        lag_budget_ms=RAM_STATE["loop_lag_budget_ms"],
+        decision_budget_ms=RAM_STATE["decision_budget_ms"],
+    )
+    asyncio.create_task(RAM_STATE["aimd"].run())
+    n_shards = max(1, int(RAM_STATE["tick_shards"]))
+    # bulk lanes are unbounded queues; admission is the shared AIMD inflight limit
+    RAM_STATE["shards"] = [_new_shard(i, 0) for i in range(n_shards)]
+    for shard in RAM_STATE["shards"]:
+        asyncio.create_task(shard_worker(shard))
+
+    asyncio.create_task(tick_source())
     asyncio.create_task(candle_worker())
+    asyncio.create_task(candle_sweeper())
 
-    # Auth & Config Restoration
+async def _restore_session():
     api_key, api_secret = await TradeControl.get_config()
     token = await TradeControl.get_access_token()
     RAM_STATE.update({"api_key": api_key, "api_secret": api_secret, "access_token": token})
@@ -401,22 +1213,76 @@ async def startup_event():
             logger.info("✅ Kite Session Restored successfully.")
         except Exception as e:
             logger.error(f"❌ Failed to restore Kite session: {e}")
-    # Load Universe
+
+async def _load_universe() -> UniverseStore:
+    # per-symbol trade counts are read on every candle close: keep them local
+    await TradeControl.start_symbol_count_mirror()
+    await TradeControl.migrate_legacy_market_keys()
+    t0 = time.perf_counter()
     market_data = await TradeControl.get_all_market_data()
-    for t_str, data in market_data.items():
-        t_id = int(t_str)
-        RAM_STATE["stocks"][t_id] = {**data, "token": t_id, "ltp": 0.0, "brk_status": "WAITING", "mom_status": "WAITING", "candle_1m": None}
+    universe = UniverseStore(market_data)
+    RAM_STATE["universe"] = universe
+    RAM_STATE["stocks"] = universe.stocks
+    for prefix, engine in _TICK_ENGINES:
+        if prefix in RAM_STATE["engines"]:
+            universe.register_interest(prefix, engine.TICK_STATUSES)
+    RAM_STATE["universe_load_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+    logger.info(f"🗂️ Universe loaded: {universe.size} tokens ({universe.nbytes() / 1024:.0f} KiB columnar) in {RAM_STATE['universe_load_ms']:.0f} ms, engines {sorted(RAM_STATE['engines'])}")
+    return universe
+
+@app.on_event("startup")
+async def startup_event():
+    logger.info("🚀 System Startup")
+    consumers = RAM_STATE["ring_consumers"]
+    if consumers:
+        # engines hosted on the ring do not also run here
+        RAM_STATE["engines"] -= set(consumers)
+        RAM_STATE["tick_ring"] = TickRing.create(RAM_STATE["ring_name"], RAM_STATE["ring_capacity"], consumers)
+    RAM_STATE["tick_handoff"] = TickHandoff(asyncio.get_running_loop(), capacity=RAM_STATE["tick_queue_capacity"], merge=_overflow_merge)
+    await _start_tick_pipeline(tick_worker_parallel)
+
+    # Auth & Config Restoration
+    await _restore_session()
+    # Load Universe
+    universe = await _load_universe()
+    RAM_STATE["subs"] = SubscriptionManager(
+        universe, _feed_set_mode, _feed_unsubscribe, adaptive=RAM_STATE["adaptive_modes"],
+        on_hot=_feed_hot if RAM_STATE["ws_standby"] else None,
+    )
+    asyncio.create_task(RAM_STATE["subs"].run())
+    if consumers:
+        RAM_STATE["engine_live"].update(await TradeControl.get_ring_engine_live())
+        asyncio.create_task(ring_state_sync())
+    if RAM_STATE["prune_universe"] and consumers:
+        # positions held by ring consumers are invisible here; never unsubscribe under them
+        logger.warning("✂️ Universe Pruner disabled: engines run in strategy_host processes")
+    elif RAM_STATE["prune_universe"]:
+        cap = max(BreakoutEngine.MAX_TRADES_PER_SYMBOL, MomentumEngine.MAX_TRADES_PER_SYMBOL)
+        RAM_STATE["pruner"] = UniversePruner(universe, RAM_STATE["subs"], RAM_STATE, max_trades_per_symbol=cap)
+        asyncio.create_task(RAM_STATE["pruner"].run())
 
     # Connect WebSocket
     if RAM_STATE["api_key"] and RAM_STATE["access_token"]:
         try:
-            kws = KiteTicker(RAM_STATE["api_key"], RAM_STATE["access_token"])
-            kws.on_ticks, kws.on_connect = on_ticks, on_connect
-            kws.connect(threaded=True)
+            n_tokens = len(RAM_STATE["stocks"])
+            n_conns = RAM_STATE["ws_connections"] or TickerPool.connections_for(n_tokens)
+            pool = TickerPool(
+                RAM_STATE["api_key"], RAM_STATE["access_token"], _enqueue_batch,
+                connections=n_conns, native=RAM_STATE["native_ws"], compact=_compact_ticks,
+                url=os.getenv("KITE_WS_URL") or None, on_state=on_feed_state,
+                standby=RAM_STATE["ws_standby"], live_window_sec=RAM_STATE["feed_stale_sec"],
+            )
+            pool.connect(_mode_groups())
+            pool.set_hot(RAM_STATE["subs"].hot_tokens(), True)
+            asyncio.create_task(pool.monitor())
+            kws = pool
             RAM_STATE["kws"] = kws
+        except ValueError as e:
+            logger.critical(f"🛑 [POOL] universe does not fit the Kite connection limit: {e}")
         except Exception as e:
             logger.error(f"WS Error: {e}")
 
 @app.on_event("shutdown")
 async def shutdown():
-    if RAM_STATE["kws"]: RAM_STATE["kws"].close()
\ No newline at end of file
+    if RAM_STATE["kws"]: RAM_STATE["kws"].close()
+    if RAM_STATE["tick_ring"]: RAM_STATE["tick_ring"].close()
\ No newline at end of file
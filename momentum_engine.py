@@ -4,9 +4,12 @@ import logging
 from datetime import datetime, time as dtime
 from math import floor
 from typing import Optional, Tuple
+import numpy as np
 import pytz
 
+from order_lane import run_order
 from redis_manager import TradeControl
+from trigger_book import ABOVE, BELOW
 
 logger = logging.getLogger("Nexus_Momentum")
 IST = pytz.timezone("Asia/Kolkata")
@@ -38,7 +41,9 @@ class MomentumEngine:
 
     Notes:
     - Candle aggregation MUST be centralized in main.py and call on_candle_close().
-    - Candle dict must contain "bucket" as datetime (or ISO string) for 09:15 detection.
+    - Orders: entry / exit are decided on the tick path; reserve_entry and kite.place_order
+      run on the per-token order lane (order_lane.py) so shard workers never wait on the broker.
+    - Candle dict "bucket" is an int epoch minute (datetime / ISO string also accepted) for 09:15 detection.
     """
 
     EXIT_BUFFER_PCT = 0.0001
@@ -46,6 +51,11 @@ class MomentumEngine:
 
     DEFAULT_SL_PCT = 0.005  # 0.5%
     FIRST_CANDLE_TIME = dtime(9, 15)
+    FIRST_CANDLE_MINUTE = 9 * 60 + 15  # minute-of-day IST
+    IST_OFFSET_MIN = 330
+
+    # Statuses for which main.py calls run() on ticks (TRIGGER_WATCH is served by the trigger book)
+    TICK_STATUSES = ("OPEN",)
 
     # -----------------------------
     # TICK FAST-PATH
@@ -69,47 +79,67 @@ class MomentumEngine:
             await MomentumEngine.monitor_active_trade(stock, float(ltp), state)
             return
 
-        # 2) Trigger watch -> break FIRST candle high/low
-        if mom_status == "TRIGGER_WATCH":
-            th = float(stock.get("mom_trigger_high", 0.0) or 0.0)
-            tl = float(stock.get("mom_trigger_low", 0.0) or 0.0)
-            if th <= 0 or tl <= 0:
-                return
+        # 2) TRIGGER_WATCH breaks are driven by the trigger book (on_trigger)
+        return
 
-            cfg_bull = state["config"].get("mom_bull", {}) or {}
-            cfg_bear = state["config"].get("mom_bear", {}) or {}
+    # -----------------------------
+    # TRIGGER BOOK CALLBACKS (called by main.py after each tick batch scan)
+    # -----------------------------
+    @staticmethod
+    async def on_trigger(token: int, side_key: str, ltp: float, state: dict):
+        """
+        Trigger book reported ltp broke FIRST candle high (mom_bull) or low (mom_bear).
+        """
+        stock = state["stocks"].get(token)
+        if not stock or stock.get("mom_status") != "TRIGGER_WATCH":
+            return
 
-            in_bull_window = MomentumEngine._within_trade_window(cfg_bull)
-            in_bear_window = MomentumEngine._within_trade_window(cfg_bear)
+        symbol = (stock.get("symbol") or "").strip().upper()
+        th = float(stock.get("mom_trigger_high", 0.0) or 0.0)
+        tl = float(stock.get("mom_trigger_low", 0.0) or 0.0)
+        if th <= 0 or tl <= 0:
+            return
 
-            if not (in_bull_window or in_bear_window):
-                logger.info(f"🕒 [MOM-WINDOW] {symbol} outside both windows; reset.")
-                MomentumEngine._reset_waiting(stock)
-                return
+        cfg_bull = state["config"].get("mom_bull", {}) or {}
+        cfg_bear = state["config"].get("mom_bear", {}) or {}
 
-            px = float(ltp)
+        in_bull_window = MomentumEngine._within_trade_window(cfg_bull)
+        in_bear_window = MomentumEngine._within_trade_window(cfg_bear)
 
-            # Break high => LONG
-            if px > th:
-                if not bool(state["engine_live"].get("mom_bull", True)):
-                    return
-                if not in_bull_window:
-                    return
-                logger.info(f"⚡ [MOM-FIRST-BREAK] {symbol} LONG ltp {px:.2f} > first_high {th:.2f}")
-                await MomentumEngine.open_trade(stock, px, state, "mom_bull")
+        if not (in_bull_window or in_bear_window):
+            logger.info(f"🕒 [MOM-WINDOW] {symbol} outside both windows; reset.")
+            MomentumEngine._reset_waiting(stock)
+            return
+
+        px = float(ltp)
+
+        # Break high => LONG
+        if side_key == "mom_bull" and px > th:
+            if not bool(state["engine_live"].get("mom_bull", True)):
+                return
+            if not in_bull_window:
                 return
+            logger.info(f"⚡ [MOM-FIRST-BREAK] {symbol} LONG ltp {px:.2f} > first_high {th:.2f}")
+            await MomentumEngine.open_trade(stock, px, state, "mom_bull")
+            return
 
-            # Break low => SHORT
-            if px < tl:
-                if not bool(state["engine_live"].get("mom_bear", True)):
-                    return
-                if not in_bear_window:
-                    return
-                logger.info(f"⚡ [MOM-FIRST-BREAK] {symbol} SHORT ltp {px:.2f} < first_low {tl:.2f}")
-                await MomentumEngine.open_trade(stock, px, state, "mom_bear")
+        # Break low => SHORT
+        if side_key == "mom_bear" and px < tl:
+            if not bool(state["engine_live"].get("mom_bear", True)):
                 return
+            if not in_bear_window:
+                return
+            logger.info(f"⚡ [MOM-FIRST-BREAK] {symbol} SHORT ltp {px:.2f} < first_low {tl:.2f}")
+            await MomentumEngine.open_trade(stock, px, state, "mom_bear")
+            return
 
-        return
+    @staticmethod
+    async def on_trigger_expire(token: int, side_key: str, state: dict):
+        stock = state["stocks"].get(token)
+        if not stock or stock.get("mom_status") != "TRIGGER_WATCH":
+            return
+        logger.info(f"🕒 [MOM-WINDOW] {(stock.get('symbol') or '').strip().upper()} outside both windows; reset.")
+        MomentumEngine._reset_waiting(stock)
 
     # -----------------------------
     # CANDLE CLOSE (only FIRST candle)
@@ -128,16 +158,16 @@ class MomentumEngine:
         if (stock.get("mom_status") or "WAITING").upper() == "OPEN":
             return
 
-        # Already captured first candle today?
-        today = datetime.now(IST).strftime("%Y%m%d")
-        if str(stock.get("mom_first_day") or "") == today:
-            return
-
         # Identify candle bucket time
         bucket = candle.get("bucket")
         bucket_dt: Optional[datetime] = None
         try:
-            if isinstance(bucket, datetime):
+            if isinstance(bucket, (int, np.integer)):
+                # epoch minute from main.py: integer check first, datetime only for the 09:15 candle
+                if (int(bucket) + MomentumEngine.IST_OFFSET_MIN) % 1440 != MomentumEngine.FIRST_CANDLE_MINUTE:
+                    return
+                bucket_dt = datetime.fromtimestamp(int(bucket) * 60, IST)
+            elif isinstance(bucket, datetime):
                 bucket_dt = bucket.astimezone(IST) if bucket.tzinfo else bucket.replace(tzinfo=IST)
             elif isinstance(bucket, str) and bucket:
                 bucket_dt = datetime.fromisoformat(bucket.replace("Z", "+00:00")).astimezone(IST)
@@ -151,6 +181,11 @@ class MomentumEngine:
         if bucket_dt.time() != MomentumEngine.FIRST_CANDLE_TIME:
             return
 
+        # Already captured first candle today?
+        today = bucket_dt.strftime("%Y%m%d")
+        if str(stock.get("mom_first_day") or "") == today:
+            return
+
         high = float(candle.get("high", 0) or 0)
         low = float(candle.get("low", 0) or 0)
         close = float(candle.get("close", 0) or 0)
@@ -174,7 +209,7 @@ class MomentumEngine:
             logger.info(f"🚫 [MOM-FIRST-SKIP] {symbol} gap={gap_pct:.2f}% (close={close:.2f}, prev={prev_close:.2f})")
             return
 
-        # Per-symbol cap check (Redis)
+        # Per-symbol cap check (local mirror of the Redis counts)
         try:
             taken = await TradeControl.get_symbol_trade_count(symbol)
             if int(taken) >= MomentumEngine.MAX_TRADES_PER_SYMBOL:
@@ -202,6 +237,7 @@ class MomentumEngine:
         stock["mom_trigger_low"] = float(low)
 
         stock["mom_status"] = "TRIGGER_WATCH"
+        MomentumEngine._arm_book(stock, state, high, low)
 
         # Scanner enrichment
         stock["mom_scan_vol"] = int(c_vol)
@@ -305,25 +341,6 @@ class MomentumEngine:
         # ✅ Direction hard-map
         txn_type = kite.TRANSACTION_TYPE_BUY if side_key == "mom_bull" else kite.TRANSACTION_TYPE_SELL
 
-        # 1) reserve side trade
-        side_limit = int(cfg.get("total_trades", 5) or 5)
-        if not await TradeControl.reserve_side_trade(side_key, side_limit):
-            logger.warning(f"🚫 [MOM-LIMIT] {symbol} side limit hit for {side_key}")
-            MomentumEngine._reset_waiting(stock)
-            return
-
-        # 2) reserve per-symbol
-        ok, reason = await TradeControl.reserve_symbol_trade(
-            symbol,
-            max_trades=MomentumEngine.MAX_TRADES_PER_SYMBOL,
-            lock_ttl_sec=1800,
-        )
-        if not ok:
-            logger.warning(f"🚫 [MOM-SYMBOL] {symbol} reserve failed: {reason}")
-            await TradeControl.rollback_side_trade(side_key)
-            MomentumEngine._reset_waiting(stock)
-            return
-
         # Stoploss: percent based
         try:
             sl_pct = float(cfg.get("sl_pct", MomentumEngine.DEFAULT_SL_PCT) or MomentumEngine.DEFAULT_SL_PCT)
@@ -339,8 +356,6 @@ class MomentumEngine:
         qty = floor(risk_amount / risk_per_share)
 
         if qty <= 0:
-            await TradeControl.rollback_symbol_trade(symbol)
-            await TradeControl.rollback_side_trade(side_key)
             MomentumEngine._reset_waiting(stock)
             return
 
@@ -358,52 +373,82 @@ class MomentumEngine:
             tsl_ratio = 1.5
         trail_step = float(risk_per_share * tsl_ratio) if tsl_ratio > 0 else float(risk_per_share)
 
-        try:
-            logger.info(
-                f"🧾 [MOM-ORDER] {symbol} {side_key.upper()} "
-                f"txn={'BUY' if txn_type==kite.TRANSACTION_TYPE_BUY else 'SELL'} "
-                f"qty={qty} entry={entry:.2f} sl={sl_px:.2f} tgt={target:.2f}"
-            )
+        # Decision on the tick path; reservation + broker round trip on the order lane
+        trade = {
+            "engine": "momentum",
+            "side": side_key,
+            "symbol": symbol,
+            "qty": int(qty),
+            "entry_price": float(entry),
+            "sl_price": float(sl_px),
+            "target_price": float(target),
+            "order_id": None,
+            "pnl": 0.0,
+            "status": "PENDING",
+            "entry_time": datetime.now(IST).strftime("%H:%M:%S"),
+            "init_risk": float(risk_per_share),
+            "trail_step": float(trail_step),
+        }
+
+        stock["mom_status"] = "OPEN"
+        stock["mom_active_trade"] = trade
+        stock["mom_side_latch"] = side_key
+
+        logger.info(
+            f"🧾 [MOM-ORDER] {symbol} {side_key.upper()} "
+            f"txn={'BUY' if txn_type==kite.TRANSACTION_TYPE_BUY else 'SELL'} "
+            f"qty={qty} entry={entry:.2f} sl={sl_px:.2f} tgt={target:.2f}"
+        )
+        await run_order(state, stock["token"], MomentumEngine._place_entry, stock, trade, state, txn_type, kite)
 
+    @staticmethod
+    async def _place_entry(stock: dict, trade: dict, state: dict, txn_type: str, kite):
+        """Order lane: reserve side trade + per-symbol (one round trip), then the order."""
+        symbol, side_key = trade["symbol"], trade["side"]
+        cfg = state["config"].get(side_key, {}) or {}
+        side_limit = int(cfg.get("total_trades", 5) or 5)
+        ok, reason = await TradeControl.reserve_entry(
+            side_key,
+            symbol,
+            side_limit,
+            MomentumEngine.MAX_TRADES_PER_SYMBOL,
+            lock_ttl=1800,
+        )
+        if not ok:
+            if reason == "SIDE_LIMIT":
+                logger.warning(f"🚫 [MOM-LIMIT] {symbol} side limit hit for {side_key}")
+            else:
+                logger.warning(f"🚫 [MOM-SYMBOL] {symbol} reserve failed: {reason}")
+            MomentumEngine._entry_failed(stock, trade)
+            return
+
+        try:
             order_id = await asyncio.to_thread(
                 kite.place_order,
                 variety=kite.VARIETY_REGULAR,
                 exchange=kite.EXCHANGE_NSE,
                 tradingsymbol=symbol,
                 transaction_type=txn_type,
-                quantity=int(qty),
+                quantity=int(trade["qty"]),
                 product=kite.PRODUCT_MIS,
                 order_type=kite.ORDER_TYPE_MARKET,
             )
-
-            trade = {
-                "engine": "momentum",
-                "side": side_key,
-                "symbol": symbol,
-                "qty": int(qty),
-                "entry_price": float(entry),
-                "sl_price": float(sl_px),
-                "target_price": float(target),
-                "order_id": order_id,
-                "pnl": 0.0,
-                "status": "OPEN",
-                "entry_time": datetime.now(IST).strftime("%H:%M:%S"),
-                "init_risk": float(risk_per_share),
-                "trail_step": float(trail_step),
-            }
-
-            state["trades"][side_key].append(trade)
-
-            stock["mom_status"] = "OPEN"
-            stock["mom_active_trade"] = trade
-            stock["mom_side_latch"] = side_key
-
-            logger.info(f"🚀 [MOM-ENTRY] {symbol} {side_key.upper()} order={order_id} qty={qty}")
-
         except Exception as e:
             logger.error(f"❌ [MOM-ORDER-FAIL] {symbol}: {e}")
-            await TradeControl.rollback_symbol_trade(symbol)
-            await TradeControl.rollback_side_trade(side_key)
+            await TradeControl.rollback_entry(side_key, symbol)
+            MomentumEngine._entry_failed(stock, trade)
+            return
+
+        trade["order_id"] = order_id
+        if trade["status"] == "PENDING":
+            trade["status"] = "OPEN"
+        state["trades"][side_key].append(trade)
+        logger.info(f"🚀 [MOM-ENTRY] {symbol} {side_key.upper()} order={order_id} qty={trade['qty']}")
+
+    @staticmethod
+    def _entry_failed(stock: dict, trade: dict):
+        trade["status"] = "FAILED"
+        if stock.get("mom_active_trade") is trade:
             MomentumEngine._reset_waiting(stock)
 
     # -----------------------------
@@ -491,7 +536,18 @@ class MomentumEngine:
         if kite:
             txn_type = kite.TRANSACTION_TYPE_SELL if is_bull else kite.TRANSACTION_TYPE_BUY
 
-        if trade and kite and symbol and txn_type:
+        if trade:
+            trade["status"] = "CLOSED"
+            trade["exit_time"] = datetime.now(IST).strftime("%H:%M:%S")
+            trade["exit_reason"] = reason
+
+        MomentumEngine._reset_waiting(stock)
+        # exit order + lock release on the order lane, after this token's entry
+        await run_order(state, stock.get("token"), MomentumEngine._place_exit, trade, symbol, reason, txn_type, kite)
+
+    @staticmethod
+    async def _place_exit(trade: Optional[dict], symbol: str, reason: str, txn_type: Optional[str], kite):
+        if trade and trade.get("order_id") and kite and symbol and txn_type:
             try:
                 exit_id = await asyncio.to_thread(
                     kite.place_order,
@@ -508,16 +564,10 @@ class MomentumEngine:
             except Exception as e:
                 logger.error(f"❌ [MOM-EXIT-FAIL] {symbol}: {e}")
 
-        if trade:
-            trade["status"] = "CLOSED"
-            trade["exit_time"] = datetime.now(IST).strftime("%H:%M:%S")
-            trade["exit_reason"] = reason
-
-        if symbol:
+        # a failed entry already rolled its lock back
+        if symbol and not (trade and trade.get("status") == "FAILED"):
             await TradeControl.release_symbol_lock(symbol)
 
-        MomentumEngine._reset_waiting(stock)
-
     # -----------------------------
     # HELPERS
     # -----------------------------
@@ -532,6 +582,30 @@ class MomentumEngine:
         stock["mom_scan_vol"] = 0
         stock["mom_scan_reason"] = None
 
+    @staticmethod
+    def _arm_book(stock: dict, state: dict, high: float, low: float):
+        """Arms both first-candle breaks; they expire when both trade windows have ended."""
+        u = state.get("universe")
+        if u is None:
+            return
+        i = u.index[stock["token"]]
+        now = datetime.now(IST)
+        expiry = max(
+            MomentumEngine._window_end_ts(state["config"].get("mom_bull", {}) or {}, now),
+            MomentumEngine._window_end_ts(state["config"].get("mom_bear", {}) or {}, now),
+        )
+        u.triggers.disarm("mom", i)
+        u.triggers.arm("mom", i, ABOVE, float(high), "mom_bull", expiry=expiry)
+        u.triggers.arm("mom", i, BELOW, float(low), "mom_bear", expiry=expiry)
+
+    @staticmethod
+    def _window_end_ts(cfg: dict, now: datetime) -> float:
+        try:
+            eh, em = map(int, str(cfg.get("trade_end", "15:10")).split(":"))
+            return now.replace(hour=eh, minute=em, second=0, microsecond=0).timestamp()
+        except Exception:
+            return 0.0
+
     @staticmethod
     def _within_trade_window(cfg: dict, now: Optional[datetime] = None) -> bool:
         try:
@@ -0,0 +1,76 @@
+# order_lane.py
+"""
+Nexus Order Lane (broker / Redis order I/O off the tick path)
+
+✅ Engines decide on the shard worker (status, sizing, exit reason) and hand
+   the slow part (reserve_entry, kite.place_order, lock release) to submit()
+✅ One chain per key (token): a token's jobs run strictly in submission order,
+   so an exit never overtakes its entry and a re-entry waits for the release
+✅ Jobs of different tokens run concurrently; the shard loop never awaits a
+   REST round trip, so hi-lane SL / target ticks keep draining
+✅ Per-job latency histogram, in-flight / failed counters
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from latency_histogram import LatencyHistogram
+
+logger = logging.getLogger("Nexus_OrderLane")
+
+
+class OrderLane:
+    def __init__(self):
+        self._tails: Dict[Any, asyncio.Task] = {}
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.latency = LatencyHistogram()
+
+    def submit(self, key: Any, job: Callable[..., Awaitable[Any]], *args) -> asyncio.Task:
+        """Schedules job(*args) after every job already submitted for key; returns its task."""
+        prev = self._tails.get(key)
+        task = asyncio.create_task(self._run(prev, job, args))
+        self._tails[key] = task
+        task.add_done_callback(lambda t, k=key: self._tails.pop(k, None) if self._tails.get(k) is t else None)
+        self.submitted += 1
+        return task
+
+    async def _run(self, prev: Any, job: Callable[..., Awaitable[Any]], args: tuple):
+        if prev is not None:
+            await asyncio.wait([prev])  # ordering only: the previous job's outcome is its own business
+        t0 = time.perf_counter()
+        try:
+            return await job(*args)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"❌ [ORDERS] {getattr(job, '__name__', job)} failed: {e}")
+        finally:
+            self.completed += 1
+            self.latency.record((time.perf_counter() - t0) * 1000.0)
+
+    async def drain(self):
+        """Waits for every job submitted so far (tests / shutdown)."""
+        while self._tails:
+            await asyncio.wait(list(self._tails.values()))
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.submitted - self.completed,
+            "chains": len(self._tails),
+            "latency_ms": self.latency.snapshot(),
+        }
+
+
+async def run_order(state: dict, key: Any, job: Callable[..., Awaitable[Any]], *args):
+    """Engine helper: through the lane when the process has one, inline otherwise."""
+    lane = state.get("orders")
+    if lane is None:
+        await job(*args)
+    else:
+        lane.submit(key, job, *args)
@@ -8,11 +8,32 @@ Fixes included (as discussed in this thread):
    - per-side daily trade limit (reserve_side_trade / rollback_side_trade)
    - per-symbol daily max trades (reserve_symbol_trade / rollback_symbol_trade)
    - open-position lock per symbol (prevents 2nd trade before 1st close)
+   - reserve_entry / rollback_entry: side cap + symbol cap + open lock + TTLs
+     in ONE script (one round trip per entry attempt)
+✅ Scripts loaded once (SCRIPT LOAD at connect), called by EVALSHA, reloaded
+   automatically on NOSCRIPT; TTLs set inside the scripts (EXPIREAT to a
+   cached IST end-of-day epoch); round trips per call in TradeControl.script_stats()
+✅ Per-symbol daily counts live in ONE hash per day (nexus:trades:symbols:{day},
+   HINCRBY) mirrored in-process: warmed with one HGETALL, updated from our own
+   script results, refreshed on keyspace notifications from other instances
+   (our own writes are recognised and not refetched; CONFIG SET of
+   notify-keyspace-events only with REDIS_KEYSPACE_CONFIG=1; with
+   notifications off: startup warning + short fallback resync)
+   -> get_symbol_trade_count() makes no Redis call once warm
+✅ Market cache in one hash (nexus:market_cache); get_all_market_data loads it
+   with HKEYS + pipelined chunked HMGET and decodes off the event loop; legacy
+   nexus:market:{token} keys are copied in once at startup (marker key)
+✅ Versioned universe snapshots: sync writes nexus:universe:v{N}:*, flips
+   nexus:universe:current atomically and only forward (compare-and-flip
+   script), GCs old versions; readers load one version
+✅ Ring mode (strategy_host processes): hosts publish engine status changes and
+   their trades, the ingest process publishes engine toggles / square-offs
+   (pub/sub for latency, hashes for the state a late subscriber resyncs from)
 ✅ Daily keys (IST) so limits reset automatically each day
 ✅ Compatible with existing code:
    - save/get config (api key/secret)
    - save/get access token
-   - market cache save/get/delete/all
+   - market cache save/get/delete/all (hash nexus:market_cache)
    - subscribe universe save/get
    - last sync set/get
 ✅ Strong logging + safe fallbacks
@@ -27,12 +48,15 @@ Drop-in replace your existing redis_manager.py with this file.
 import os
 import json
 import ssl
+import time
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional, List, Tuple
 
 import pytz
 import redis.asyncio as redis
+from redis.exceptions import NoScriptError
 
 logger = logging.getLogger("Redis_Manager")
 IST = pytz.timezone("Asia/Kolkata")
@@ -64,11 +88,17 @@ def _ist_day_key() -> str:
     return datetime.now(IST).strftime("%Y%m%d")
 
 
-def _seconds_until_ist_eod() -> int:
-    """Expire keys at IST end-of-day (safer than 24h)."""
-    now = datetime.now(IST)
-    eod = now.replace(hour=23, minute=59, second=59, microsecond=0)
-    return max(60, int((eod - now).total_seconds()))
+_eod_cache: Tuple[str, int] = ("", 0)
+
+
+def _ist_eod_epoch() -> int:
+    """IST 23:59:59 of today as a unix epoch, computed once per IST day (for EXPIREAT)."""
+    global _eod_cache
+    day = _ist_day_key()
+    if _eod_cache[0] != day:
+        now = datetime.now(IST)
+        _eod_cache = (day, int(now.replace(hour=23, minute=59, second=59, microsecond=0).timestamp()))
+    return _eod_cache[1]
 
 
 async def get_redis() -> redis.Redis:
@@ -104,6 +134,7 @@ async def get_redis() -> redis.Redis:
     try:
         _r = redis.from_url(url, **kwargs)
         await _r.ping()
+        await _load_scripts(_r)
         logger.info("✅ Redis connected successfully.")
     except Exception as e:
         logger.error(f"❌ Redis connection failed: {e}")
@@ -113,33 +144,52 @@ async def get_redis() -> redis.Redis:
     return _r
 
 
+# -----------------------------
+# Universe snapshots (written by sync_market_data, read at startup)
+# -----------------------------
+UNIVERSE_CURRENT_KEY = "nexus:universe:current"        # -> live version number
+UNIVERSE_VERSIONS_KEY = "nexus:universe:versions"      # zset version -> published_at
+UNIVERSE_VERSION_SEQ_KEY = "nexus:universe:version_seq"
+UNIVERSE_KEEP_VERSIONS = int(os.getenv("UNIVERSE_KEEP_VERSIONS", "2"))
+UNIVERSE_STAGING_TTL_SEC = 3600
+
+
+def _snapshot_keys(ver: Any) -> Tuple[str, str]:
+    """(market hash, meta hash) of one universe version."""
+    return f"nexus:universe:v{ver}:market", f"nexus:universe:v{ver}:meta"
+
+
 # -----------------------------
 # LUA scripts (redis-py signature)
-# NOTE: redis.asyncio.eval signature is:
-#   await r.eval(script, numkeys, key1, key2, ..., arg1, arg2, ...)
+# NOTE: called through _run_script -> redis.asyncio.evalsha:
+#   await r.evalsha(sha, numkeys, key1, key2, ..., arg1, arg2, ...)
 # -----------------------------
 
 # Reserve 1 side trade if under limit (atomic)
 _LUA_RESERVE_SIDE = """
 local key = KEYS[1]
 local limit = tonumber(ARGV[1])
+local eod = tonumber(ARGV[2])
 local cur = tonumber(redis.call('GET', key) or '0')
 if cur >= limit then
   return 0
 end
 redis.call('INCR', key)
+redis.call('EXPIREAT', key, eod)
 return 1
 """
 
 # Rollback side trade count (never below 0)
 _LUA_ROLLBACK_SIDE = """
 local key = KEYS[1]
+local eod = tonumber(ARGV[1])
 local cur = tonumber(redis.call('GET', key) or '0')
 if cur <= 0 then
   redis.call('SET', key, 0)
-  return 1
+else
+  redis.call('DECR', key)
 end
-redis.call('DECR', key)
+redis.call('EXPIREAT', key, eod)
 return 1
 """
 
@@ -150,47 +200,252 @@ local lock_key  = KEYS[2]
 
 local max_trades = tonumber(ARGV[1])
 local lock_ttl   = tonumber(ARGV[2])
+local eod        = tonumber(ARGV[3])
+local symbol     = ARGV[4]
+
+local cur = tonumber(redis.call('HGET', count_key, symbol) or '0')
 
 -- if already open => block
 if redis.call('EXISTS', lock_key) == 1 then
-  return {0, "LOCKED"}
+  return {0, "LOCKED", cur}
 end
 
-local cur = tonumber(redis.call('GET', count_key) or '0')
 if cur >= max_trades then
-  return {0, "MAX_TRADES"}
+  return {0, "MAX_TRADES", cur}
 end
 
--- increment daily count
-redis.call('INCR', count_key)
-
 -- set open lock NX EX
 local ok = redis.call('SET', lock_key, '1', 'NX', 'EX', lock_ttl)
 if not ok then
-  -- rollback count if lock failed
-  redis.call('DECR', count_key)
-  return {0, "LOCKED"}
+  return {0, "LOCKED", cur}
 end
 
-return {1, "OK"}
+-- increment daily count (per-day hash, field = symbol)
+cur = redis.call('HINCRBY', count_key, symbol, 1)
+redis.call('EXPIREAT', count_key, eod)
+
+return {1, "OK", cur}
 """
 
-# Rollback symbol reserve: delete lock + decrement count (never below 0)
+# Rollback symbol reserve: delete lock + decrement count (never below 0); returns new count
 _LUA_ROLLBACK_SYMBOL = """
 local count_key = KEYS[1]
 local lock_key  = KEYS[2]
+local eod       = tonumber(ARGV[1])
+local symbol    = ARGV[2]
 
 redis.call('DEL', lock_key)
 
-local cur = tonumber(redis.call('GET', count_key) or '0')
+local cur = tonumber(redis.call('HGET', count_key, symbol) or '0')
 if cur <= 0 then
-  redis.call('SET', count_key, 0)
+  cur = 0
+  redis.call('HSET', count_key, symbol, 0)
 else
-  redis.call('DECR', count_key)
+  cur = redis.call('HINCRBY', count_key, symbol, -1)
 end
-return 1
+redis.call('EXPIREAT', count_key, eod)
+return cur
 """
 
+# Whole entry reservation in one round trip:
+# side cap -> open lock -> symbol cap, then increments + lock + EOD TTLs.
+# Nothing is written unless every check passes. Returns {ok, reason, symbol_count}.
+_LUA_RESERVE_ENTRY = """
+local side_key  = KEYS[1]
+local count_key = KEYS[2]
+local lock_key  = KEYS[3]
+
+local side_limit = tonumber(ARGV[1])
+local max_trades = tonumber(ARGV[2])
+local lock_ttl   = tonumber(ARGV[3])
+local eod        = tonumber(ARGV[4])
+local symbol     = ARGV[5]
+
+local cur = tonumber(redis.call('HGET', count_key, symbol) or '0')
+if tonumber(redis.call('GET', side_key) or '0') >= side_limit then
+  return {0, "SIDE_LIMIT", cur}
+end
+if redis.call('EXISTS', lock_key) == 1 then
+  return {0, "LOCKED", cur}
+end
+if cur >= max_trades then
+  return {0, "MAX_TRADES", cur}
+end
+
+redis.call('INCR', side_key)
+redis.call('EXPIREAT', side_key, eod)
+cur = redis.call('HINCRBY', count_key, symbol, 1)
+redis.call('EXPIREAT', count_key, eod)
+redis.call('SET', lock_key, '1', 'EX', lock_ttl)
+return {1, "OK", cur}
+"""
+
+# Undo reserve_entry: drop lock, decrement both counters (never below 0); returns symbol count
+_LUA_ROLLBACK_ENTRY = """
+local side_key  = KEYS[1]
+local count_key = KEYS[2]
+local lock_key  = KEYS[3]
+local eod       = tonumber(ARGV[1])
+local symbol    = ARGV[2]
+
+redis.call('DEL', lock_key)
+if tonumber(redis.call('GET', side_key) or '0') > 0 then
+  redis.call('DECR', side_key)
+else
+  redis.call('SET', side_key, 0)
+end
+redis.call('EXPIREAT', side_key, eod)
+
+local cur = tonumber(redis.call('HGET', count_key, symbol) or '0')
+if cur > 0 then
+  cur = redis.call('HINCRBY', count_key, symbol, -1)
+else
+  cur = 0
+  redis.call('HSET', count_key, symbol, 0)
+end
+redis.call('EXPIREAT', count_key, eod)
+return cur
+"""
+
+# Universe pointer compare-and-flip: only a newer version goes live; a stale
+# publisher's staged keys are dropped. Returns {flipped, live version}.
+_LUA_FLIP_UNIVERSE = """
+local current_key  = KEYS[1]
+local versions_key = KEYS[2]
+local market_key   = KEYS[3]
+local meta_key     = KEYS[4]
+local ver          = tonumber(ARGV[1])
+
+local cur = tonumber(redis.call('GET', current_key) or '0')
+if ver <= cur then
+  redis.call('DEL', market_key, meta_key)
+  return {0, cur}
+end
+
+redis.call('PERSIST', market_key)
+redis.call('PERSIST', meta_key)
+redis.call('SET', current_key, ver)
+redis.call('ZADD', versions_key, ARGV[2], ARGV[1])
+-- legacy readers of the token list
+redis.call('SET', KEYS[5], ARGV[3])
+redis.call('SET', KEYS[6], ARGV[4])
+redis.call('SET', KEYS[7], ARGV[5])
+return {1, ver}
+"""
+
+def _symbol_counts_key(day: Optional[str] = None) -> str:
+    return f"nexus:trades:symbols:{day or _ist_day_key()}"
+
+
+class _SymbolCountMirror:
+    """Local copy of today's per-symbol trade counts (the hash above)."""
+
+    def __init__(self):
+        self.day = ""
+        self.counts: Dict[str, int] = {}
+        self.warm = False
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.notifications = 0
+        self.own_skipped = 0
+        self.listening = False
+        self.keyspace_events: Optional[bool] = None  # server flags checked on (re)subscribe; None == unknown
+        # keyspace events still expected for our own script writes; a foreign
+        # event taken for ours is caught by settle() or the next own event
+        self.own_pending = 0
+        self.dirty = False
+
+    def roll(self) -> str:
+        day = _ist_day_key()
+        if day != self.day:
+            # a new day's hash starts empty; other instances' writes still arrive as events
+            self.day = day
+            self.counts = {}
+        return day
+
+    def get(self, symbol: str) -> int:
+        self.roll()
+        self.hits += 1
+        return self.counts.get(symbol, 0)
+
+    def put(self, day: str, symbol: str, count: Any):
+        if day == self.roll():
+            self.counts[symbol] = max(0, int(count))
+
+    def load(self, day: str, mapping: Dict[str, str]):
+        if day == self.roll():
+            self.counts = {k: int(v) for k, v in mapping.items()}
+            self.warm = True
+            self.refreshes += 1
+            self.own_pending = 0
+            self.dirty = False
+
+    def expect_own(self):
+        """Before a script that may write the count hash (only while listening)."""
+        if self.listening:
+            self.own_pending += 1
+
+    def settle(self, wrote: bool):
+        """After that script: if it did not write, its expected event will never come."""
+        if wrote or not self.listening:
+            return
+        if self.own_pending > 0:
+            self.own_pending -= 1
+        else:
+            self.dirty = True  # the event we consumed as ours was another writer's
+
+    def on_event(self) -> bool:
+        """One keyspace write event on today's hash; True when the mirror must refetch."""
+        self.notifications += 1
+        if self.own_pending > 0:
+            self.own_pending -= 1
+            self.own_skipped += 1
+            return False
+        return True
+
+
+_counts = _SymbolCountMirror()
+
+
+# -----------------------------
+# Script registry (EVALSHA)
+# -----------------------------
+_SCRIPTS: Dict[str, str] = {
+    "reserve_side": _LUA_RESERVE_SIDE,
+    "rollback_side": _LUA_ROLLBACK_SIDE,
+    "reserve_symbol": _LUA_RESERVE_SYMBOL,
+    "rollback_symbol": _LUA_ROLLBACK_SYMBOL,
+    "reserve_entry": _LUA_RESERVE_ENTRY,
+    "rollback_entry": _LUA_ROLLBACK_ENTRY,
+    "flip_universe": _LUA_FLIP_UNIVERSE,
+}
+_SHAS: Dict[str, str] = {}
+# op -> {"calls": n, "round_trips": n, "reloads": n}
+_SCRIPT_STATS: Dict[str, Dict[str, int]] = {name: {"calls": 0, "round_trips": 0, "reloads": 0} for name in _SCRIPTS}
+
+
+async def _load_scripts(r: redis.Redis) -> None:
+    for name, body in _SCRIPTS.items():
+        _SHAS[name] = await r.script_load(body)
+
+
+async def _run_script(r: redis.Redis, name: str, keys: List[str], args: List[Any]) -> Any:
+    """EVALSHA by registry name; on NOSCRIPT (restart / failover / SCRIPT FLUSH) reload once and retry."""
+    stats = _SCRIPT_STATS[name]
+    stats["calls"] += 1
+    sha = _SHAS.get(name)
+    if sha:
+        stats["round_trips"] += 1
+        try:
+            return await r.evalsha(sha, len(keys), *keys, *args)
+        except NoScriptError:
+            logger.warning(f"♻️ Lua script {name} missing on server (NOSCRIPT), reloading")
+    stats["reloads"] += 1
+    stats["round_trips"] += 2
+    _SHAS[name] = await r.script_load(_SCRIPTS[name])
+    return await r.evalsha(_SHAS[name], len(keys), *keys, *args)
+
 
 class TradeControl:
     # -----------------------------
@@ -249,8 +504,7 @@ class TradeControl:
     async def save_market_data(token: str, market_data: dict) -> bool:
         try:
             r = await get_redis()
-            key = f"nexus:market:{token}"
-            await r.set(key, json.dumps(market_data))
+            await r.hset(MARKET_CACHE_KEY, str(token), json.dumps(market_data))
             return True
         except Exception as e:
             logger.error(f"Failed to save market data {token}: {e}")
@@ -260,8 +514,9 @@ class TradeControl:
     async def get_market_data(token: str) -> dict:
         try:
             r = await get_redis()
-            key = f"nexus:market:{token}"
-            raw = await r.get(key)
+            raw = await r.hget(MARKET_CACHE_KEY, str(token))
+            if raw is None:
+                raw = await r.get(f"nexus:market:{token}")  # legacy per-token key
             return json.loads(raw) if raw else {}
         except Exception as e:
             logger.error(f"Failed to get market data {token}: {e}")
@@ -271,8 +526,10 @@ class TradeControl:
     async def delete_market_data(token: str) -> bool:
         try:
             r = await get_redis()
-            key = f"nexus:market:{token}"
-            await r.delete(key)
+            pipe = r.pipeline(transaction=False)
+            pipe.hdel(MARKET_CACHE_KEY, str(token))
+            pipe.delete(f"nexus:market:{token}")
+            await pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Failed to delete market data {token}: {e}")
@@ -282,23 +539,138 @@ class TradeControl:
     async def get_all_market_data() -> Dict[str, dict]:
         """
         Returns dict: { token_str: {...market_data...}, ... }
+
+        Reads ONE consistent version: the snapshot nexus:universe:current points to
+        (resolved once), else the unversioned nexus:market_cache hash.
+        HKEYS + chunked HMGET in one pipeline (2 round trips for the whole
+        universe); JSON decoding runs in a worker thread. Legacy per-token keys are
+        folded in once at startup (migrate_legacy_market_keys), never here.
         """
+        t0 = time.perf_counter()
         try:
             r = await get_redis()
-            out: Dict[str, dict] = {}
-            async for key in r.scan_iter(match="nexus:market:*"):
-                token = str(key).split(":")[-1]
-                raw = await r.get(key)
-                if raw:
-                    try:
-                        out[token] = json.loads(raw)
-                    except Exception:
-                        out[token] = {}
+            ver = await r.get(UNIVERSE_CURRENT_KEY)
+            key = _snapshot_keys(ver)[0] if ver else MARKET_CACHE_KEY
+            source = f"snapshot v{ver}" if ver else "hash"
+            fields = await r.hkeys(key)
+            raws = await _chunked(r, fields, lambda pipe, chunk: pipe.hmget(key, chunk))
+            out = await asyncio.to_thread(_decode_market_rows, fields, raws)
+            logger.info(f"📦 Market data: {len(out)} tokens from {source} in {(time.perf_counter() - t0) * 1000:.0f} ms")
             return out
         except Exception as e:
             logger.error(f"Failed to get all market data: {e}")
             return {}
 
+    @staticmethod
+    async def migrate_legacy_market_keys() -> int:
+        """
+        One-time startup step: copies nexus:market:{token} keys into the market cache
+        hash (legacy value wins). Gated by a marker key taken with SET NX, so it runs
+        once per Redis across restarts and instances; the legacy keys are left in
+        place for older deploys that still read them. Returns rows copied.
+        """
+        try:
+            r = await get_redis()
+            if not await r.set(MARKET_LEGACY_MIGRATED_KEY, str(int(time.time())), nx=True):
+                return 0
+            try:
+                moved = await _migrate_legacy_market_keys(r)
+            except Exception:
+                await r.delete(MARKET_LEGACY_MIGRATED_KEY)  # let the next startup retry
+                raise
+            if moved:
+                logger.info(f"📦 Migrated {moved} legacy market keys into {MARKET_CACHE_KEY}")
+            return moved
+        except Exception as e:
+            logger.error(f"Legacy market key migration failed: {e}")
+            return 0
+
+    # -----------------------------
+    # ✅ NEW: VERSIONED UNIVERSE SNAPSHOTS (blue/green)
+    # -----------------------------
+    @staticmethod
+    async def publish_universe_snapshot(rows: Dict[str, dict], tokens: List[int], symbols: List[str]) -> int:
+        """
+        Writes a complete new version (market hash + meta) through one pipeline in
+        chunks, then flips nexus:universe:current with a compare-and-flip script
+        (only if the new version is above the live one, so a slow sync can never
+        roll the pointer back) and GCs old versions.
+        Staged keys carry a TTL until the flip, so an aborted sync leaves nothing behind.
+        Returns the new version (0 on failure or when a newer one is already live).
+        """
+        try:
+            r = await get_redis()
+            ver = int(await r.incr(UNIVERSE_VERSION_SEQ_KEY))
+            market_key, meta_key = _snapshot_keys(ver)
+            encoded = await asyncio.to_thread(lambda: [(str(t), json.dumps(md)) for t, md in rows.items()])
+            updated_at = datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S")
+            meta = {
+                "tokens": json.dumps([int(x) for x in tokens]),
+                "symbols": json.dumps(list(symbols)),
+                "updated_at": updated_at,
+                "count": len(encoded),
+            }
+
+            pipe = r.pipeline(transaction=False)
+            for i in range(0, len(encoded), MARKET_LOAD_CHUNK):
+                pipe.hset(market_key, mapping=dict(encoded[i:i + MARKET_LOAD_CHUNK]))
+            pipe.hset(meta_key, mapping=meta)
+            pipe.expire(market_key, UNIVERSE_STAGING_TTL_SEC)
+            pipe.expire(meta_key, UNIVERSE_STAGING_TTL_SEC)
+            await pipe.execute()
+
+            # atomic flip: readers see either the old version or all of the new one
+            flipped, live = await _run_script(
+                r,
+                "flip_universe",
+                [UNIVERSE_CURRENT_KEY, UNIVERSE_VERSIONS_KEY, market_key, meta_key,
+                 "nexus:universe:tokens", "nexus:universe:symbols", "nexus:universe:updated_at"],
+                [str(ver), str(time.time()), meta["tokens"], meta["symbols"], updated_at],
+            )
+            if not int(flipped):
+                logger.warning(f"⏭️ Universe snapshot v{ver} discarded: v{live} is already live")
+                return 0
+            logger.info(f"🔀 Universe snapshot v{ver} live ({len(encoded)} tokens)")
+
+            await TradeControl.gc_universe_snapshots()
+            return ver
+        except Exception as e:
+            logger.error(f"Failed to publish universe snapshot: {e}")
+            return 0
+
+    @staticmethod
+    async def gc_universe_snapshots(keep: int = UNIVERSE_KEEP_VERSIONS) -> int:
+        """
+        Deletes all but the newest `keep` versions (the current one always survives,
+        the previous one stays for readers that resolved the pointer just before a flip).
+        """
+        try:
+            r = await get_redis()
+            current = await r.get(UNIVERSE_CURRENT_KEY)
+            old = await r.zrange(UNIVERSE_VERSIONS_KEY, 0, -(max(1, int(keep)) + 1))
+            old = [v for v in old if v != current]
+            if not old:
+                return 0
+            pipe = r.pipeline(transaction=False)
+            for v in old:
+                pipe.delete(*_snapshot_keys(v))
+            pipe.zrem(UNIVERSE_VERSIONS_KEY, *old)
+            await pipe.execute()
+            logger.info(f"🧹 Universe snapshots removed: {', '.join('v' + v for v in old)}")
+            return len(old)
+        except Exception as e:
+            logger.error(f"Failed to GC universe snapshots: {e}")
+            return 0
+
+    @staticmethod
+    async def get_universe_version() -> int:
+        try:
+            r = await get_redis()
+            return int(await r.get(UNIVERSE_CURRENT_KEY) or 0)
+        except Exception as e:
+            logger.error(f"Failed to get universe version: {e}")
+            return 0
+
     # -----------------------------
     # LAST SYNC
     # -----------------------------
@@ -366,7 +738,8 @@ class TradeControl:
     async def get_subscribe_universe_tokens() -> List[int]:
         try:
             r = await get_redis()
-            raw = await r.get("nexus:universe:tokens")
+            ver = await r.get(UNIVERSE_CURRENT_KEY)
+            raw = await r.hget(_snapshot_keys(ver)[1], "tokens") if ver else await r.get("nexus:universe:tokens")
             if not raw:
                 return []
             data = json.loads(raw)
@@ -388,8 +761,7 @@ class TradeControl:
             r = await get_redis()
             day = _ist_day_key()
             key = f"nexus:trades:side:{day}:{side}"
-            ok = await r.eval(_LUA_RESERVE_SIDE, 1, key, str(int(limit)))
-            await r.expire(key, _seconds_until_ist_eod())
+            ok = await _run_script(r, "reserve_side", [key], [str(int(limit)), str(_ist_eod_epoch())])
             return int(ok) == 1
         except Exception as e:
             logger.error(f"reserve_side_trade failed for {side}: {e}")
@@ -404,8 +776,7 @@ class TradeControl:
             r = await get_redis()
             day = _ist_day_key()
             key = f"nexus:trades:side:{day}:{side}"
-            await r.eval(_LUA_ROLLBACK_SIDE, 1, key)
-            await r.expire(key, _seconds_until_ist_eod())
+            await _run_script(r, "rollback_side", [key], [str(_ist_eod_epoch())])
             return True
         except Exception as e:
             logger.error(f"rollback_side_trade failed for {side}: {e}")
@@ -447,26 +818,26 @@ class TradeControl:
         try:
             r = await get_redis()
             day = _ist_day_key()
-            count_key = f"nexus:trades:symbol:{day}:{symbol}"
+            count_key = _symbol_counts_key(day)
             lock_key = f"nexus:pos:open:{symbol}"
 
-            res = await r.eval(
-                _LUA_RESERVE_SYMBOL,
-                2,
-                count_key,
-                lock_key,
-                str(int(max_trades)),
-                str(int(lock_ttl_sec)),
+            _counts.expect_own()
+            res = await _run_script(
+                r,
+                "reserve_symbol",
+                [count_key, lock_key],
+                [str(int(max_trades)), str(int(lock_ttl_sec)), str(_ist_eod_epoch()), symbol],
             )
 
-            # With decode_responses=True, res is list like ['1','OK'] or ['0','LOCKED']
+            # With decode_responses=True, res is list like [1, 'OK', 1] or [0, 'LOCKED', 0]
             ok = int(res[0]) == 1
             reason = str(res[1])
-
-            await r.expire(count_key, _seconds_until_ist_eod())
+            _counts.settle(ok)
+            _counts.put(day, symbol, res[2])
             return ok, reason
 
         except Exception as e:
+            _counts.dirty = True
             logger.error(f"reserve_symbol_trade failed for {symbol}: {e}")
             return False, "ERROR"
 
@@ -483,15 +854,77 @@ class TradeControl:
         try:
             r = await get_redis()
             day = _ist_day_key()
-            count_key = f"nexus:trades:symbol:{day}:{symbol}"
+            count_key = _symbol_counts_key(day)
             lock_key = f"nexus:pos:open:{symbol}"
-            await r.eval(_LUA_ROLLBACK_SYMBOL, 2, count_key, lock_key)
-            await r.expire(count_key, _seconds_until_ist_eod())
+            _counts.expect_own()
+            cur = await _run_script(r, "rollback_symbol", [count_key, lock_key], [str(_ist_eod_epoch()), symbol])
+            _counts.put(day, symbol, cur)
             return True
         except Exception as e:
+            _counts.dirty = True
             logger.error(f"rollback_symbol_trade failed for {symbol}: {e}")
             return False
 
+    # -----------------------------
+    # ✅ NEW: SINGLE ROUND-TRIP ENTRY RESERVATION
+    # -----------------------------
+    @staticmethod
+    async def reserve_entry(side: str, symbol: str, side_limit: int, symbol_max: int = 2, lock_ttl: int = 1800):
+        """
+        reserve_side_trade + reserve_symbol_trade in one atomic script.
+
+        Returns: (ok: bool, reason: str)
+          reason in: OK, SIDE_LIMIT, LOCKED, MAX_TRADES, ERROR
+        """
+        symbol = str(symbol or "").strip().upper()
+        if not symbol:
+            return False, "ERROR"
+
+        try:
+            r = await get_redis()
+            day = _ist_day_key()
+            _counts.expect_own()
+            res = await _run_script(
+                r,
+                "reserve_entry",
+                [f"nexus:trades:side:{day}:{side}", _symbol_counts_key(day), f"nexus:pos:open:{symbol}"],
+                [str(int(side_limit)), str(int(symbol_max)), str(int(lock_ttl)), str(_ist_eod_epoch()), symbol],
+            )
+            ok = int(res[0]) == 1
+            _counts.settle(ok)
+            _counts.put(day, symbol, res[2])
+            return ok, str(res[1])
+        except Exception as e:
+            _counts.dirty = True
+            logger.error(f"reserve_entry failed for {side}/{symbol}: {e}")
+            return False, "ERROR"
+
+    @staticmethod
+    async def rollback_entry(side: str, symbol: str) -> bool:
+        """
+        Undo reserve_entry when the order cannot be placed (one round trip).
+        """
+        symbol = str(symbol or "").strip().upper()
+        if not symbol:
+            return False
+
+        try:
+            r = await get_redis()
+            day = _ist_day_key()
+            _counts.expect_own()
+            cur = await _run_script(
+                r,
+                "rollback_entry",
+                [f"nexus:trades:side:{day}:{side}", _symbol_counts_key(day), f"nexus:pos:open:{symbol}"],
+                [str(_ist_eod_epoch()), symbol],
+            )
+            _counts.put(day, symbol, cur)
+            return True
+        except Exception as e:
+            _counts.dirty = True
+            logger.error(f"rollback_entry failed for {side}/{symbol}: {e}")
+            return False
+
     @staticmethod
     async def release_symbol_lock(symbol: str) -> bool:
         """
@@ -512,19 +945,185 @@ class TradeControl:
     async def get_symbol_trade_count(symbol: str) -> int:
         """
         How many trades taken today for this symbol.
+        Served from the local mirror once warm (no Redis call); HGET before that.
         """
         symbol = str(symbol or "").strip().upper()
         if not symbol:
             return 0
+        if _counts.warm:
+            return _counts.get(symbol)
         try:
             r = await get_redis()
             day = _ist_day_key()
-            v = await r.get(f"nexus:trades:symbol:{day}:{symbol}")
+            _counts.misses += 1
+            v = await r.hget(_symbol_counts_key(day), symbol)
             return int(v) if v else 0
         except Exception as e:
             logger.error(f"get_symbol_trade_count failed for {symbol}: {e}")
             return 0
 
+    # -----------------------------
+    # ✅ NEW: SYMBOL COUNT MIRROR (warm + keyspace sync)
+    # -----------------------------
+    @staticmethod
+    async def warm_symbol_counts() -> int:
+        """One HGETALL of today's count hash into the local mirror. Returns symbols loaded."""
+        try:
+            r = await get_redis()
+            day = _ist_day_key()
+            key = _symbol_counts_key(day)
+            if not _counts.warm:
+                # first warm after upgrading: fold today's legacy per-symbol keys into the hash
+                # (SCAN, then chunked MGET + HSETNX pipelines: no per-key round trips)
+                legacy = f"nexus:trades:symbol:{day}:"
+                keys = [k async for k in r.scan_iter(match=legacy + "*", count=500)]
+                vals = await _chunked(r, keys, lambda pipe, chunk: pipe.mget(chunk))
+                rows = [(k[len(legacy):], int(v)) for k, v in zip(keys, vals) if v]
+                pipe = r.pipeline(transaction=False)
+                for symbol, v in rows:
+                    pipe.hsetnx(key, symbol, v)
+                pipe.expireat(key, _ist_eod_epoch())
+                await pipe.execute()
+            _counts.load(day, await r.hgetall(key))
+            return len(_counts.counts)
+        except Exception as e:
+            logger.error(f"warm_symbol_counts failed: {e}")
+            return 0
+
+    @staticmethod
+    async def start_symbol_count_mirror(resync_sec: float = 60.0) -> int:
+        """
+        Warms the mirror and starts the keyspace-notification listener (periodic resync
+        as fallback; SYMBOL_COUNT_FALLBACK_RESYNC_SEC when notifications are off).
+        """
+        n = await TradeControl.warm_symbol_counts()
+        asyncio.create_task(_symbol_count_sync(resync_sec))
+        logger.info(f"🧮 Symbol trade counts mirrored locally ({n} symbols today)")
+        return n
+
+    @staticmethod
+    def symbol_count_stats() -> Dict[str, Any]:
+        return {
+            "warm": _counts.warm,
+            "symbols": len(_counts.counts),
+            "local_hits": _counts.hits,
+            "redis_reads": _counts.misses,
+            "refreshes": _counts.refreshes,
+            "notifications": _counts.notifications,
+            "own_skipped": _counts.own_skipped,
+            "listening": _counts.listening,
+            "keyspace_events": _counts.keyspace_events,
+        }
+
+    @staticmethod
+    def script_stats() -> Dict[str, Dict[str, float]]:
+        """Per-script calls / Redis round trips (1.0 per call once scripts are cached server-side)."""
+        return {
+            name: {**st, "round_trips_per_call": round(st["round_trips"] / st["calls"], 2) if st["calls"] else 0.0}
+            for name, st in _SCRIPT_STATS.items()
+        }
+
+    # -----------------------------
+    # RING MODE: STRATEGY HOST <-> INGEST STATE
+    # -----------------------------
+    @staticmethod
+    async def publish_ring_statuses(changes: List[Tuple[str, int, int]]) -> bool:
+        """Host side: [(prefix, token, status code)] in order; WAITING (0) removes the token."""
+        if not changes:
+            return True
+        try:
+            r = await get_redis()
+            pipe = r.pipeline(transaction=False)
+            for prefix in {p for p, _, _ in changes}:
+                pipe.expireat(_ring_status_key(prefix), _ist_eod_epoch())
+            for prefix, token, code in changes:
+                if code:
+                    pipe.hset(_ring_status_key(prefix), str(token), int(code))
+                else:
+                    pipe.hdel(_ring_status_key(prefix), str(token))
+            pipe.publish(RING_EVENTS_CHANNEL, json.dumps([[p, int(t), int(c)] for p, t, c in changes]))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"publish_ring_statuses failed ({len(changes)} changes): {e}")
+            return False
+
+    @staticmethod
+    async def clear_ring_statuses(prefix: str) -> bool:
+        """Host side, at start: nothing is armed or open yet for this engine."""
+        try:
+            r = await get_redis()
+            await r.delete(_ring_status_key(prefix))
+            await r.publish(RING_EVENTS_CHANNEL, json.dumps({"resync": prefix}))
+            return True
+        except Exception as e:
+            logger.error(f"clear_ring_statuses failed for {prefix}: {e}")
+            return False
+
+    @staticmethod
+    async def get_ring_statuses(prefix: str) -> Dict[int, int]:
+        try:
+            r = await get_redis()
+            return {int(t): int(c) for t, c in (await r.hgetall(_ring_status_key(prefix))).items()}
+        except Exception as e:
+            logger.error(f"get_ring_statuses failed for {prefix}: {e}")
+            return {}
+
+    @staticmethod
+    async def publish_ring_control(msg: dict) -> bool:
+        """Ingest side: UI control action for the hosts; engine toggles are also kept in a hash."""
+        try:
+            r = await get_redis()
+            pipe = r.pipeline(transaction=False)
+            if msg.get("action") == "toggle_engine":
+                pipe.hset(RING_ENGINE_LIVE_KEY, str(msg.get("side")), "1" if msg.get("enabled") else "0")
+            pipe.publish(RING_CONTROL_CHANNEL, json.dumps(msg))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"publish_ring_control failed: {e}")
+            return False
+
+    @staticmethod
+    async def get_ring_engine_live() -> Dict[str, bool]:
+        try:
+            r = await get_redis()
+            return {k: v == "1" for k, v in (await r.hgetall(RING_ENGINE_LIVE_KEY)).items()}
+        except Exception as e:
+            logger.error(f"get_ring_engine_live failed: {e}")
+            return {}
+
+    @staticmethod
+    async def save_ring_trades(slot: str, trades: Dict[str, list]) -> bool:
+        try:
+            r = await get_redis()
+            pipe = r.pipeline(transaction=False)
+            pipe.hset(RING_TRADES_KEY, slot, json.dumps(trades, default=str))
+            pipe.expireat(RING_TRADES_KEY, _ist_eod_epoch())
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"save_ring_trades failed for {slot}: {e}")
+            return False
+
+    @staticmethod
+    async def get_ring_trades() -> Dict[str, Dict[str, list]]:
+        """slot -> {side: [trade, ...]} as last saved by each strategy host."""
+        try:
+            r = await get_redis()
+            return {slot: json.loads(raw) for slot, raw in (await r.hgetall(RING_TRADES_KEY)).items() if raw}
+        except Exception as e:
+            logger.error(f"get_ring_trades failed: {e}")
+            return {}
+
+    @staticmethod
+    def ring_listen(channel: str, on_message, on_subscribed=None) -> asyncio.Task:
+        """
+        Background subscriber: on_message(payload) per message (sync or async);
+        on_subscribed() after every (re)subscribe so the caller resyncs what it missed.
+        """
+        return asyncio.create_task(_ring_listen(channel, on_message, on_subscribed))
+
     # -----------------------------
     # LEGACY: can_trade (kept for compatibility)
     # -----------------------------
@@ -536,3 +1135,171 @@ class TradeControl:
         If order fails, you must call rollback_side_trade(side).
         """
         return await TradeControl.reserve_side_trade(side, limit)
+
+
+# -----------------------------
+# Bulk market-cache load helpers
+# -----------------------------
+MARKET_CACHE_KEY = "nexus:market_cache"  # hash: token -> market_data JSON
+MARKET_LOAD_CHUNK = int(os.getenv("MARKET_LOAD_CHUNK", "500"))
+MARKET_LEGACY_MIGRATED_KEY = "nexus:market_cache:legacy_migrated"  # marker: one-time copy done
+
+
+async def _chunked(r: redis.Redis, items: List[Any], queue_cmd, chunk: int = MARKET_LOAD_CHUNK) -> List[Any]:
+    """Queues one command per fixed-size chunk on a single pipeline; flattens list replies."""
+    if not items:
+        return []
+    pipe = r.pipeline(transaction=False)
+    for i in range(0, len(items), chunk):
+        queue_cmd(pipe, items[i:i + chunk])
+    out: List[Any] = []
+    for res in await pipe.execute():
+        if isinstance(res, list):
+            out.extend(res)
+    return out
+
+
+async def _migrate_legacy_market_keys(r: redis.Redis) -> int:
+    """Copies nexus:market:{token} keys into the market cache hash (chunked MGET, chunked HSET); returns rows copied."""
+    keys = [k async for k in r.scan_iter(match="nexus:market:*", count=1000)]
+    if not keys:
+        return 0
+    raws = await _chunked(r, keys, lambda pipe, chunk: pipe.mget(chunk))
+    rows = [(str(k).split(":")[-1], v) for k, v in zip(keys, raws) if v]
+    await _chunked(r, rows, lambda pipe, chunk: pipe.hset(MARKET_CACHE_KEY, mapping=dict(chunk)))
+    return len(rows)
+
+
+def _decode_market_rows(fields: List[str], raws: List[Optional[str]]) -> Dict[str, dict]:
+    out: Dict[str, dict] = {}
+    for token, raw in zip(fields, raws):
+        if not raw:
+            continue
+        try:
+            out[str(token)] = json.loads(raw)
+        except Exception:
+            out[str(token)] = {}
+    return out
+
+
+# -----------------------------
+# Symbol count sync (other instances / processes)
+# -----------------------------
+KEYSPACE_CONFIG = os.getenv("REDIS_KEYSPACE_CONFIG", "0") == "1"  # opt-in: CONFIG SET is server-wide
+# resync period when keyspace notifications are off (pruner cap checks read these counts)
+SYMBOL_COUNT_FALLBACK_RESYNC_SEC = float(os.getenv("SYMBOL_COUNT_FALLBACK_RESYNC_SEC", "5"))
+# keyspace events that change the count hash (EXPIRE / EXPIREAT from our scripts do not)
+_COUNT_WRITE_EVENTS = {"hincrby", "hset", "hsetnx", "hdel", "del", "expired"}
+
+
+async def _enable_keyspace_events(r: redis.Redis):
+    """Adds K (keyspace) + h (hash) to notify-keyspace-events; managed Redis may refuse CONFIG."""
+    cur = (await r.config_get("notify-keyspace-events")).get("notify-keyspace-events", "") or ""
+    want = set(cur)
+    if "A" not in want:
+        want.update("h")
+    want.update("K")
+    if want != set(cur):
+        await r.config_set("notify-keyspace-events", "".join(sorted(want)))
+
+
+async def _keyspace_events_on(r: redis.Redis) -> Optional[bool]:
+    """Whether the server publishes keyspace hash events; None when CONFIG GET is refused."""
+    try:
+        cur = (await r.config_get("notify-keyspace-events")).get("notify-keyspace-events", "") or ""
+    except Exception:
+        return None
+    return "K" in cur and ("h" in cur or "A" in cur)
+
+
+async def _symbol_count_sync(resync_sec: float):
+    pubsub = None
+    last = time.monotonic()
+    period = resync_sec
+    while True:
+        try:
+            if pubsub is None:
+                r = await get_redis()
+                if KEYSPACE_CONFIG:
+                    try:
+                        await _enable_keyspace_events(r)
+                    except Exception as e:
+                        logger.warning(f"⚠️ CONFIG SET notify-keyspace-events refused ({e}); relying on server config")
+                on = await _keyspace_events_on(r)
+                _counts.keyspace_events = on
+                period = resync_sec if on else min(resync_sec, SYMBOL_COUNT_FALLBACK_RESYNC_SEC)
+                if not on:
+                    logger.warning(
+                        f"⚠️ Keyspace notifications {'OFF' if on is False else 'unverified (CONFIG GET refused)'}: "
+                        f"other instances' symbol counts resync every {period:.0f}s only. "
+                        f"Set notify-keyspace-events to include Kh, or REDIS_KEYSPACE_CONFIG=1"
+                    )
+                pubsub = r.pubsub()
+                await pubsub.psubscribe("__keyspace@*__:nexus:trades:symbols:*")
+                _counts.listening = on is not False  # off: no own events will come, nothing to expect
+
+            dirty = _counts.dirty
+            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            while msg is not None:
+                if str(msg.get("channel", "")).endswith(_ist_day_key()) and msg.get("data") in _COUNT_WRITE_EVENTS:
+                    if _counts.on_event():
+                        dirty = True
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+
+            if dirty or time.monotonic() - last >= period:
+                last = time.monotonic()
+                await TradeControl.warm_symbol_counts()
+        except Exception as e:
+            logger.error(f"❌ symbol count sync failed: {e}")
+            _counts.listening = False
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            pubsub = None
+            await asyncio.sleep(5.0)
+
+
+# -----------------------------
+# Ring mode pub/sub (strategy_host <-> ingest)
+# -----------------------------
+RING_EVENTS_CHANNEL = "nexus:ring:events"     # host -> ingest: status changes
+RING_CONTROL_CHANNEL = "nexus:ring:control"   # ingest -> hosts: UI actions
+RING_ENGINE_LIVE_KEY = "nexus:ring:engine_live"
+RING_TRADES_KEY = "nexus:ring:trades"         # hash: slot -> trades JSON
+
+
+def _ring_status_key(prefix: str) -> str:
+    """hash: token -> status code of every non-WAITING token of one engine."""
+    return f"nexus:ring:status:{prefix}"
+
+
+async def _ring_listen(channel: str, on_message, on_subscribed):
+    pubsub = None
+    while True:
+        try:
+            if pubsub is None:
+                r = await get_redis()
+                pubsub = r.pubsub()
+                await pubsub.subscribe(channel)
+                if on_subscribed is not None:
+                    await on_subscribed()
+            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if msg is None:
+                continue
+            try:
+                res = on_message(json.loads(msg["data"]))
+                if asyncio.iscoroutine(res):
+                    await res
+            except Exception as e:
+                logger.error(f"❌ ring listener {channel} handler failed: {e}")
+        except Exception as e:
+            logger.error(f"❌ ring listener {channel} failed: {e}")
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            pubsub = None
+            await asyncio.sleep(2.0)
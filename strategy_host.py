@@ -0,0 +1,161 @@
+# strategy_host.py
+"""
+Nexus Strategy Host (one process per engine, fed from the shared-memory tick ring)
+
+✅ Attaches to the ring created by the ingest process (main.py with
+   TICK_RING_CONSUMERS set) and reads through its own cursor slot
+✅ Runs the same tick pipeline as main.py (candles, shards, trigger book,
+   stale guard) for the engines it hosts only; no web server, no Kite socket
+✅ Ring records are read as NumPy views over shared memory; batches are
+   re-split per publish so recv_ts / stale checks behave as in-process
+✅ Strategy settings are reloaded from Redis periodically (the UI saves them
+   from the ingest process); trade caps are already enforced in Redis
+✅ Status changes of its engines are published to the ingest process (adaptive
+   FULL mode, hot standby, lane ranking there); its trades are saved for the
+   ingest UI (orders / pnl); engine toggles and square-offs arrive from the UI
+✅ Logs cursor lag / lost records; the ingest /api/stats shows every consumer
+
+Run on one Linux box (the ring is a /dev/shm segment, so all processes share a host):
+    TICK_RING_CONSUMERS=brk,mom gunicorn -w 1 -k uvicorn.workers.UvicornWorker main:app
+    python strategy_host.py brk
+    python strategy_host.py mom
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+
+import main as core
+from redis_manager import TradeControl, RING_CONTROL_CHANNEL
+from tick_ring import TickRing, RingCursor, split_batches
+from universe_store import UniverseStore
+
+logger = logging.getLogger("Nexus_StrategyHost")
+
+POLL_SLEEP_SEC = float(os.getenv("TICK_RING_POLL_MS", "1")) / 1000.0
+POLL_MAX_RECORDS = int(os.getenv("TICK_RING_POLL_MAX", "8192"))
+SETTINGS_REFRESH_SEC = float(os.getenv("STRATEGY_SETTINGS_REFRESH_SEC", "15"))
+STATS_EVERY_SEC = 30.0
+TRADES_SAVE_SEC = float(os.getenv("STRATEGY_TRADES_SAVE_SEC", "1"))
+
+
+async def _attach(name: str) -> TickRing:
+    while True:
+        try:
+            return TickRing.attach(name)
+        except FileNotFoundError:
+            logger.info(f"⏳ [HOST] waiting for tick ring {name}")
+            await asyncio.sleep(1.0)
+
+
+def ring_tick_worker(cursor: RingCursor):
+    async def _worker():
+        logger.info(f"🧵 Ring Consumer {cursor.name}: Active")
+        while True:
+            views = cursor.poll(POLL_MAX_RECORDS)
+            if not views:
+                await asyncio.sleep(POLL_SLEEP_SEC)
+                continue
+            # coalescing folds the ring views in place; only the per-tick path copies ticks out
+            coalesce = core.RAM_STATE["tick_coalesce"]
+            if coalesce:
+                folded = core._coalesce_records(views)
+            else:
+                batches = [b for v in views for b in split_batches(v)]
+            n = sum(len(v) for v in views)
+            if not cursor.valid(views):
+                # writer lapped us while decoding: drop, poll() re-syncs and counts the loss
+                logger.warning(f"⚠️ [HOST] {cursor.name} records overwritten during read")
+                continue
+            cursor.commit(n)
+            if coalesce:
+                await core._consume_records(*folded, n)
+            else:
+                await core._consume_batches(None, batches)
+    return _worker
+
+
+async def _refresh_settings():
+    while True:
+        for side in core.RAM_STATE["config"]:
+            saved = await TradeControl.get_strategy_settings(side)
+            if saved:
+                core.RAM_STATE["config"][side].update(saved)
+        await asyncio.sleep(SETTINGS_REFRESH_SEC)
+
+
+async def _publish_statuses(u: UniverseStore, engines):
+    """Status listener -> one ordered writer, so the ingest mirror never sees changes out of order."""
+    queue: asyncio.Queue = asyncio.Queue()
+    published = {}
+
+    def _listener(i: int):
+        token = int(u.tokens[i])
+        for prefix in engines:
+            code = int(getattr(u, f"{prefix}_status")[i])
+            if published.get((prefix, token), 0) != code:
+                published[(prefix, token)] = code
+                queue.put_nowait((prefix, token, code))
+
+    for prefix in engines:
+        await TradeControl.clear_ring_statuses(prefix)
+    u.status_listeners.append(_listener)
+    while True:
+        changes = [await queue.get()]
+        while not queue.empty():
+            changes.append(queue.get_nowait())
+        await TradeControl.publish_ring_statuses(changes)
+
+
+async def _save_trades(slot: str):
+    last = None
+    while True:
+        trades = core.RAM_STATE["trades"]
+        snapshot = json.dumps(trades, default=str, sort_keys=True)
+        if snapshot != last and await TradeControl.save_ring_trades(slot, trades):
+            last = snapshot
+        await asyncio.sleep(TRADES_SAVE_SEC)
+
+
+async def _load_engine_live():
+    core.RAM_STATE["engine_live"].update(await TradeControl.get_ring_engine_live())
+
+
+async def run(slot: str, engines):
+    state = core.RAM_STATE
+    state["engines"] = set(engines)
+    state["ring_consumers"] = []
+
+    ring = await _attach(state["ring_name"])
+    cursor = ring.cursor(slot)
+    cursor.seek_head()
+    logger.info(f"🚀 Strategy Host '{slot}' engines={sorted(state['engines'])} ring={state['ring_name']}")
+
+    await core._start_tick_pipeline(ring_tick_worker(cursor))
+    await core._restore_session()
+    asyncio.create_task(_refresh_settings())
+    universe = await core._load_universe()
+    asyncio.create_task(_publish_statuses(universe, sorted(state["engines"])))
+    asyncio.create_task(_save_trades(slot))
+    TradeControl.ring_listen(RING_CONTROL_CHANNEL, core._apply_control, _load_engine_live)
+
+    try:
+        while True:
+            await asyncio.sleep(STATS_EVERY_SEC)
+            st = cursor.stats()
+            logger.info(f"📊 [HOST] {slot} lag={st['lag']} lost={st['lost']} processed={st['processed']}")
+    finally:
+        ring.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python strategy_host.py <ring slot> [engine,engine]  (engines default to the slot name)")
+    slot_name = sys.argv[1]
+    engine_names = (sys.argv[2] if len(sys.argv) > 2 else slot_name).split(",")
+    try:
+        asyncio.run(run(slot_name, engine_names))
+    except KeyboardInterrupt:
+        pass
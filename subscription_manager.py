@@ -0,0 +1,166 @@
+# subscription_manager.py
+"""
+Nexus Subscription Manager (adaptive per-token feed modes)
+
+✅ WAITING tokens stream in QUOTE mode (ltp + cumulative volume, 44-byte packets)
+✅ A token moves to FULL only while an engine has it armed (TRIGGER_WATCH) or OPEN
+✅ Status changes are collected from the UniverseStore and flushed in batches,
+   one set_mode call per mode per flush, over the live socket
+✅ groups() gives the current token lists per mode for (re)subscribe
+✅ drop() unsubscribes pruned tokens; they stay out of every later resubscribe
+✅ on_hot(tokens, hot) reports tokens entering / leaving the armed-or-OPEN set
+   (feeds the hot-standby connection), whether or not modes are adaptive
+
+LTP mode is not used: it carries no volume and the 1m candles need it.
+"""
+
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from universe_store import UniverseStore
+
+logger = logging.getLogger("Nexus_Subscriptions")
+
+MODE_QUOTE = "quote"
+MODE_FULL = "full"
+
+
+class SubscriptionManager:
+    def __init__(
+        self,
+        universe: UniverseStore,
+        apply: Callable[[str, List[int]], None],
+        unsubscribe: Optional[Callable[[List[int]], None]] = None,
+        adaptive: bool = True,
+        flush_interval: float = 0.25,
+        on_hot: Optional[Callable[[List[int], bool], None]] = None,
+    ):
+        """
+        apply(mode, tokens) / unsubscribe(tokens) push changes to the live feed
+        (must be safe to call from the loop). adaptive=False keeps every token FULL.
+        """
+        self.u = universe
+        self.apply = apply
+        self.unsubscribe = unsubscribe
+        self.adaptive = bool(adaptive)
+        self.flush_interval = float(flush_interval)
+        self.on_hot = on_hot
+
+        self.hot = np.zeros(universe.size, dtype=bool)
+        for i in range(universe.size):
+            self.hot[i] = not universe.is_idle(i)
+        self.full = self.hot.copy() if self.adaptive else np.ones(universe.size, dtype=bool)
+        self.pruned = np.zeros(universe.size, dtype=bool)
+
+        self._dirty: set = set()
+        self.mode_changes = 0
+        self.flushes = 0
+
+        if self.adaptive or on_hot is not None:
+            universe.status_listeners.append(self.mark)
+
+    def mark(self, i: int):
+        self._dirty.add(i)
+
+    def mode_of(self, i: int) -> str:
+        return MODE_FULL if self.full[i] else MODE_QUOTE
+
+    def hot_tokens(self) -> List[int]:
+        return self.u.tokens[self.hot & ~self.pruned].tolist()
+
+    def groups(self, indices=None) -> Dict[str, List[int]]:
+        """mode -> tokens for the given dense indices (default: whole universe)."""
+        idx = np.arange(self.u.size) if indices is None else np.asarray(indices, dtype=np.int64)
+        idx = idx[~self.pruned[idx]]
+        full = self.full[idx]
+        return {
+            MODE_FULL: self.u.tokens[idx[full]].tolist(),
+            MODE_QUOTE: self.u.tokens[idx[~full]].tolist(),
+        }
+
+    # -----------------------------
+    # BATCHED FLUSH
+    # -----------------------------
+    def flush(self) -> int:
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        up: List[int] = []
+        down: List[int] = []
+        hot_up: List[int] = []
+        hot_down: List[int] = []
+        for i in dirty:
+            if self.pruned[i]:
+                continue
+            want = not self.u.is_idle(i)
+            if want == bool(self.hot[i]):
+                continue
+            self.hot[i] = want
+            token = int(self.u.tokens[i])
+            (hot_up if want else hot_down).append(token)
+            if self.adaptive:
+                self.full[i] = want
+                (up if want else down).append(token)
+
+        if self.on_hot is not None:
+            for hot, tokens in ((True, hot_up), (False, hot_down)):
+                if not tokens:
+                    continue
+                try:
+                    self.on_hot(tokens, hot)
+                except Exception as e:
+                    logger.error(f"❌ [SUBS] hot update failed for {len(tokens)} tokens: {e}")
+
+        for mode, tokens in ((MODE_FULL, up), (MODE_QUOTE, down)):
+            if not tokens:
+                continue
+            try:
+                self.apply(mode, tokens)
+            except Exception as e:
+                logger.error(f"❌ [SUBS] set_mode {mode} failed for {len(tokens)} tokens: {e}")
+        changed = len(hot_up) + len(hot_down)
+        if changed:
+            self.mode_changes += len(up) + len(down)
+            self.flushes += 1
+        return changed
+
+    # -----------------------------
+    # PRUNING
+    # -----------------------------
+    def drop(self, indices: Iterable[int]) -> int:
+        """Unsubscribes tokens for the rest of the day. Returns how many were newly dropped."""
+        idx = [int(i) for i in indices if not self.pruned[int(i)]]
+        if not idx:
+            return 0
+        self.pruned[idx] = True
+        for i in idx:
+            self._dirty.discard(i)
+        self.hot[idx] = False
+        if self.unsubscribe:
+            try:
+                self.unsubscribe(self.u.tokens[idx].tolist())
+            except Exception as e:
+                logger.error(f"❌ [SUBS] unsubscribe failed for {len(idx)} tokens: {e}")
+        return len(idx)
+
+    async def run(self):
+        logger.info("📶 Subscription Manager: Active")
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def stats(self) -> dict:
+        live = ~self.pruned
+        n_full = int((self.full & live).sum())
+        return {
+            "full": n_full,
+            "quote": int(live.sum()) - n_full,
+            "pruned": int(self.pruned.sum()),
+            "hot": int((self.hot & live).sum()),
+            "mode_changes": self.mode_changes,
+            "flushes": self.flushes,
+            "pending": len(self._dirty),
+        }
@@ -1697,39 +1697,25 @@ async def _fetch_one(
             return (t_id, symbol, False, 0.0, None)
         finally:
             await asyncio.sleep(REQ_SLEEP)
-async def _persist_results(results: List[Tuple[int, str, bool, float, Optional[dict]]]) -> Tuple[List[int], List[str]]:
+async def _persist_results(results: List[Tuple[int, str, bool, float, Optional[dict]]]) -> Tuple[List[int], List[str], int]:
     """
-    Parallel Redis writes (safe).
-    Also cleans up non-eligible tokens so stale market cache doesn't remain.
+    Writes ONE complete new universe version (eligible tokens only) and flips
+    nexus:universe:current to it; non-eligible tokens are simply absent from the
+    new version, old versions are garbage-collected by TradeControl.
+    Returns (eligible_tokens, eligible_symbols, version); version 0 == not published.
     """
     eligible_tokens: List[int] = []
     eligible_symbols: List[str] = []
-
-    async def _save_ok(t_id: int, md: dict):
-        await TradeControl.save_market_data(str(t_id), md)
-
-    async def _delete_bad(t_id: int):
-        # optional cleanup
-        await TradeControl.delete_market_data(str(t_id))
-
-    save_tasks = []
-    delete_tasks = []
+    rows: Dict[str, dict] = {}
 
     for (t_id, sym, ok, sma, md) in results:
         if ok and md:
             eligible_tokens.append(int(t_id))
             eligible_symbols.append(str(sym))
-            save_tasks.append(asyncio.create_task(_save_ok(t_id, md)))
-        else:
-            delete_tasks.append(asyncio.create_task(_delete_bad(t_id)))
+            rows[str(t_id)] = md
 
-    # do Redis ops concurrently (this is the "parallel processing integration" for sync)
-    if save_tasks:
-        await asyncio.gather(*save_tasks, return_exceptions=True)
-    if delete_tasks:
-        await asyncio.gather(*delete_tasks, return_exceptions=True)
-
-    return eligible_tokens, eligible_symbols
+    ver = await TradeControl.publish_universe_snapshot(rows, eligible_tokens, eligible_symbols)
+    return eligible_tokens, eligible_symbols, ver
 
 
 async def run_sync() -> None:
@@ -1762,7 +1748,7 @@ async def run_sync() -> None:
         logger.info(f"🧭 Universe candidates: {len(target)} stocks")
 
         if not target:
-            await TradeControl.save_subscribe_universe([], [])
+            await TradeControl.publish_universe_snapshot({}, [], [])
             await TradeControl.set_last_sync()
             logger.warning("⚠️ No target stocks found. Universe cleared.")
             return
@@ -1776,18 +1762,18 @@ async def run_sync() -> None:
         ]
         results = await asyncio.gather(*tasks)
 
-        # Persist to Redis (parallel writes + cleanup)
-        eligible_tokens, eligible_symbols = await _persist_results(results)
-
-        # Persist universe tokens list for websocket subscription
-        await TradeControl.save_subscribe_universe(eligible_tokens, eligible_symbols)
+        # Persist to Redis: new versioned snapshot (market data + token list), then atomic flip
+        eligible_tokens, eligible_symbols, ver = await _persist_results(results)
+        if not ver:
+            logger.error("❌ Universe snapshot not published; the live version is kept.")
+            return
         await TradeControl.set_last_sync()
 
         logger.info(
             f"✅ SUCCESS: {len(eligible_tokens)} eligible stocks saved (SMA >= {MIN_VOL_SMA})."
         )
         logger.info(
-            f"📡 Universe tokens persisted: nexus:universe:tokens (count={len(eligible_tokens)})"
+            f"📡 Universe snapshot v{ver} live: nexus:universe:current (count={len(eligible_tokens)})"
         )
 
         # Optional debug summary
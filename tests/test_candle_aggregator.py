@@ -0,0 +1,46 @@
+# tests/test_candle_aggregator.py
+"""
+Higher-timeframe bars must close at their boundary even when the period's last
+minute never produced a 1m candle (illiquid token, the session's final bar):
+the minute sweep closes them through CandleAggregator.close_due.
+"""
+
+from main import CandleAggregator
+
+TOKEN = 101
+# 09:15 IST on an epoch-minute grid: session-aligned start of every timeframe
+B0 = (29_000_000 // 1440) * 1440 + CandleAggregator.SESSION_START_MIN - CandleAggregator.IST_OFFSET_MIN
+
+
+def _candle(bucket: int, px: float, vol: int) -> dict:
+    return {"bucket": bucket, "open": px, "high": px + 1, "low": px - 1, "close": px, "volume": vol}
+
+
+def _closes(agg: CandleAggregator) -> list:
+    seen = []
+    for tf in agg.timeframes:
+        agg.subscribe(tf, lambda token, tf, bucket, o, h, l, c, v: seen.append((tf, bucket, o, c, v)))
+    return seen
+
+
+def test_htf_bar_closes_at_sweep_without_its_last_minute():
+    agg = CandleAggregator((1, 3))
+    seen = _closes(agg)
+    agg.on_1m_close(TOKEN, _candle(B0, 100.0, 10))
+    agg.on_1m_close(TOKEN, _candle(B0 + 1, 101.0, 20))  # no trade in B0 + 2
+
+    assert agg.close_due(B0 + 2) == 0  # B0 + 2 not swept yet: the bar may still get its last minute
+    assert agg.close_due(B0 + 3) == 1
+    assert (3, B0, 100.0, 101.0, 30) in seen
+    assert agg.close_due(B0 + 4) == 0  # closed once
+    assert list(agg.last_bars(TOKEN, 3, 5)["bucket"]) == [B0]
+
+
+def test_htf_bar_closed_by_its_last_minute_is_not_swept_again():
+    agg = CandleAggregator((1, 3))
+    seen = _closes(agg)
+    for k in range(3):
+        agg.on_1m_close(TOKEN, _candle(B0 + k, 100.0 + k, 10))
+
+    assert agg.close_due(B0 + 3) == 0
+    assert [s for s in seen if s[0] == 3] == [(3, B0, 100.0, 102.0, 30)]
@@ -0,0 +1,91 @@
+# tests/test_candle_volume.py
+"""
+1m candle volume must not depend on how ticks were batched: feeding the same
+ticks one by one and as one coalesced entry has to give the same candle.
+"""
+
+import main
+from universe_store import UniverseStore
+
+TOKEN = 101
+T0 = 1_700_000_040.0  # start of an epoch minute
+TICKS = [  # (ltp, cum_vol, exch_ts) inside one minute
+    (100.0, 1000, T0 + 1),
+    (101.0, 1200, T0 + 5),
+    (99.5, 1350, T0 + 20),
+    (100.5, 1500, T0 + 50),
+]
+
+
+def _store() -> UniverseStore:
+    return UniverseStore({str(TOKEN): {"symbol": "TEST", "pdh": 110.0, "pdl": 90.0, "prev_close": 100.0, "sma": 1000.0}})
+
+
+def _candle(u: UniverseStore) -> tuple:
+    i = u.idx(TOKEN)
+    return (float(u.c_open[i]), float(u.c_high[i]), float(u.c_low[i]), float(u.c_close[i]), int(u.c_volume[i]))
+
+
+def test_coalesced_entry_opening_candle_keeps_volume():
+    per_tick = _store()
+    i = per_tick.idx(TOKEN)
+    for ltp, vol, ts in TICKS:
+        main._update_1m_candle(per_tick, i, int(ts) // 60, ltp, vol)
+
+    coalesced = _store()
+    _, latest = main._coalesce_ticks([(T0 + 60, [(TOKEN, ltp, vol, ts) for ltp, vol, ts in TICKS])])
+    first, ltp, vol, high, low, _, _, bucket, first_vol = latest[TOKEN]
+    main._update_1m_candle(coalesced, coalesced.idx(TOKEN), bucket, ltp, vol, high, low, first, first_vol)
+
+    assert _candle(per_tick)[4] == 500
+    assert _candle(coalesced) == _candle(per_tick)
+
+
+def test_coalesced_entry_continuing_candle_keeps_volume():
+    per_tick = _store()
+    i = per_tick.idx(TOKEN)
+    for ltp, vol, ts in TICKS:
+        main._update_1m_candle(per_tick, i, int(ts) // 60, ltp, vol)
+
+    coalesced = _store()
+    j = coalesced.idx(TOKEN)
+    ltp, vol, ts = TICKS[0]
+    main._update_1m_candle(coalesced, j, int(ts) // 60, ltp, vol)
+    _, latest = main._coalesce_ticks([(T0 + 60, [(TOKEN, ltp, vol, ts) for ltp, vol, ts in TICKS[1:]])])
+    first, ltp, vol, high, low, _, _, bucket, first_vol = latest[TOKEN]
+    main._update_1m_candle(coalesced, j, bucket, ltp, vol, high, low, first, first_vol)
+
+    assert _candle(coalesced) == _candle(per_tick)
+
+
+def test_late_volume_after_sweep_is_carried_into_next_candle():
+    u = _store()
+    i = u.idx(TOKEN)
+    for ltp, vol, ts in TICKS:
+        main._update_1m_candle(u, i, int(ts) // 60, ltp, vol)
+    minute = int(T0) // 60
+    main._sweep_open_candles(u, minute + 1)
+
+    assert main._update_1m_candle(u, i, minute, 100.0, 1600) is None  # late: candle stays closed
+    main._update_1m_candle(u, i, minute + 1, 101.0, 1700)
+
+    assert int(u.c_volume[i]) == 200
+
+
+def test_tick_stamped_59_arriving_after_boundary_lands_in_its_minute():
+    u = _store()
+    i = u.idx(TOKEN)
+    for ltp, vol, ts in TICKS:
+        main._update_1m_candle(u, i, int(ts) // 60, ltp, vol)
+    minute = int(T0) // 60
+    exch_ts, recv_ts = T0 + 59, T0 + 60.3  # exchange second :59, received at :00.3
+
+    sweep_ts = main._next_sweep_ts(T0 + 59.5)
+    assert recv_ts < sweep_ts  # the sweeper has not closed the minute yet
+    late = main.RAM_STATE["candle_close_stats"]["late_ticks"]
+    main._update_1m_candle(u, i, main._tick_bucket(exch_ts, recv_ts), 102.5, 1650)
+    closed = dict(main._sweep_open_candles(u, int(sweep_ts) // 60))[TOKEN]
+
+    assert main.RAM_STATE["candle_close_stats"]["late_ticks"] == late
+    assert closed["close"] == 102.5 and closed["high"] == 102.5
+    assert closed["volume"] == 650
@@ -0,0 +1,75 @@
+# tests/test_coalesce_records.py
+"""
+Strategy hosts fold tick-ring records in place (_coalesce_records); the result
+must match the per-tick fold (_coalesce_ticks) the ingest process uses on the
+same ticks: same latest entries, same spilled entries per token, same order.
+"""
+
+import random
+
+import numpy as np
+
+import main
+from tick_ring import RECORD_DTYPE
+
+T0 = 1_700_000_040.0  # start of an epoch minute
+
+
+def _ticks(seed: int, n: int = 400) -> list:
+    """Bursts across 3 minutes with late ticks, missing exchange stamps and filtered rows."""
+    rnd = random.Random(seed)
+    vols = {t: 1000 for t in (101, 102, 103, 104)}
+    out, recv = [], T0
+    for _ in range(n):
+        recv += rnd.choice((0.0, 0.0, 0.25))
+        token = rnd.choice((101, 102, 103, 104, 0))
+        exch = 0.0 if rnd.random() < 0.1 else float(int(recv - rnd.choice((0, 0, 1, 70))))
+        vols[token] = vols.get(token, 0) + rnd.randint(0, 50)
+        ltp = 0.0 if rnd.random() < 0.03 else round(100 + rnd.uniform(-2, 2), 2)
+        out.append((recv, token, ltp, vols[token], exch))
+    return out
+
+
+def _records(ticks: list) -> np.ndarray:
+    rec = np.zeros(len(ticks), dtype=RECORD_DTYPE)
+    rec["seq"] = np.arange(1, len(ticks) + 1)
+    rec["recv_ts"], rec["token"], rec["ltp"], rec["vol"], rec["exch_ts"] = zip(*ticks)
+    return rec
+
+
+def _batches(ticks: list) -> list:
+    batches = []
+    for recv, token, ltp, vol, exch in ticks:
+        if not batches or batches[-1][0] != recv:
+            batches.append((recv, []))
+        batches[-1][1].append((token, ltp, vol, exch))
+    return batches
+
+
+def _per_token(spilled: list) -> dict:
+    out = {}
+    for token, entry in spilled:
+        out.setdefault(token, []).append(entry)
+    return out
+
+
+def test_record_fold_matches_tick_fold():
+    for seed in range(20):
+        ticks = _ticks(seed)
+        half = len(ticks) // 2
+        rec = _records(ticks)
+        # two views (a wrapped ring) folded on top of each other
+        spilled, latest = main._coalesce_records([rec[:half], rec[half:]])
+        want_spilled, want_latest = main._coalesce_ticks(_batches(ticks))
+        assert latest == want_latest
+        assert _per_token(spilled) == _per_token(want_spilled)
+
+
+def test_record_fold_continues_existing_entries():
+    ticks = _ticks(7)
+    half = len(ticks) // 2
+    sp, out = main._coalesce_ticks(_batches(ticks[:half]))
+    spilled, latest = main._coalesce_records([_records(ticks[half:])], list(sp), {k: list(v) for k, v in out.items()})
+    want_spilled, want_latest = main._coalesce_ticks(_batches(ticks))
+    assert latest == want_latest
+    assert _per_token(spilled) == _per_token(want_spilled)
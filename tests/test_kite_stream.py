@@ -0,0 +1,87 @@
+# tests/test_kite_stream.py
+"""
+AsyncKiteTicker against a local serve_replay() server: quote, full and index
+frames must come back as the same compact ticks (volume + exchange timestamp
+where the packet carries them), and a dropped connection must reconnect and
+resume delivering.
+"""
+
+import asyncio
+
+from kite_stream import MODE_FULL, MODE_QUOTE, AsyncKiteTicker, pack_frame, serve_replay
+
+EQ, EQ2 = 738561, 2953217      # NSE equity tokens (segment 1)
+INDEX = 256265                 # NIFTY 50 (segment 9)
+TS = 1_700_000_059.0
+
+QUOTE = [(EQ, 2451.35, 120_000, 0.0), (EQ2, 3512.5, 45_000, 0.0)]  # quote packets carry no timestamp
+FULL = [(EQ, 2451.6, 120_450, TS), (EQ2, 3513.05, 45_100, TS)]
+INDEX_FULL = [(INDEX, 19_845.25, 0, TS)]                           # index packets carry no volume
+INDEX_QUOTE = [(INDEX, 19_846.1, 0, 0.0)]
+
+
+def _mixed(*frames: bytes) -> bytes:
+    """Concatenates frames into one (packets of different lengths: the non-uniform parse path)."""
+    n = sum(int.from_bytes(f[:2], "big") for f in frames)
+    return n.to_bytes(2, "big") + b"".join(f[2:] for f in frames)
+
+
+FRAMES = [
+    pack_frame(QUOTE, MODE_QUOTE),
+    pack_frame(FULL, MODE_FULL),
+    pack_frame(INDEX_FULL, MODE_FULL, index=True),
+    _mixed(pack_frame(INDEX_QUOTE, MODE_QUOTE, index=True), pack_frame(FULL[:1], MODE_FULL)),
+]
+EXPECTED = QUOTE + FULL + INDEX_FULL + INDEX_QUOTE + FULL[:1]
+
+
+async def _replay(drop: bool, want: int, timeout: float = 5.0):
+    server = await serve_replay(FRAMES, drop_after=0.1 if drop else None)
+    port = server.sockets[0].getsockname()[1]
+    got, events = [], []
+    done = asyncio.Event()
+
+    def on_ticks(recv_ts, ticks):
+        got.extend(ticks)
+        if len(got) >= want:
+            done.set()
+
+    kws = AsyncKiteTicker(
+        "key", "token", on_ticks, url=f"ws://127.0.0.1:{port}", reconnect_min_delay=0.05,
+        on_connect=lambda ws: events.append("up"), on_close=lambda ws, reason: events.append("down"),
+    )
+    kws.subscribe([EQ, EQ2], MODE_FULL)
+    kws.subscribe([INDEX], MODE_QUOTE)
+    kws.connect()
+    try:
+        await asyncio.wait_for(done.wait(), timeout)
+    finally:
+        kws.close()
+        server.close()
+        await server.wait_closed()
+    return kws, got, events
+
+
+def _assert_ticks(got, expected):
+    assert len(got) == len(expected)
+    for (token, ltp, vol, ts), (e_token, e_ltp, e_vol, e_ts) in zip(got, expected):
+        assert token == e_token
+        assert abs(ltp - e_ltp) < 1e-6
+        assert vol == e_vol
+        assert ts == e_ts
+
+
+def test_replay_parses_quote_full_and_index_frames():
+    kws, got, events = asyncio.run(_replay(drop=False, want=len(EXPECTED)))
+    _assert_ticks(got, EXPECTED)
+    assert kws.frames == len(FRAMES)
+    assert kws.reconnects == 0
+    assert events[:1] == ["up"] and "down" not in events[:-1]
+
+
+def test_replay_reconnects_after_drop_and_resumes():
+    kws, got, events = asyncio.run(_replay(drop=True, want=2 * len(EXPECTED)))
+    _assert_ticks(got[:2 * len(EXPECTED)], EXPECTED + EXPECTED)
+    assert kws.reconnects >= 1
+    assert events[:3] == ["up", "down", "up"]
+    assert kws.modes == {EQ: MODE_FULL, EQ2: MODE_FULL, INDEX: MODE_QUOTE}
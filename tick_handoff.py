@@ -0,0 +1,109 @@
+# tick_handoff.py
+"""
+Nexus Tick Hand-off (feed thread -> event loop)
+
+✅ Lock-protected deque written by the KiteTicker (Twisted) thread or the loop
+✅ The loop is woken only on the empty -> non-empty transition
+   (one call_soon_threadsafe per burst instead of one per batch)
+✅ drain() hands the consumer everything pending in one pass
+✅ Bounded: past capacity the oldest batch is folded into an overflow
+   snapshot by the merge callback (latest px / volume / high / low kept)
+✅ Enqueue-to-drain latency histogram + batches per wakeup
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, List, Optional, Tuple
+
+from latency_histogram import LatencyHistogram
+
+
+class TickHandoff:
+    def __init__(self, loop: asyncio.AbstractEventLoop, capacity: int = 10000, merge: Optional[Callable[[Any, tuple], Any]] = None):
+        """merge(snapshot_or_None, (recv_ts, ticks)) -> snapshot; None means overflow drops the batch."""
+        self.loop = loop
+        self.capacity = max(1, int(capacity))
+        self.merge = merge
+
+        self._lock = threading.Lock()
+        self._buf: deque = deque()
+        self._overflow: Any = None
+        self._event = asyncio.Event()
+        self._wake_pending = False
+        self._loop_thread: Optional[int] = None
+
+        self.pushed = 0
+        self.merged = 0
+        self.dropped = 0
+        self.wakeups = 0
+        self.max_batches_per_wakeup = 0
+        self._drained_batches = 0
+        self.latency = LatencyHistogram()
+
+    # -----------------------------
+    # PRODUCER (any thread)
+    # -----------------------------
+    def push(self, recv_ts: float, ticks: List[tuple]):
+        item = (recv_ts, ticks, time.perf_counter())
+        with self._lock:
+            if len(self._buf) >= self.capacity:
+                recv_ts_old, ticks_old, _ = self._buf.popleft()
+                try:
+                    if self.merge is None:
+                        raise ValueError("no overflow merge")
+                    self._overflow = self.merge(self._overflow, (recv_ts_old, ticks_old))
+                    self.merged += 1
+                except Exception:
+                    self.dropped += 1
+            self._buf.append(item)
+            self.pushed += 1
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        if threading.get_ident() == self._loop_thread:
+            self._event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._event.set)
+
+    # -----------------------------
+    # CONSUMER (event loop)
+    # -----------------------------
+    async def drain(self) -> Tuple[Any, List[tuple]]:
+        """Waits for data, then returns (overflow_snapshot_or_None, [(recv_ts, ticks), ...]) oldest first."""
+        self._loop_thread = threading.get_ident()
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            with self._lock:
+                items = list(self._buf)
+                self._buf.clear()
+                overflow, self._overflow = self._overflow, None
+                self._wake_pending = False
+            if items or overflow is not None:
+                break
+
+        now = time.perf_counter()
+        for _, _, enq in items:
+            self.latency.record((now - enq) * 1000.0)
+        self.wakeups += 1
+        self._drained_batches += len(items)
+        if len(items) > self.max_batches_per_wakeup:
+            self.max_batches_per_wakeup = len(items)
+        return overflow, [(recv_ts, ticks) for recv_ts, ticks, _ in items]
+
+    def pending(self) -> int:
+        return len(self._buf)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._buf),
+            "pushed": self.pushed,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "wakeups": self.wakeups,
+            "batches_per_wakeup": round(self._drained_batches / self.wakeups, 2) if self.wakeups else 0.0,
+            "max_batches_per_wakeup": self.max_batches_per_wakeup,
+            "drain_latency": self.latency.snapshot(),
+        }
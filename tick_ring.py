@@ -0,0 +1,252 @@
+# tick_ring.py
+"""
+Nexus Tick Ring (shared-memory fan-out to strategy processes)
+
+✅ One multiprocessing.shared_memory segment: header + consumer table + ring
+✅ Fixed 48-byte records (seq, token, ltp, cum_vol, exch_ts, recv_ts),
+   seq = 1-based global sequence number of the record
+✅ Single writer (the ingest process) publishes whole batches with one
+   vectorized store, then advances head
+✅ Any number of readers: each owns a named cursor slot; poll() returns NumPy
+   views straight into the segment (no pickling, no copy)
+✅ Per-consumer lag (head - cursor), lost records (writer lapped the reader),
+   processed count and heartbeat, readable from any process
+
+Linux / x86: stores become visible in program order, so publishing head after
+the records is enough; a reader that falls more than `capacity` behind skips
+ahead and counts the gap as lost.
+"""
+
+import logging
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("Nexus_TickRing")
+
+RECORD_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("token", "<i8"),
+    ("ltp", "<f8"),
+    ("vol", "<i8"),
+    ("exch_ts", "<f8"),
+    ("recv_ts", "<f8"),
+])
+CONSUMER_DTYPE = np.dtype([
+    ("name", "S16"),
+    ("cursor", "<u8"),      # next seq to read
+    ("lost", "<u8"),
+    ("processed", "<u8"),
+    ("heartbeat", "<f8"),   # epoch of the last poll
+    ("pid", "<i8"),
+])
+
+MAGIC = 0x4E58524E47  # "NXRNG"
+H_MAGIC, H_CAPACITY, H_CONSUMERS, H_HEAD = 0, 1, 2, 3
+HEADER_SLOTS = 8
+HEADER_BYTES = HEADER_SLOTS * 8
+
+
+class TickRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self.header = np.ndarray((HEADER_SLOTS,), dtype="<u8", buffer=buf)
+        if int(self.header[H_MAGIC]) != MAGIC:
+            raise ValueError(f"shared memory {shm.name} is not a tick ring")
+        self.capacity = int(self.header[H_CAPACITY])
+        n_consumers = int(self.header[H_CONSUMERS])
+        self.consumers = np.ndarray((n_consumers,), dtype=CONSUMER_DTYPE, buffer=buf, offset=HEADER_BYTES)
+        offset = HEADER_BYTES + n_consumers * CONSUMER_DTYPE.itemsize
+        self.records = np.ndarray((self.capacity,), dtype=RECORD_DTYPE, buffer=buf, offset=offset)
+
+    # -----------------------------
+    # LIFECYCLE
+    # -----------------------------
+    @classmethod
+    def create(cls, name: str, capacity: int, consumers: Sequence[str]) -> "TickRing":
+        """Ingest side: (re)creates the segment; consumers are the cursor slot names."""
+        capacity = max(1, int(capacity))
+        size = HEADER_BYTES + len(consumers) * CONSUMER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            logger.warning(f"♻️ [RING] removed stale segment {name}")
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER_SLOTS,), dtype="<u8", buffer=shm.buf)
+        header[:] = 0
+        header[H_CAPACITY] = capacity
+        header[H_CONSUMERS] = len(consumers)
+        header[H_MAGIC] = MAGIC
+        table = np.ndarray((len(consumers),), dtype=CONSUMER_DTYPE, buffer=shm.buf, offset=HEADER_BYTES)
+        table[:] = np.zeros(len(consumers), dtype=CONSUMER_DTYPE)
+        table["name"] = [str(c).encode()[:16] for c in consumers]
+        table["cursor"] = 1
+        del header, table
+        ring = cls(shm, owner=True)
+        logger.info(f"💍 [RING] {name}: {capacity} records ({size / 1048576:.1f} MiB), consumers {list(consumers)}")
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "TickRing":
+        """Consumer side. Raises FileNotFoundError until the ingest process has created it."""
+        shm = shared_memory.SharedMemory(name=name)
+        # the creator owns the segment; stop this process's tracker from unlinking it at exit
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(shm, owner=False)
+
+    def close(self):
+        self.header = self.consumers = self.records = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # -----------------------------
+    # WRITER
+    # -----------------------------
+    @property
+    def head(self) -> int:
+        """Seq of the last published record (0 = nothing yet)."""
+        return int(self.header[H_HEAD])
+
+    def publish(self, recv_ts: float, ticks: List[tuple]) -> int:
+        """Appends compact (token, ltp, cum_vol, exch_ts) ticks; returns the new head."""
+        n = len(ticks)
+        if not n:
+            return self.head
+        if n > self.capacity:
+            ticks = ticks[-self.capacity:]
+            n = self.capacity
+        head = int(self.header[H_HEAD])
+        seqs = np.arange(head + 1, head + n + 1, dtype="<u8")
+        slots = (seqs - 1) % self.capacity
+        cols = np.array(ticks, dtype=np.float64).reshape(n, 4)
+        recs = self.records
+        recs["token"][slots] = cols[:, 0].astype(np.int64)
+        recs["ltp"][slots] = cols[:, 1]
+        recs["vol"][slots] = cols[:, 2].astype(np.int64)
+        recs["exch_ts"][slots] = cols[:, 3]
+        recs["recv_ts"][slots] = recv_ts
+        recs["seq"][slots] = seqs
+        self.header[H_HEAD] = head + n
+        return head + n
+
+    # -----------------------------
+    # READERS
+    # -----------------------------
+    def cursor(self, name: str) -> "RingCursor":
+        names = [bytes(n).decode() for n in self.consumers["name"]]
+        if name not in names:
+            raise KeyError(f"no consumer slot '{name}' in ring (slots: {names})")
+        return RingCursor(self, names.index(name))
+
+    def stats(self) -> dict:
+        head = self.head
+        now = time.time()
+        return {
+            "head": head,
+            "capacity": self.capacity,
+            "consumers": {
+                bytes(c["name"]).decode(): {
+                    "lag": max(0, head - int(c["cursor"]) + 1),
+                    "lost": int(c["lost"]),
+                    "processed": int(c["processed"]),
+                    "pid": int(c["pid"]),
+                    "heartbeat_age_s": round(now - float(c["heartbeat"]), 2) if c["heartbeat"] else None,
+                }
+                for c in self.consumers
+            },
+        }
+
+
+class RingCursor:
+    """One consumer's read position; state lives in the shared consumer table."""
+
+    def __init__(self, ring: TickRing, slot: int):
+        self.ring = ring
+        self.slot = slot
+        self.name = bytes(ring.consumers["name"][slot]).decode()
+        self._row = ring.consumers[slot:slot + 1]
+        self._row["pid"] = os.getpid()
+
+    @property
+    def next_seq(self) -> int:
+        return int(self._row["cursor"][0])
+
+    def seek_head(self):
+        """Start from live data (skip whatever was published before this consumer started)."""
+        self._row["cursor"] = self.ring.head + 1
+
+    def lag(self) -> int:
+        return max(0, self.ring.head - self.next_seq + 1)
+
+    def poll(self, max_records: int = 4096) -> List[np.ndarray]:
+        """
+        Views (at most two, when the range wraps) over the next unread records.
+        The views alias the ring: consume them, then call commit(); valid() tells
+        whether the writer overwrote them in the meantime.
+        """
+        ring = self.ring
+        self._row["heartbeat"] = time.time()
+        head = ring.head
+        start = self.next_seq
+        if head - start + 1 > ring.capacity:
+            skipped = head - ring.capacity + 1 - start
+            self._row["lost"] += skipped
+            start = head - ring.capacity + 1
+            self._row["cursor"] = start
+            logger.warning(f"⚠️ [RING] {self.name} lapped by writer, skipped {skipped} records")
+        n = min(head - start + 1, int(max_records))
+        if n <= 0:
+            return []
+        a = (start - 1) % ring.capacity
+        b = a + n
+        if b <= ring.capacity:
+            return [ring.records[a:b]]
+        return [ring.records[a:], ring.records[:b - ring.capacity]]
+
+    def valid(self, views: List[np.ndarray]) -> bool:
+        """True when none of the polled records has been overwritten since poll()."""
+        if not views:
+            return True
+        last = views[-1]["seq"][-1] if len(views[-1]) else 0
+        return int(views[0]["seq"][0]) == self.next_seq and self.ring.head - int(last) < self.ring.capacity
+
+    def commit(self, n: int):
+        self._row["cursor"] += n
+        self._row["processed"] += n
+
+    def stats(self) -> dict:
+        return {"name": self.name, "next_seq": self.next_seq, "lag": self.lag(), "lost": int(self._row["lost"][0]), "processed": int(self._row["processed"][0])}
+
+
+def split_batches(view: np.ndarray) -> List[Tuple[float, List[tuple]]]:
+    """
+    Ring records -> [(recv_ts, [(token, ltp, cum_vol, exch_ts), ...])], one batch per publish.
+    Copies every record into Python objects: only for consumers that hand each tick to
+    an engine anyway (coalescing consumers fold the views in place instead).
+    """
+    if not len(view):
+        return []
+    recv = view["recv_ts"]
+    cuts = (np.flatnonzero(recv[1:] != recv[:-1]) + 1).tolist()
+    rows = list(zip(view["token"].tolist(), view["ltp"].tolist(), view["vol"].tolist(), view["exch_ts"].tolist()))
+    out = []
+    lo = 0
+    for hi in cuts + [len(view)]:
+        out.append((float(recv[lo]), rows[lo:hi]))
+        lo = hi
+    return out
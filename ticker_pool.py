@@ -0,0 +1,518 @@
+# ticker_pool.py
+"""
+Nexus Ticker Pool (several Kite WebSocket connections, one tick pipeline)
+
+✅ Shards the universe across N connections with balanced token counts
+   (Kite caps tokens per connection; each connection also gets its own socket)
+✅ Never opens more than Kite's 3 connections per API key (standby included);
+   sized with one spare connection so a drop can be absorbed, and refuses a
+   universe that cannot fit at all
+✅ Works with KiteTicker (Twisted thread) or AsyncKiteTicker (event loop)
+✅ Every connection feeds the same sink: sink(recv_ts, compact_ticks)
+✅ Failover: when a connection drops, its tokens move to the healthy ones
+   (within capacity) while it reconnects, and move back once it is up again
+✅ set_mode / unsubscribe are routed to whichever connection hosts the token
+✅ Per-connection health + throughput stats, feed-gap histograms, outage times
+✅ Optional hot standby: one extra connection mirrors the open / armed tokens;
+   per token, the first feed to deliver an exchange second owns it, so the
+   other feed's copy of that second is dropped and failover is instant
+✅ live(): connected AND a message (tick or heartbeat) seen recently
+
+All pool methods run on the event loop; the Twisted reactor is started once, on
+its own thread, and every KiteTicker connect / send / close is marshalled onto
+it with reactor.callFromThread.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from kite_stream import AsyncKiteTicker
+from latency_histogram import LatencyHistogram
+
+logger = logging.getLogger("Nexus_TickerPool")
+
+KITE_MAX_TOKENS_PER_CONNECTION = 3000
+KITE_MAX_CONNECTIONS = 3  # WebSocket connections per API key
+MODE_FULL = "full"
+
+# inter-tick gaps worth recording (seconds); histogram edges in ms
+GAP_MIN_SEC = 1.0
+GAP_EDGES_MS = (1000, 2000, 5000, 10000, 30000, 60000, 300000)
+
+_REACTOR_LOCK = threading.Lock()
+_reactor_thread: Optional[threading.Thread] = None
+
+
+def _start_reactor():
+    """Runs the Twisted reactor on one daemon thread, once per process; returns the reactor."""
+    global _reactor_thread
+    from twisted.internet import reactor  # type: ignore
+    with _REACTOR_LOCK:
+        if _reactor_thread is None and not reactor.running:
+            _reactor_thread = threading.Thread(
+                target=reactor.run, kwargs={"installSignalHandlers": False}, name="kite-reactor", daemon=True,
+            )
+            _reactor_thread.start()
+    return reactor
+
+
+class _Conn:
+    """One pooled connection. modes == tokens this connection currently hosts."""
+
+    def __init__(self, pool: "TickerPool", idx: int):
+        self.pool = pool
+        self.idx = idx
+        self.name = f"kite-ws-{idx}"
+        self.ws = None
+        self.native = False
+        self.modes: Dict[int, str] = {}
+        self.connected = False
+        self.connects = 0
+        self.drops = 0
+        self.ticks = 0
+        self.batches = 0
+        self.last_tick_ts = 0.0
+        self.last_msg_ts = 0.0  # ticks or heartbeats
+        self.gaps = LatencyHistogram(GAP_EDGES_MS)
+        self.down_since = 0.0
+        self.outage_total_s = 0.0
+        self.last_outage_s = 0.0
+
+    # -----------------------------
+    # FEED CALLBACKS
+    # -----------------------------
+    def _seen(self, recv_ts: float, n: int):
+        if self.last_tick_ts and recv_ts - self.last_tick_ts >= GAP_MIN_SEC:
+            self.gaps.record((recv_ts - self.last_tick_ts) * 1000.0)
+        self.ticks += n
+        self.batches += 1
+        self.last_tick_ts = self.last_msg_ts = recv_ts
+
+    def on_native_ticks(self, recv_ts: float, ticks: List[tuple]):
+        self._seen(recv_ts, len(ticks))
+        self.pool._deliver(self, recv_ts, ticks)
+
+    def on_kite_ticks(self, ws, ticks: List[dict]):
+        recv_ts = time.time()
+        self._seen(recv_ts, len(ticks))
+        self.pool._deliver(self, recv_ts, self.pool.compact(ticks))
+
+    def on_kite_message(self, ws, payload, is_binary):
+        self.last_msg_ts = time.time()  # heartbeats included
+
+    def on_kite_connect(self, ws, response):
+        # reactor thread: (re)subscribe this connection's current tokens, then tell the loop
+        self._kite_send_all()
+        self.pool.loop.call_soon_threadsafe(self.pool._on_up, self)
+
+    def on_kite_close(self, ws, code, reason):
+        self.pool.loop.call_soon_threadsafe(self.pool._on_down, self, f"{code} {reason}")
+
+    def on_native_connect(self, ws):
+        self.pool._on_up(self)
+
+    def on_native_close(self, ws, reason):
+        self.pool._on_down(self, reason)
+
+    # -----------------------------
+    # SUBSCRIPTIONS
+    # -----------------------------
+    def subscribe(self, tokens: List[int], mode: str):
+        if not tokens:
+            return
+        if self.native:
+            self.ws.subscribe(tokens, mode)
+        else:
+            self.pool.reactor.callFromThread(self._kite_subscribe, list(tokens), mode)
+
+    def unsubscribe(self, tokens: List[int]):
+        if not tokens:
+            return
+        if self.native:
+            self.ws.unsubscribe(tokens)
+        else:
+            self.pool.reactor.callFromThread(self._kite_unsubscribe, list(tokens))
+
+    def set_mode(self, mode: str, tokens: List[int]):
+        if not tokens:
+            return
+        if self.native:
+            self.ws.set_mode(mode, tokens)
+        else:
+            self.pool.reactor.callFromThread(self._kite_set_mode, mode, list(tokens))
+
+    # reactor-thread halves: self.modes is KiteTicker.subscribed_tokens, so it is only
+    # mutated here and KiteTicker's own reconnect resubscribe sees the same map
+    def _kite_subscribe(self, tokens: List[int], mode: str):
+        for t in tokens:
+            self.modes[t] = mode
+        if self.ws.is_connected():
+            self.ws.subscribe(tokens)
+            self.ws.set_mode(mode, tokens)
+
+    def _kite_unsubscribe(self, tokens: List[int]):
+        for t in tokens:
+            self.modes.pop(t, None)
+        if self.ws.is_connected():
+            self.ws.unsubscribe(tokens)
+
+    def _kite_set_mode(self, mode: str, tokens: List[int]):
+        tokens = [t for t in tokens if t in self.modes]
+        for t in tokens:
+            self.modes[t] = mode
+        if tokens and self.ws.is_connected():
+            self.ws.set_mode(mode, tokens)
+
+    def _kite_send_all(self):
+        by_mode: Dict[str, List[int]] = {}
+        for t, m in list(self.modes.items()):
+            by_mode.setdefault(m, []).append(t)
+        for mode, tokens in by_mode.items():
+            self.ws.subscribe(tokens)
+            self.ws.set_mode(mode, tokens)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "connected": self.connected,
+            "tokens": len(self.modes),
+            "home": sum(1 for c in self.pool.home.values() if c == self.idx),
+            "connects": self.connects,
+            "drops": self.drops,
+            "ticks": self.ticks,
+            "batches": self.batches,
+            "last_tick_age_s": round(time.time() - self.last_tick_ts, 2) if self.last_tick_ts else None,
+            "last_msg_age_s": round(time.time() - self._last_msg(), 2) if self._last_msg() else None,
+            "gaps": self.gaps.snapshot(),
+            "outage_total_s": round(self.outage_total_s, 2),
+            "last_outage_s": round(self.last_outage_s, 2),
+        }
+
+    def _last_msg(self) -> float:
+        if self.native and self.ws is not None:
+            return max(self.last_msg_ts, self.ws.last_msg_ts)
+        return self.last_msg_ts
+
+
+class TickerPool:
+    def __init__(
+        self,
+        api_key: str,
+        access_token: str,
+        sink: Callable[[float, List[tuple]], None],
+        *,
+        connections: int = 1,
+        native: bool = False,
+        compact: Optional[Callable[[List[dict]], List[tuple]]] = None,
+        max_tokens_per_connection: int = KITE_MAX_TOKENS_PER_CONNECTION,
+        url: Optional[str] = None,
+        on_state: Optional[Callable[["TickerPool"], None]] = None,
+        standby: bool = False,
+        live_window_sec: float = 5.0,
+        max_connections: int = KITE_MAX_CONNECTIONS,
+    ):
+        """
+        sink(recv_ts, ticks) receives compact (token, ltp, cum_vol, exch_ts) ticks from
+        every connection; compact() converts KiteTicker dicts (required unless native).
+        on_state(pool) is called on the loop whenever a connection goes up or down
+        or live() flips. standby=True opens one extra connection for the hot set.
+        connections + standby never exceed max_connections: past the cap the standby
+        takes a primary slot (connect() hands it back if the universe needs it).
+        """
+        self.api_key = api_key
+        self.access_token = access_token
+        self.sink = sink
+        self.native = bool(native)
+        self.compact = compact
+        self.capacity = int(max_tokens_per_connection)
+        self.url = url
+        self.on_state = on_state
+        self.loop = asyncio.get_running_loop()
+        self.reactor = None
+
+        self.max_connections = max(1, int(max_connections))
+        connections = max(1, int(connections))
+        if connections > self.max_connections:
+            logger.warning(f"⚠️ [POOL] {connections} connections requested, Kite allows {self.max_connections} per API key; clamping")
+            connections = self.max_connections
+        if standby and connections >= self.max_connections:
+            if connections > 1:
+                connections -= 1
+                logger.warning(f"⚠️ [POOL] hot standby takes a primary slot: {connections} primaries + standby")
+            else:
+                standby = False
+                logger.warning("⚠️ [POOL] no connection left for the hot standby; disabled")
+
+        self.conns = [_Conn(self, k) for k in range(connections)]
+        self.home: Dict[int, int] = {}   # token -> connection it is balanced onto
+        self.host: Dict[int, int] = {}   # token -> connection currently streaming it
+        self.mode: Dict[int, str] = {}   # token -> desired mode
+        self.failovers = 0
+        self._closing = False
+
+        # hot standby + de-dup (token -> (exch_ts, idx of the connection that owns that second))
+        self.standby: Optional[_Conn] = _Conn(self, len(self.conns)) if standby else None
+        if self.standby:
+            self.standby.name = "kite-ws-standby"
+        self.hot: set = set()
+        self._last: Dict[int, tuple] = {}
+        self.dupes = 0
+        self.standby_first = 0  # hot ticks the standby delivered before the primary
+        self.live_window_sec = float(live_window_sec)
+        self._live = False
+
+    @staticmethod
+    def connections_for(
+        n_tokens: int,
+        max_tokens_per_connection: int = KITE_MAX_TOKENS_PER_CONNECTION,
+        max_connections: int = KITE_MAX_CONNECTIONS,
+    ) -> int:
+        """
+        Primaries for n_tokens with one spare (so a dropped connection's tokens fit on
+        the rest), clamped to max_connections. Raises ValueError if they cannot fit at all.
+        """
+        need = max(1, -(-int(n_tokens) // int(max_tokens_per_connection)))
+        if need > max_connections:
+            raise ValueError(f"{n_tokens} tokens exceed {max_connections} x {max_tokens_per_connection} per API key")
+        return min(int(max_connections), need + 1)
+
+    # -----------------------------
+    # LIFECYCLE
+    # -----------------------------
+    def connect(self, groups: Dict[str, List[int]]):
+        """
+        groups: mode -> tokens. Balances tokens round-robin, then opens every connection.
+        Raises ValueError when the universe does not fit in the allowed connections.
+        """
+        tokens = sorted((int(t), m) for m, ts in groups.items() for t in ts)
+        if len(tokens) > self.capacity * len(self.conns) and self.standby:
+            # the universe outranks the standby: give its slot back to a primary
+            logger.warning(f"⚠️ [POOL] {len(tokens)} tokens need the standby's slot; hot standby disabled")
+            self.standby = None
+            self.conns.append(_Conn(self, len(self.conns)))
+        if len(tokens) > self.capacity * len(self.conns):
+            raise ValueError(
+                f"{len(tokens)} tokens exceed {len(self.conns)} x {self.capacity} "
+                f"(Kite allows {self.max_connections} connections per API key); shrink the universe"
+            )
+        if len(self.conns) < 2 or len(tokens) > self.capacity * (len(self.conns) - 1):
+            logger.warning("⚠️ [POOL] no failover headroom: a dropped connection's tokens go dark until it reconnects")
+        for j, (t, m) in enumerate(tokens):
+            conn = self.conns[j % len(self.conns)]
+            self.home[t] = self.host[t] = conn.idx
+            self.mode[t] = m
+            conn.modes[t] = m
+
+        if not self.native:
+            self.reactor = _start_reactor()
+
+        for conn in self._all_conns():
+            self._open(conn)
+        logger.info(f"🔌 [POOL] {len(self.conns)} connections, {[len(c.modes) for c in self.conns]} tokens each{' + hot standby' if self.standby else ''}")
+
+    def _open(self, conn: _Conn):
+        if self.native:
+            conn.native = True
+            conn.ws = AsyncKiteTicker(
+                self.api_key, self.access_token, conn.on_native_ticks, url=self.url,
+                on_connect=conn.on_native_connect, on_close=conn.on_native_close, name=conn.name,
+            )
+            preset, conn.modes = conn.modes, conn.ws.modes
+            conn.modes.update(preset)
+            conn.ws.connect()
+        else:
+            from kiteconnect import KiteTicker
+            kws = KiteTicker(self.api_key, self.access_token)
+            kws.subscribed_tokens = conn.modes
+            kws.on_ticks, kws.on_connect, kws.on_close = conn.on_kite_ticks, conn.on_kite_connect, conn.on_kite_close
+            kws.on_message = conn.on_kite_message
+            conn.ws = kws
+            # on the reactor thread reactor.running is already set, so connect() never spawns its own
+            self.reactor.callFromThread(kws.connect)
+
+    def _all_conns(self) -> List[_Conn]:
+        return self.conns + ([self.standby] if self.standby else [])
+
+    def close(self):
+        self._closing = True
+        for conn in self._all_conns():
+            try:
+                if conn.ws is None:
+                    continue
+                if conn.native:
+                    conn.ws.close()
+                else:
+                    self.reactor.callFromThread(conn.ws.close)
+            except Exception:
+                pass
+
+    # -----------------------------
+    # ROUTED OPERATIONS
+    # -----------------------------
+    def _by_host(self, tokens: Iterable[int]) -> Dict[int, List[int]]:
+        out: Dict[int, List[int]] = {}
+        for t in tokens:
+            h = self.host.get(int(t))
+            if h is not None:
+                out.setdefault(h, []).append(int(t))
+        return out
+
+    def set_mode(self, mode: str, tokens: Iterable[int]):
+        tokens = [int(t) for t in tokens if int(t) in self.mode]
+        for t in tokens:
+            self.mode[t] = mode
+        for h, toks in self._by_host(tokens).items():
+            self.conns[h].set_mode(mode, toks)
+
+    def unsubscribe(self, tokens: Iterable[int]):
+        tokens = [int(t) for t in tokens]
+        for h, toks in self._by_host(tokens).items():
+            self.conns[h].unsubscribe(toks)
+        for t in tokens:
+            self.home.pop(t, None)
+            self.host.pop(t, None)
+            self.mode.pop(t, None)
+
+    def _move(self, tokens: List[int], dst: _Conn):
+        for h, toks in self._by_host(tokens).items():
+            if h != dst.idx:
+                self.conns[h].unsubscribe(toks)
+        by_mode: Dict[str, List[int]] = {}
+        for t in tokens:
+            self.host[t] = dst.idx
+            by_mode.setdefault(self.mode[t], []).append(t)
+        for mode, toks in by_mode.items():
+            dst.subscribe(toks, mode)
+
+    # -----------------------------
+    # FAILOVER
+    # -----------------------------
+    def _on_down(self, conn: _Conn, reason: str):
+        if conn.connected:
+            conn.drops += 1
+            conn.down_since = time.time()
+        conn.connected = False
+        if self._closing:
+            return
+        logger.warning(f"⚠️ [POOL] {conn.name} down ({reason})")
+        if conn is self.standby:
+            self._notify()
+            return
+        hosted = [t for t, h in self.host.items() if h == conn.idx]
+        healthy = [c for c in self.conns if c.connected and c is not conn]
+        moved = 0
+        for target in sorted(healthy, key=lambda c: len(c.modes)):
+            room = self.capacity - sum(1 for h in self.host.values() if h == target.idx)
+            if room <= 0 or not hosted:
+                continue
+            chunk, hosted = hosted[:room], hosted[room:]
+            self._move(chunk, target)
+            moved += len(chunk)
+        if moved:
+            self.failovers += 1
+            logger.info(f"🔀 [POOL] moved {moved} tokens off {conn.name} while it reconnects")
+        self._notify()
+
+    def _on_up(self, conn: _Conn):
+        conn.connected = True
+        conn.connects += 1
+        if conn.down_since:
+            conn.last_outage_s = time.time() - conn.down_since
+            conn.outage_total_s += conn.last_outage_s
+            conn.down_since = 0.0
+        if conn is self.standby:
+            self._notify()
+            return
+        away = [t for t, h in self.home.items() if h == conn.idx and self.host.get(t) != conn.idx]
+        if away:
+            self._move(away, conn)
+            logger.info(f"🔀 [POOL] {conn.name} back: reclaimed {len(away)} tokens")
+        self._notify()
+
+    def _notify(self):
+        if self.on_state:
+            try:
+                self.on_state(self)
+            except Exception as e:
+                logger.error(f"❌ [POOL] on_state failed: {e}")
+
+    def any_connected(self) -> bool:
+        return any(c.connected for c in self._all_conns())
+
+    def live(self) -> bool:
+        """Real liveness: some connection is up and has heard from Kite within live_window_sec."""
+        now = time.time()
+        return any(c.connected and (now - c._last_msg()) <= self.live_window_sec for c in self._all_conns())
+
+    async def monitor(self, interval: float = 1.0):
+        """Re-evaluates live() and calls on_state when it flips (a silent socket is not 'connected')."""
+        while not self._closing:
+            await asyncio.sleep(interval)
+            live = self.live()
+            if live != self._live:
+                self._live = live
+                if not live:
+                    logger.warning(f"⚠️ [POOL] feed silent for >{self.live_window_sec:.0f}s")
+                self._notify()
+
+    # -----------------------------
+    # HOT STANDBY + DE-DUP
+    # -----------------------------
+    def set_hot(self, tokens: Iterable[int], hot: bool):
+        """Open / armed tokens join the standby mirror (FULL mode); idle ones leave it."""
+        tokens = [int(t) for t in tokens if int(t) in self.mode]
+        if not self.standby or not tokens:
+            return
+        if hot:
+            self.hot.update(tokens)
+            self.standby.subscribe(tokens, MODE_FULL)
+        else:
+            self.hot.difference_update(tokens)
+            self.standby.unsubscribe(tokens)
+            for t in tokens:
+                self._last.pop(t, None)
+
+    def _deliver(self, conn: _Conn, recv_ts: float, ticks: List[tuple]):
+        """
+        Single producer context (loop for native, reactor thread for KiteTicker).
+        Per hot token, the first connection to deliver an exchange second owns it: every
+        tick of that second from the owner passes, the other feed's copies are dropped,
+        and older seconds are dropped from either. A newer second can be claimed by
+        either feed, so the standby takes over the moment the primary stalls.
+        """
+        if self.standby and (self.hot or conn is self.standby):
+            out = []
+            last = self._last
+            for tick in ticks:
+                token = tick[0]
+                if token not in self.hot:
+                    if conn is not self.standby:  # late ticks after a token left the hot set
+                        out.append(tick)
+                    continue
+                exch_ts = tick[3]
+                prev = last.get(token)
+                if prev is not None and (exch_ts < prev[0] or (exch_ts == prev[0] and conn.idx != prev[1])):
+                    self.dupes += 1
+                    continue
+                if prev is None or exch_ts > prev[0]:
+                    last[token] = (exch_ts, conn.idx)
+                    if conn is self.standby:
+                        self.standby_first += 1
+                out.append(tick)
+            ticks = out
+            if not ticks:
+                return
+        self.sink(recv_ts, ticks)
+
+    def stats(self) -> dict:
+        return {
+            "connections": [c.stats() for c in self.conns],
+            "standby": {**self.standby.stats(), "hot": len(self.hot), "dupes": self.dupes, "standby_first": self.standby_first} if self.standby else None,
+            "tokens": len(self.mode),
+            "failovers": self.failovers,
+            "native": self.native,
+            "live": self.live(),
+        }
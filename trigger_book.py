@@ -0,0 +1,168 @@
+# trigger_book.py
+"""
+Nexus Trigger Book
+
+✅ Contiguous arrays of armed triggers: universe index, price, side, expiry
+✅ One vectorized comparison per tick batch finds every crossed trigger
+✅ O(1) arm / disarm through a free-list; scans stop at the high-water mark
+   so the book stays compact as triggers fire and expire
+
+A slot fires when ltp > price (ABOVE) or ltp < price (BELOW). A fired slot is
+held (in flight) until the engine disarms it or the caller re-arms it with
+rearm(), so one crossing is handed to the engine once, not once per batch.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+ABOVE = 1
+BELOW = -1
+
+# engine codes (match the brk_* / mom_* prefixes in the universe store)
+ENGINE_CODES = {"brk": 0, "mom": 1}
+ENGINE_PREFIXES = ("brk", "mom")
+
+
+class TriggerBook:
+    def __init__(self, capacity: int = 256):
+        capacity = max(8, int(capacity))
+        self.uidx = np.full(capacity, -1, dtype=np.int64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.expiry = np.zeros(capacity, dtype=np.float64)  # epoch seconds, 0 == never
+        self.engine = np.zeros(capacity, dtype=np.int8)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.hold_until = np.zeros(capacity, dtype=np.float64)  # inf == in flight
+        self.side_key: List[Optional[str]] = [None] * capacity
+
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._slots: Dict[Tuple[int, int], List[int]] = {}
+        self._hwm = 0  # slots >= _hwm are never active
+
+        self.armed_total = 0
+        self.fired_total = 0
+        self.expired_total = 0
+        self.rearmed_total = 0
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._slots.values())
+
+    # -----------------------------
+    # ARM / DISARM (O(1))
+    # -----------------------------
+    def arm(self, prefix: str, uidx: int, side: int, price: float, side_key: str, expiry: float = 0.0) -> int:
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        self.uidx[slot] = uidx
+        self.price[slot] = price
+        self.side[slot] = side
+        self.expiry[slot] = expiry
+        self.engine[slot] = ENGINE_CODES[prefix]
+        self.active[slot] = True
+        self.hold_until[slot] = 0.0
+        self.side_key[slot] = side_key
+        self._slots.setdefault((ENGINE_CODES[prefix], uidx), []).append(slot)
+        if slot >= self._hwm:
+            self._hwm = slot + 1
+        self.armed_total += 1
+        return slot
+
+    def disarm(self, prefix: str, uidx: int) -> int:
+        """Drops every slot the engine armed for this token. Returns slots freed."""
+        slots = self._slots.pop((ENGINE_CODES[prefix], uidx), None)
+        if not slots:
+            return 0
+        for slot in slots:
+            self._release(slot)
+        while self._hwm > 0 and not self.active[self._hwm - 1]:
+            self._hwm -= 1
+        return len(slots)
+
+    def is_armed(self, prefix: str, uidx: int) -> bool:
+        return (ENGINE_CODES[prefix], uidx) in self._slots
+
+    def rearm(self, prefix: str, uidx: int, not_before: float = 0.0) -> int:
+        """Releases the in-flight hold of a fired slot the engine kept armed; it may fire again from not_before."""
+        n = 0
+        for slot in self._slots.get((ENGINE_CODES[prefix], uidx), ()):
+            if self.hold_until[slot] == np.inf:
+                self.hold_until[slot] = not_before
+                n += 1
+        self.rearmed_total += n
+        return n
+
+    def _release(self, slot: int):
+        self.active[slot] = False
+        self.hold_until[slot] = 0.0
+        self.uidx[slot] = -1
+        self.side_key[slot] = None
+        self._free.append(slot)
+
+    def _grow(self):
+        old = self.uidx.shape[0]
+        new = old * 2
+        self.uidx = np.concatenate([self.uidx, np.full(old, -1, dtype=np.int64)])
+        self.price = np.concatenate([self.price, np.zeros(old, dtype=np.float64)])
+        self.side = np.concatenate([self.side, np.zeros(old, dtype=np.int8)])
+        self.expiry = np.concatenate([self.expiry, np.zeros(old, dtype=np.float64)])
+        self.engine = np.concatenate([self.engine, np.zeros(old, dtype=np.int8)])
+        self.active = np.concatenate([self.active, np.zeros(old, dtype=bool)])
+        self.hold_until = np.concatenate([self.hold_until, np.zeros(old, dtype=np.float64)])
+        self.side_key.extend([None] * old)
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    # -----------------------------
+    # VECTORIZED SCAN
+    # -----------------------------
+    def scan(self, ltp: np.ndarray, now: float) -> Tuple[List[tuple], List[tuple]]:
+        """
+        One comparison over every armed slot against the universe ltp column.
+        Returns (crossed, expired) as lists of (prefix, uidx, side_key, ltp).
+        Crossed slots stay armed but are held in flight (skipped by later scans) until
+        the engine disarms them or rearm() is called; expired slots are disarmed here.
+        """
+        n = self._hwm
+        if n == 0:
+            return [], []
+        active = self.active[:n]
+        uidx = self.uidx[:n]
+        px = ltp[np.where(active, uidx, 0)]
+        side = self.side[:n]
+        price = self.price[:n]
+
+        hold = self.hold_until[:n]
+        ready = active & (hold <= now)
+        crossed = ready & (px > 0) & (((side == ABOVE) & (px > price)) | ((side == BELOW) & (px < price)))
+        exp = self.expiry[:n]
+        expired = ready & ~crossed & (exp > 0) & (now > exp)
+
+        hits = np.flatnonzero(crossed)
+        fired = [
+            (ENGINE_PREFIXES[self.engine[s]], int(uidx[s]), self.side_key[s], float(px[s]))
+            for s in hits
+        ]
+        hold[hits] = np.inf
+        gone = []
+        for s in np.flatnonzero(expired):
+            key = (ENGINE_PREFIXES[self.engine[s]], int(uidx[s]), self.side_key[s], float(px[s]))
+            if self.is_armed(key[0], key[1]):
+                gone.append(key)
+                self.disarm(key[0], key[1])
+
+        self.fired_total += len(fired)
+        self.expired_total += len(gone)
+        return fired, gone
+
+    def stats(self) -> dict:
+        return {
+            "armed": len(self),
+            "capacity": int(self.uidx.shape[0]),
+            "hwm": int(self._hwm),
+            "armed_total": self.armed_total,
+            "fired_total": self.fired_total,
+            "expired_total": self.expired_total,
+            "rearmed_total": self.rearmed_total,
+            "in_flight": int(np.count_nonzero(self.active[:self._hwm] & (self.hold_until[:self._hwm] == np.inf))),
+        }
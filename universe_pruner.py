@@ -0,0 +1,131 @@
+# universe_pruner.py
+"""
+Nexus Universe Pruner
+
+Unsubscribes tokens that can no longer produce a trade today:
+✅ per-symbol daily cap reached (field {symbol} of hash nexus:trades:symbols:{day}), checked
+   when a token goes back to WAITING (i.e. after a trade closes)
+✅ breakout windows (bull + bear trade_end) are over AND momentum is done
+   for the token (mom windows over, mom_skip_today, or first candle consumed)
+
+Never prunes a token that is armed, OPEN, or has an open trade in RAM.
+Pruned tokens are dropped in batches through the SubscriptionManager.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, time as dtime
+from typing import List, Optional, Set
+
+import pytz
+
+from redis_manager import TradeControl
+from subscription_manager import SubscriptionManager
+from universe_store import UniverseStore
+
+logger = logging.getLogger("Nexus_Pruner")
+IST = pytz.timezone("Asia/Kolkata")
+
+BRK_SIDES = ("bull", "bear")
+MOM_SIDES = ("mom_bull", "mom_bear")
+
+
+def _window_over(cfg: dict, now: datetime) -> bool:
+    try:
+        eh, em = map(int, str(cfg.get("trade_end", "15:10")).split(":"))
+        return now.time() > dtime(eh, em)
+    except Exception:
+        return False
+
+
+class UniversePruner:
+    def __init__(self, universe: UniverseStore, subs: SubscriptionManager, state: dict, max_trades_per_symbol: int = 2, interval: float = 5.0, sweep_every: float = 60.0):
+        self.u = universe
+        self.subs = subs
+        self.state = state
+        self.max_trades_per_symbol = int(max_trades_per_symbol)
+        self.interval = float(interval)
+        self.sweep_every = float(sweep_every)
+
+        self._changed: Set[int] = set()
+        self.reasons = {"cap": 0, "window": 0}
+        universe.status_listeners.append(self._on_status)
+
+    def _on_status(self, i: int):
+        if self.u.is_idle(i):
+            self._changed.add(i)
+
+    # -----------------------------
+    # RULES
+    # -----------------------------
+    def _open_symbols(self) -> Set[str]:
+        out = set()
+        for arr in (self.state.get("trades") or {}).values():
+            for t in arr:
+                if str(t.get("status", "OPEN")).upper() == "OPEN":
+                    out.add(str(t.get("symbol") or "").strip().upper())
+        return out
+
+    def _prunable(self, i: int, open_syms: Set[str]) -> bool:
+        return (not self.subs.pruned[i]) and self.u.is_idle(i) and self.u.symbols[i].upper() not in open_syms
+
+    def _mom_done(self, i: int, now: datetime, mom_windows_over: bool) -> bool:
+        if mom_windows_over:
+            return True
+        ex = self.u.extras[i]
+        return bool(ex.get("mom_skip_today")) or str(ex.get("mom_first_day") or "") == now.strftime("%Y%m%d")
+
+    async def evaluate(self, indices: Optional[List[int]] = None) -> int:
+        """
+        indices=None: time-based sweep over the whole universe (no Redis).
+        indices given: tokens that just went idle; also checks the per-symbol cap.
+        """
+        now = datetime.now(IST)
+        cfg = self.state.get("config") or {}
+        brk_over = all(_window_over(cfg.get(s, {}) or {}, now) for s in BRK_SIDES)
+        mom_over = all(_window_over(cfg.get(s, {}) or {}, now) for s in MOM_SIDES)
+        open_syms = self._open_symbols()
+
+        check_cap = indices is not None
+        candidates = range(self.u.size) if indices is None else indices
+        drop: List[int] = []
+        for i in candidates:
+            if not self._prunable(i, open_syms):
+                continue
+            if brk_over and self._mom_done(i, now, mom_over):
+                drop.append(i)
+                self.reasons["window"] += 1
+                continue
+            if check_cap:
+                try:
+                    taken = await TradeControl.get_symbol_trade_count(self.u.symbols[i])
+                except Exception:
+                    continue
+                # state may have moved while awaiting Redis
+                if int(taken) >= self.max_trades_per_symbol and self._prunable(i, self._open_symbols()):
+                    drop.append(i)
+                    self.reasons["cap"] += 1
+
+        n = self.subs.drop(drop)
+        if n:
+            logger.info(f"✂️ [PRUNE] unsubscribed {n} tokens (total {int(self.subs.pruned.sum())})")
+        return n
+
+    async def run(self):
+        logger.info("✂️ Universe Pruner: Active")
+        since_sweep = self.sweep_every
+        while True:
+            await asyncio.sleep(self.interval)
+            since_sweep += self.interval
+            try:
+                if self._changed:
+                    changed, self._changed = list(self._changed), set()
+                    await self.evaluate(changed)
+                if since_sweep >= self.sweep_every:
+                    since_sweep = 0.0
+                    await self.evaluate()
+            except Exception as e:
+                logger.error(f"❌ [PRUNE] pass failed: {e}")
+
+    def stats(self) -> dict:
+        return {"pruned": int(self.subs.pruned.sum()), **self.reasons}
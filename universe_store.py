@@ -0,0 +1,321 @@
+# universe_store.py
+"""
+Nexus Universe Store (columnar / struct-of-arrays)
+
+✅ Dense index per instrument token, assigned once at startup
+✅ NumPy columns for every hot field (ltp, pdh/pdl/prev_close/sma,
+   trigger prices, integer status codes, 1m candle OHLCV)
+✅ StockView: thin dict-like accessor so engines and API routes keep
+   using stock.get("brk_status") / stock["ltp"] = ... unchanged
+✅ Anything not columnar (symbol metadata, active trades, scanner text)
+   lives in a small per-token "extras" dict
+"""
+
+import logging
+from collections.abc import Mapping, MutableMapping
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from trigger_book import TriggerBook
+
+logger = logging.getLogger("Nexus_Universe")
+
+# Status codes shared by both engines (brk_status / mom_status)
+WAITING = 0
+TRIGGER_WATCH = 1
+OPEN = 2
+STATUS_NAMES = ("WAITING", "TRIGGER_WATCH", "OPEN")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+NO_BUCKET = -1
+
+# Columnar fields exposed through StockView
+#   "f": float64 always present
+#   "o": optional float64 (NaN == key absent, pop() -> NaN)
+#   "s": int8 status code
+_FLOAT_FIELDS = ("ltp", "pdh", "pdl", "prev_close", "sma", "last_update_ts", "last_recv_ts", "last_exch_ts")
+_OPTIONAL_FIELDS = ("brk_trigger_px", "mom_trigger_high", "mom_trigger_low")
+_STATUS_FIELDS = ("brk_status", "mom_status")
+
+_FIELD_KIND: Dict[str, str] = {}
+_FIELD_KIND.update({k: "f" for k in _FLOAT_FIELDS})
+_FIELD_KIND.update({k: "o" for k in _OPTIONAL_FIELDS})
+_FIELD_KIND.update({k: "s" for k in _STATUS_FIELDS})
+_FIELD_KIND.update({"token": "token", "symbol": "symbol", "candle_1m": "candle", "candle_last_cum_vol": "cum"})
+
+# market data keys that become columns (everything else goes to extras)
+_MARKET_COLUMNS = ("pdh", "pdl", "prev_close", "sma")
+
+
+def _to_float(x, default: float = 0.0) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return default
+
+
+class UniverseStore:
+    """
+    One row per instrument token. Indices are dense [0, size) and never change
+    for the lifetime of the process, so arrays can be scanned in one pass.
+    """
+
+    def __init__(self, market_data: Dict[str, dict]):
+        rows = []
+        for t_str, data in (market_data or {}).items():
+            try:
+                rows.append((int(t_str), data or {}))
+            except Exception:
+                logger.warning(f"⚠️ [UNIVERSE] bad token key skipped: {t_str}")
+        rows.sort(key=lambda r: r[0])
+
+        n = len(rows)
+        self.size = n
+        self.tokens = np.array([r[0] for r in rows], dtype=np.int64)
+        self.index: Dict[int, int] = {t: i for i, (t, _) in enumerate(rows)}
+        self.symbols: List[str] = [str(d.get("symbol") or "").strip() for _, d in rows]
+        self.symbol_index: Dict[str, int] = {s.upper(): i for i, s in enumerate(self.symbols) if s}
+
+        # market / tick columns
+        self.ltp = np.zeros(n, dtype=np.float64)
+        self.last_update_ts = np.zeros(n, dtype=np.float64)
+        self.last_recv_ts = np.zeros(n, dtype=np.float64)   # local receive time of the tick behind ltp
+        self.last_exch_ts = np.zeros(n, dtype=np.float64)   # exchange timestamp of that tick (0 == none)
+        self.pdh = np.array([_to_float(d.get("pdh")) for _, d in rows], dtype=np.float64)
+        self.pdl = np.array([_to_float(d.get("pdl")) for _, d in rows], dtype=np.float64)
+        self.prev_close = np.array([_to_float(d.get("prev_close")) for _, d in rows], dtype=np.float64)
+        self.sma = np.array([_to_float(d.get("sma")) for _, d in rows], dtype=np.float64)
+
+        # engine columns
+        self.brk_status = np.zeros(n, dtype=np.int8)
+        self.mom_status = np.zeros(n, dtype=np.int8)
+        self.brk_trigger_px = np.full(n, np.nan, dtype=np.float64)
+        self.mom_trigger_high = np.full(n, np.nan, dtype=np.float64)
+        self.mom_trigger_low = np.full(n, np.nan, dtype=np.float64)
+        self.eval_sig = np.full(n, -1, dtype=np.int8)
+
+        # 1m candle columns (bucket = epoch minute, NO_BUCKET == no open candle)
+        self.c_bucket = np.full(n, NO_BUCKET, dtype=np.int64)
+        self.c_open = np.zeros(n, dtype=np.float64)
+        self.c_high = np.zeros(n, dtype=np.float64)
+        self.c_low = np.zeros(n, dtype=np.float64)
+        self.c_close = np.zeros(n, dtype=np.float64)
+        self.c_volume = np.zeros(n, dtype=np.int64)
+        self.c_last_cum = np.zeros(n, dtype=np.int64)
+        self.c_closed_bucket = np.full(n, NO_BUCKET, dtype=np.int64)  # last bucket handed to the engines
+
+        # non-columnar per-token state
+        self.extras: List[dict] = [
+            {k: v for k, v in d.items() if k not in _MARKET_COLUMNS and k not in ("symbol", "token")}
+            for _, d in rows
+        ]
+
+        # armed triggers (disarmed automatically when a status leaves TRIGGER_WATCH)
+        self.triggers = TriggerBook()
+
+        # tick-path interest: dense indices each engine wants run() called for
+        self.tick_interest: Dict[str, set] = {"brk": set(), "mom": set()}
+        self._interest_codes: Dict[str, frozenset] = {"brk": frozenset(), "mom": frozenset()}
+
+        # called with the dense index after every status change (subscription modes, pruning)
+        self.status_listeners: List[Callable[[int], None]] = []
+
+        self._views = [StockView(self, i) for i in range(n)]
+        self.stocks = UniverseStocks(self)
+
+    # -----------------------------
+    # LOOKUPS
+    # -----------------------------
+    def idx(self, token: int) -> Optional[int]:
+        return self.index.get(token)
+
+    def view(self, i: int) -> "StockView":
+        return self._views[i]
+
+    def by_symbol(self, symbol: str) -> Optional["StockView"]:
+        i = self.symbol_index.get(str(symbol or "").strip().upper())
+        return None if i is None else self._views[i]
+
+    # -----------------------------
+    # STATUS TRANSITIONS (single choke point for brk_status / mom_status writes)
+    # -----------------------------
+    def set_status(self, field: str, i: int, code: int):
+        arr = getattr(self, field)
+        old = int(arr[i])
+        if old == code:
+            return
+        arr[i] = code
+        prefix = field[:3]
+        if old == TRIGGER_WATCH:
+            self.triggers.disarm(prefix, i)
+        if code in self._interest_codes[prefix]:
+            self.tick_interest[prefix].add(i)
+        else:
+            self.tick_interest[prefix].discard(i)
+        for listener in self.status_listeners:
+            listener(i)
+
+    def is_idle(self, i: int) -> bool:
+        """Neither engine has the token armed or open."""
+        return self.brk_status[i] == WAITING and self.mom_status[i] == WAITING
+
+    def register_interest(self, prefix: str, statuses) -> int:
+        """Engine declares which statuses need its tick handler; returns tokens currently registered."""
+        codes = frozenset(STATUS_CODES[str(s).upper()] for s in statuses)
+        self._interest_codes[prefix] = codes
+        arr = getattr(self, f"{prefix}_status")
+        self.tick_interest[prefix] = set(int(i) for i in np.flatnonzero(np.isin(arr, list(codes))))
+        return len(self.tick_interest[prefix])
+
+    def is_interesting(self, i: int) -> bool:
+        return i in self.tick_interest["brk"] or i in self.tick_interest["mom"]
+
+    def with_status(self, prefix: str, code: int) -> np.ndarray:
+        """Dense indices whose {prefix}_status == code (whole-universe scan)."""
+        return np.flatnonzero(getattr(self, f"{prefix}_status") == code)
+
+    # -----------------------------
+    # CANDLE HELPERS
+    # -----------------------------
+    def candle_dict(self, i: int) -> Optional[dict]:
+        b = int(self.c_bucket[i])
+        if b == NO_BUCKET:
+            return None
+        return {
+            "bucket": b,  # epoch minute; consumers build a datetime only if they need one
+            "open": float(self.c_open[i]),
+            "high": float(self.c_high[i]),
+            "low": float(self.c_low[i]),
+            "close": float(self.c_close[i]),
+            "volume": int(self.c_volume[i]),
+        }
+
+    def set_candle(self, i: int, candle: Optional[dict]):
+        if not candle:
+            self.c_bucket[i] = NO_BUCKET
+            return
+        bucket = candle.get("bucket")
+        if isinstance(bucket, datetime):
+            bucket = int(bucket.timestamp()) // 60
+        self.c_bucket[i] = int(bucket if bucket is not None else NO_BUCKET)
+        self.c_open[i] = _to_float(candle.get("open"))
+        self.c_high[i] = _to_float(candle.get("high"))
+        self.c_low[i] = _to_float(candle.get("low"))
+        self.c_close[i] = _to_float(candle.get("close"))
+        self.c_volume[i] = int(candle.get("volume", 0) or 0)
+
+    def nbytes(self) -> int:
+        return int(sum(v.nbytes for v in vars(self).values() if isinstance(v, np.ndarray)))
+
+
+class StockView(MutableMapping):
+    """
+    Dict-shaped accessor over one row of the UniverseStore.
+    Columnar keys read/write the arrays; other keys go to the row's extras dict.
+    """
+
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: UniverseStore, i: int):
+        self._store = store
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        kind = _FIELD_KIND.get(key)
+        if kind is None:
+            return self._store.extras[self._i][key]
+        st, i = self._store, self._i
+        if kind == "f":
+            return float(getattr(st, key)[i])
+        if kind == "s":
+            return STATUS_NAMES[getattr(st, key)[i]]
+        if kind == "o":
+            v = getattr(st, key)[i]
+            if v != v:  # NaN => absent
+                raise KeyError(key)
+            return float(v)
+        if kind == "token":
+            return int(st.tokens[i])
+        if kind == "symbol":
+            return st.symbols[i]
+        if kind == "candle":
+            return st.candle_dict(i)
+        return int(st.c_last_cum[i])
+
+    def __setitem__(self, key: str, value: Any):
+        kind = _FIELD_KIND.get(key)
+        if kind is None:
+            self._store.extras[self._i][key] = value
+            return
+        st, i = self._store, self._i
+        if kind in ("f", "o"):
+            getattr(st, key)[i] = np.nan if (value is None and kind == "o") else _to_float(value)
+        elif kind == "s":
+            st.set_status(key, i, STATUS_CODES.get(str(value or "WAITING").upper(), WAITING))
+        elif kind == "candle":
+            st.set_candle(i, value)
+        elif kind == "cum":
+            st.c_last_cum[i] = int(value or 0)
+        else:
+            raise KeyError(f"{key} is read-only")
+
+    def __delitem__(self, key: str):
+        kind = _FIELD_KIND.get(key)
+        if kind is None:
+            del self._store.extras[self._i][key]
+            return
+        if kind != "o":
+            raise KeyError(f"{key} cannot be removed")
+        arr = getattr(self._store, key)
+        if arr[self._i] != arr[self._i]:
+            raise KeyError(key)
+        arr[self._i] = np.nan
+
+    def _present_keys(self) -> List[str]:
+        keys = [k for k, kind in _FIELD_KIND.items() if kind != "o"]
+        keys += [k for k in _OPTIONAL_FIELDS if getattr(self._store, k)[self._i] == getattr(self._store, k)[self._i]]
+        return keys
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._present_keys()
+        yield from self._store.extras[self._i]
+
+    def __len__(self) -> int:
+        return len(self._present_keys()) + len(self._store.extras[self._i])
+
+    def __repr__(self) -> str:
+        return f"StockView({self._store.symbols[self._i]!r}, idx={self._i})"
+
+    @property
+    def idx(self) -> int:
+        return self._i
+
+
+class UniverseStocks(Mapping):
+    """token -> StockView mapping; drop-in for the old RAM_STATE['stocks'] dict."""
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store: UniverseStore):
+        self._store = store
+
+    def __getitem__(self, token: int) -> StockView:
+        return self._store._views[self._store.index[token]]
+
+    def get(self, token, default=None):
+        i = self._store.index.get(token)
+        return default if i is None else self._store._views[i]
+
+    def __contains__(self, token) -> bool:
+        return token in self._store.index
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._store.index)
+
+    def __len__(self) -> int:
+        return self._store.size
+
+    def values(self):
+        return list(self._store._views)